@@ -1,11 +1,8 @@
 # source venv/bin/activate
 import pandas as pd
 import streamlit as st
-import tempfile
-import os
 from controllers.data_controller import DataController
 from controllers.cluster_controller import ClusterController
-from controllers.geo_controller import GeoController
 from views.sidebar import render_sidebar
 from views.data_view import display_dataset_metadata, display_data_preview
 from views.cluster_view import(
@@ -13,14 +10,11 @@ from views.cluster_view import(
     display_clustering_results,
     display_cluster_visualization,
     display_clustering_table,
-    display_cluster_interpretation
-)
-from views.map_view import (
-    display_shapefile_option,
-    display_merge_report,
-    display_choropleth_map,
-    display_geodata_download_options
+    display_cluster_interpretation,
+    display_job_progress
 )
+from services.background_jobs import submit_background_job
+from config import WARMUP_ON_START
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -29,6 +23,11 @@ st.set_page_config(
     layout="centered"
 )
 
+# Warm-up proses server (opt-in): berjalan sekali di latar saat sesi pertama dibuka
+if WARMUP_ON_START:
+    from services.warmup import start_warmup
+    start_warmup()
+
 st.title("📊 Clustering Analysis App")
 st.markdown("Aplikasi untuk analisis clustering dengan DBI dan visualisasi SIG")
 
@@ -37,12 +36,7 @@ data_controller = DataController()
 if "cluster_controller" not in st.session_state:
     st.session_state.cluster_controller = ClusterController()
 
-# Tambahkan geo controller
-if "geo_controller" not in st.session_state:
-    st.session_state.geo_controller = GeoController()
-
 cluster_controller = st.session_state.cluster_controller
-geo_controller = st.session_state.geo_controller
 
 # Inisialisasi session state
 if 'dbi_evaluated' not in st.session_state:
@@ -74,6 +68,12 @@ if 'evaluation_complete' not in st.session_state:
 if 'clustering_complete' not in st.session_state:
     st.session_state.clustering_complete = False
 
+# Job latar untuk tahap berat (tetap dipantau lintas rerun)
+if 'dbi_job' not in st.session_state:
+    st.session_state.dbi_job = None
+if 'clustering_job' not in st.session_state:
+    st.session_state.clustering_job = None
+
 # Panggil sidebar
 render_sidebar()
 
@@ -85,16 +85,11 @@ st.markdown("Unggah dan proses data untuk persiapan analisis clustering.")
 uploaded_file = st.file_uploader("Unggah file CSV", type=["csv"], key="data_uploader")
 
 if uploaded_file is not None:
-    # Simpan file sementara
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_file_path = tmp_file.name
-    
     try:
-        # Proses file
+        # Proses file langsung dari buffer upload (tanpa file sementara)
         with st.spinner("Memproses data..."):
-            metadata, norm_result = data_controller.process_uploaded_file(
-                tmp_file_path, uploaded_file.name
+            metadata, norm_result = data_controller.process_uploaded_buffer(
+                uploaded_file, uploaded_file.name
             )
         
         st.success("✅ Data berhasil diproses!")
@@ -116,10 +111,14 @@ if uploaded_file is not None:
         
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
-    
-    finally:
-        # Hapus file sementara
-        os.unlink(tmp_file_path)
+elif st.session_state.get('loaded_run_name') and st.session_state.data_processed:
+    # Analisis tersimpan yang dibuka dari sidebar (tanpa upload ulang)
+    st.info(f"📂 Analisis tersimpan: {st.session_state.loaded_run_name}")
+    display_dataset_metadata(st.session_state.dataset_metadata)
+    display_data_preview(
+        st.session_state.normalization_result.original_data,
+        st.session_state.normalization_result.normalized_data
+    )
 
 # Divider antara section
 st.divider()
@@ -131,23 +130,44 @@ st.header("🧮 DBI Evaluation")
 st.markdown("Evaluasi kualitas clustering menggunakan Davies-Bouldin Index (DBI).")
 
 if 'data_processed' in st.session_state and st.session_state.data_processed:
+    # Terapkan hasil job evaluasi DBI yang sudah selesai di latar
+    dbi_job = st.session_state.dbi_job
+    if dbi_job is not None and not dbi_job.is_active:
+        if dbi_job.status == 'done':
+            st.session_state.evaluation_result = dbi_job.result
+            st.session_state.dbi_evaluated = True
+            st.session_state.evaluation_complete = True
+        elif dbi_job.status == 'error':
+            st.error(f"Error evaluasi DBI: {dbi_job.error}")
+        else:
+            st.warning("Evaluasi DBI dibatalkan.")
+        st.session_state.dbi_job = dbi_job = None
+    
     # Evaluasi DBI - tombol dengan status disabled jika sudah diklik
     if not st.session_state.dbi_evaluated:
-        if st.button("🚀 Evaluasi DBI", type="primary", key="dbi_button"):
-            with st.spinner("Melakukan evaluasi DBI..."):
-                evaluation_result = cluster_controller.perform_dbi_evaluation(
-                    st.session_state.scaled_data,
+        if dbi_job is not None:
+            display_job_progress('dbi_job')
+        elif st.button("🚀 Evaluasi DBI", type="primary", key="dbi_button"):
+            scaled_data = st.session_state.scaled_data
+            
+            def run_dbi_evaluation(job):
+                job.report_progress(0, 1, "Menghitung k=2...")
+                return cluster_controller.perform_dbi_evaluation(
+                    scaled_data,
                     k_min=2,
-                    k_max=6
+                    k_max=6,
+                    progress_callback=lambda done, total, result: job.report_progress(
+                        done, total, f"k={result['k']} selesai (DBI = {result['dbi']:.4f}), {done}/{total}"
+                    ),
+                    cancel_event=job.cancel_event,
+                    wait_callback=lambda: job.report_progress(
+                        0, 1, "Menunggu perhitungan yang sama yang sedang berjalan di sesi lain..."
+                    )
                 )
-                
-                # Simpan hasil evaluasi di session state
-                st.session_state.evaluation_result = evaluation_result
-                st.session_state.dbi_evaluated = True
-                st.session_state.evaluation_complete = True
-                
-                # Refresh halaman untuk menampilkan hasil
-                st.rerun()
+            
+            # Jalankan di latar agar halaman tetap interaktif
+            st.session_state.dbi_job = submit_background_job("Evaluasi DBI", run_dbi_evaluation)
+            st.rerun()
     else:
         st.button("🚀 Evaluasi DBI", disabled=True, help="Evaluasi DBI sudah dilakukan", key="dbi_button_disabled")
 
@@ -167,26 +187,48 @@ st.header("📊 Clustering")
 st.markdown("Lakukan clustering K-Means berdasarkan hasil evaluasi DBI.")
 
 if 'evaluation_complete' in st.session_state and st.session_state.evaluation_complete:
+    # Terapkan hasil job clustering yang sudah selesai di latar
+    clustering_job = st.session_state.clustering_job
+    if clustering_job is not None and not clustering_job.is_active:
+        if clustering_job.status == 'done':
+            st.session_state.clustering_result = clustering_job.result
+            st.session_state.clustering_performed = True
+            st.session_state.clustering_complete = True
+        elif clustering_job.status == 'error':
+            st.error(f"Error clustering: {clustering_job.error}")
+        else:
+            st.warning("Clustering dibatalkan.")
+        st.session_state.clustering_job = clustering_job = None
+    
     # Clustering K-Means - tombol dengan status disabled jika sudah diklik
     if not st.session_state.clustering_performed:
-        if st.button("🔍 Lakukan Clustering K-Means", type="primary", key="clustering_button"):
-            with st.spinner("Melakukan clustering K-Means..."):
-                clustering_result = cluster_controller.perform_kmeans_clustering(
-                    st.session_state.scaled_data,
-                    st.session_state.normalization_result.original_data,
-                    st.session_state.normalization_result.normalized_data,
-                    st.session_state.dataset_metadata.numeric_columns,
-                    st.session_state.evaluation_result.best_k,
-                    st.session_state.dataset_metadata.merge_key_column
+        if clustering_job is not None:
+            display_job_progress('clustering_job')
+        elif st.button("🔍 Lakukan Clustering K-Means", type="primary", key="clustering_button"):
+            # Nilai session_state diambil di thread skrip; thread latar tidak punya akses ke sesi
+            clustering_args = (
+                st.session_state.scaled_data,
+                st.session_state.normalization_result.original_data,
+                st.session_state.normalization_result.normalized_data,
+                st.session_state.dataset_metadata.numeric_columns,
+                st.session_state.evaluation_result.best_k,
+                st.session_state.dataset_metadata.merge_key_column,
+                st.session_state.dataset_metadata.coordinate_columns,
+                st.session_state.normalization_result.data_store
+            )
+            
+            def run_clustering(job):
+                job.report_progress(0, 1, f"Melakukan clustering K-Means (k = {clustering_args[4]})...")
+                return cluster_controller.perform_kmeans_clustering(
+                    *clustering_args,
+                    cancel_event=job.cancel_event,
+                    wait_callback=lambda: job.report_progress(
+                        0, 1, "Menunggu clustering yang sama yang sedang berjalan di sesi lain..."
+                    )
                 )
-                
-                # Simpan hasil clustering di session state
-                st.session_state.clustering_result = clustering_result
-                st.session_state.clustering_performed = True
-                st.session_state.clustering_complete = True
-                
-                # Refresh halaman untuk menampilkan hasil
-                st.rerun()
+            
+            st.session_state.clustering_job = submit_background_job("Clustering K-Means", run_clustering)
+            st.rerun()
     else:
         st.button("🔍 Lakukan Clustering K-Means", disabled=True, help="Clustering sudah dilakukan", key="clustering_button_disabled")
     
@@ -252,6 +294,21 @@ st.header("🗺️ Spatial Visualization")
 st.markdown("Integrasikan hasil clustering dengan data geospasial untuk visualisasi peta.")
 
 if 'clustering_complete' in st.session_state and st.session_state.clustering_complete:
+    # Stack geospasial (geopandas, folium) baru dimuat saat section ini pertama kali dipakai
+    from controllers.geo_controller import GeoController
+    from views.map_view import (
+        display_shapefile_option,
+        display_merge_report,
+        display_choropleth_map,
+        display_geodata_download_options
+    )
+    
+    # Tambahkan geo controller
+    if "geo_controller" not in st.session_state:
+        st.session_state.geo_controller = GeoController()
+    geo_controller = st.session_state.geo_controller
+    geo_controller.touch_workspace()
+    
     # Inisialisasi shapefile_option jika belum ada
     if 'shapefile_option' not in st.session_state:
         st.session_state.shapefile_option = "Default"
@@ -292,13 +349,18 @@ if 'clustering_complete' in st.session_state and st.session_state.clustering_com
                 try:
                     if st.session_state.shapefile_option == "Default":
                         # Gunakan shapefile default
-                        success = geo_controller.load_default_shapefile()
-                        if success:
+                        try:
+                            geo_controller.load_default_shapefile()
                             st.session_state.shapefile_processed = True
                             st.success("Shapefile default berhasil dimuat!")
                             st.rerun()
-                        else:
-                            st.error("Gagal memuat shapefile default. Silakan hubungi administrator.")
+                        except FileNotFoundError as e:
+                            st.error(str(e))
+                            st.info("""
+                            Silakan lakukan salah satu dari berikut:
+                            1. Pastikan file 'sultra_kabupaten_shapefile.zip' ada di direktori 'data/shapefiles/'
+                            2. Atau unggah shapefile custom menggunakan opsi 'Custom'
+                            """)
                     else:
                         # Gunakan shapefile custom
                         if uploaded_shapefile is not None:
@@ -321,10 +383,14 @@ if 'clustering_complete' in st.session_state and st.session_state.clustering_com
             with st.spinner("Menggabungkan data dengan geodata..."):
                 try:
                     # Merge data clustering dengan shapefile
+                    # Mode merge (nama atau point-in-polygon) ditentukan saat data diproses
+                    dataset_metadata = st.session_state.dataset_metadata
                     merge_report = geo_controller.merge_with_geodata(
                         st.session_state.clustering_result.merge_data,
-                        st.session_state.dataset_metadata.merge_key_column,
-                        st.session_state.dataset_metadata.numeric_columns
+                        dataset_metadata.merge_key_column,
+                        dataset_metadata.numeric_columns,
+                        mode=dataset_metadata.merge_mode or "name",
+                        coordinate_columns=dataset_metadata.coordinate_columns
                     )
                     
                     st.session_state.merge_report = merge_report
@@ -347,12 +413,36 @@ if 'clustering_complete' in st.session_state and st.session_state.clustering_com
         # Buat dan tampilkan peta
         if st.session_state.map_data is not None:
             try:
-                choropleth_map = geo_controller.generate_choropleth_map(
+                # Mode multi-layer: Cluster dan setiap indikator bisa dipilih di peta
+                multi_layer = st.checkbox(
+                    "Tampilkan indikator sebagai layer peta",
+                    value=False,
+                    help="Cluster dan setiap indikator menjadi layer choropleth yang bisa dipilih di peta"
+                )
+                
+                # Ringkasan satu poligon per cluster (hasil dissolve saat merge)
+                overview_option = st.selectbox(
+                    "Ringkasan cluster",
+                    ["Tidak ditampilkan", "Sebagai layer tambahan", "Hanya ringkasan cluster"],
+                    help="Poligon wilayah digabung per cluster; cocok untuk peta tingkat provinsi/nasional"
+                )
+                cluster_overview = st.session_state.merge_report.get('cluster_overview')
+                if overview_option == "Tidak ditampilkan":
+                    cluster_overview = None
+                
+                # HTML peta diambil dari cache selama data, kolom, best_k, dan palet tidak berubah
+                choropleth_map = geo_controller.generate_choropleth_html(
                     st.session_state.map_data['merged_gdf'],
                     st.session_state.map_data['numeric_cols'],
-                    st.session_state.map_data['best_k']
+                    st.session_state.map_data['best_k'],
+                    multi_layer=multi_layer,
+                    cluster_overview=cluster_overview,
+                    overview_only=overview_option == "Hanya ringkasan cluster"
                 )
                 
+                if geo_controller.last_map_error:
+                    st.error(geo_controller.last_map_error)
+                
                 # Tampilkan peta
                 display_choropleth_map(choropleth_map)
                 
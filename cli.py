@@ -0,0 +1,80 @@
+"""
+Menjalankan pipeline clustering tanpa antarmuka Streamlit untuk satu direktori CSV.
+
+Contoh:
+    python cli.py data/input --output-dir data/processed/batch --workers 4
+"""
+import argparse
+import os
+import sys
+from config import PROCESSED_DIR
+from models.pipeline_model import PipelineOptions
+from services.geo_export import EXPORT_FORMATS
+from services.pipeline import run_batch
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Clustering K-Means (evaluasi DBI) untuk semua file CSV dalam satu direktori"
+    )
+    parser.add_argument('input_dir', help="Direktori berisi file CSV")
+    parser.add_argument('--output-dir', default=os.path.join(PROCESSED_DIR, 'batch'),
+                        help="Direktori hasil; tiap file mendapat subdirektori sendiri")
+    parser.add_argument('--pattern', default='*.csv', help="Pola nama file input (default: *.csv)")
+    parser.add_argument('--k-min', type=int, default=2, help="Jumlah cluster minimum untuk evaluasi DBI")
+    parser.add_argument('--k-max', type=int, default=6, help="Jumlah cluster maksimum untuk evaluasi DBI")
+    parser.add_argument('--shapefile', help="Zip shapefile custom (default: shapefile Sulawesi Tenggara)")
+    parser.add_argument('--no-geo', action='store_true', help="Lewati merge shapefile, peta, dan ekspor geospatial")
+    parser.add_argument('--no-map', action='store_true', help="Jangan menulis peta HTML")
+    parser.add_argument('--formats', default='geojson,geoparquet',
+                        help=f"Format ekspor geospatial, dipisah koma ({', '.join(EXPORT_FORMATS)}); kosong = tidak ada")
+    parser.add_argument('--workers', type=int, default=1, help="Jumlah proses paralel (satu file per proses)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        print(f"Format ekspor tidak dikenal: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.k_min < 2 or args.k_max < args.k_min:
+        print("Rentang k tidak valid: k-min minimal 2 dan k-max >= k-min", file=sys.stderr)
+        return 2
+    
+    options = PipelineOptions(
+        k_min=args.k_min,
+        k_max=args.k_max,
+        shapefile_zip=args.shapefile,
+        skip_geo=args.no_geo,
+        export_formats=formats,
+        write_map=not args.no_map
+    )
+    
+    def report(result):
+        name = os.path.basename(result.input_file)
+        if result.status == 'ok':
+            print(f"[OK] {name}: k={result.best_k}, DBI={result.best_dbi:.4f}, "
+                  f"{sum(result.stage_seconds.values()):.1f} detik")
+            for warning in result.warnings:
+                print(f"     peringatan: {warning}")
+        else:
+            print(f"[GAGAL] {name}: {result.error}")
+    
+    try:
+        results = run_batch(args.input_dir, args.output_dir, options, workers=args.workers,
+                            pattern=args.pattern, on_result=report)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    
+    failed = sum(result.status != 'ok' for result in results)
+    print(f"\nSelesai: {len(results) - failed} berhasil, {failed} gagal. "
+          f"Ringkasan: {os.path.join(args.output_dir, 'ringkasan_batch.csv')}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -29,10 +29,106 @@ CLUSTER_COLORS = {
 # Konfigurasi Shapefile dan Peta
 SHAPEFILE_PATH = os.path.join(SHAPEFILE_DIR, "sultra_kabupaten.shp")  # Diubah ke nama file yang sesuai
 SHAPEFILE_KEY_COLUMN = "KAB_KOTA"
+# Posisi baris layer batas yang dibawa lewat merge (nama wilayah bisa berulang di tingkat desa/kecamatan)
+LAYER_FID_COLUMN = "_layer_fid"
 
 # Path ke shapefile default (zip)
 SHAPEFILE_ZIP_PATH = os.path.join(SHAPEFILE_DIR, "sultra_kabupaten_shapefile.zip")
 
 # Map configuration
 MAP_CENTER = [-4.0, 122.0]  # Koordinat tengah peta Sulawesi Tenggara
-MAP_ZOOM = 7
\ No newline at end of file
+MAP_ZOOM = 7
+
+# Cache layer batas wilayah default (GeoParquet hasil konversi dari zip)
+DEFAULT_BOUNDARY_CACHE_PREFIX = "sultra_kabupaten"
+
+# Penyimpanan shapefile upload berbasis hash isi (content-addressed)
+GEODATA_STORE_DIR = os.path.join(SHAPEFILE_DIR, "store")
+GEODATA_STORE_QUOTA_MB = 500  # Batas disk sebelum entri paling lama tidak dipakai dihapus (LRU)
+
+# Direktori kerja per sesi untuk ekstraksi shapefile
+WORKSPACE_DIR = os.path.join(SHAPEFILE_DIR, "workspaces")
+WORKSPACE_TTL_SECONDS = 6 * 60 * 60  # Direktori yang tidak disentuh selama ini dianggap terbengkalai
+WORKSPACE_REAP_INTERVAL_SECONDS = 10 * 60
+
+# Anggota arsip shapefile yang dibutuhkan (ekstraksi selektif)
+SHAPEFILE_SIDECAR_EXTENSIONS = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+# Cukup untuk membaca tabel atribut tanpa geometri (.shp tidak disentuh)
+SHAPEFILE_ATTRIBUTE_EXTENSIONS = ['.dbf', '.shx', '.cpg']
+
+# Alias nama wilayah (nama di data -> nama di shapefile) untuk pencocokan merge
+REGION_NAME_ALIASES = {
+    'KOTA BAUBAU': 'KOTA BAU BAU',
+}
+REGION_FUZZY_THRESHOLD = 0.6  # Kemiripan trigram minimal untuk pencocokan fuzzy
+REGION_FUZZY_MARGIN = 0.1  # Selisih minimal kemiripan kandidat terbaik atas kandidat kedua (nama berbeda)
+REGION_RESOLVE_CACHE_SIZE = 20000  # Nama unik hasil resolusi yang di-memo per layer (LRU, dibagikan antar sesi)
+# Data dengan kolom teks dan koordinat memakai merge nama hanya jika minimal sebagian ini
+# dari nilai unik kolom teks cocok persis dengan nama wilayah layer default; selain itu spatial join
+MERGE_KEY_MATCH_RATIO = 0.5
+
+# Label peta: lebar minimal wilayah (piksel) sebelum labelnya ditampilkan.
+# 16 px: semua kabupaten/kota (termasuk KOTA KENDARI, KOTA BAU BAU) berlabel pada MAP_ZOOM;
+# wilayah desa/kecamatan yang jauh lebih kecil tetap baru berlabel saat diperbesar
+LABEL_MIN_PIXELS = 16
+
+# Level-of-detail geometri peta (toleransi simplifikasi dalam derajat)
+MAP_LOD_TOLERANCES = {
+    'high': 0.0005,
+    'medium': 0.002,
+    'low': 0.005,
+}
+MAP_VIEWPORT_WIDTH_PX = 700  # Lebar peta di Streamlit, dipakai untuk memilih level
+
+# Encoding geometri peta: 'geojson' atau 'topojson' (arc bersama + delta encoding)
+MAP_GEOMETRY_ENCODING = 'topojson'
+MAP_COORD_PRECISION = 5  # Digit desimal koordinat (~1 m pada derajat)
+
+# Cache HTML peta choropleth per sesi (jumlah peta berbeda yang disimpan)
+MAP_RENDER_CACHE_SIZE = 8
+
+# Palet sekuensial untuk layer indikator pada peta multi-layer (kelas kuantil, rendah -> tinggi)
+MAP_INDICATOR_PALETTE = ['#ffffb2', '#fecc5c', '#fd8d3c', '#f03b20', '#bd0026']
+
+# Piramida vector tile (MVT) untuk layer batas wilayah besar (mis. desa se-provinsi)
+TILE_DIR = os.path.join(DATA_DIR, "tiles")
+TILE_STORE_QUOTA_MB = 1000  # Batas disk piramida tile + atribut sebelum yang paling lama tidak dipakai dihapus (LRU)
+MAP_TILE_FEATURE_THRESHOLD = 3000  # Di atas jumlah fitur ini peta memakai tile, bukan GeoJSON tertanam
+MAP_TILE_MIN_ZOOM = 5
+MAP_TILE_MAX_ZOOM = 12  # Zoom lebih dekat memakai overzoom dari tile zoom ini
+MAP_TILE_EXTENT = 4096
+MAP_TILE_BUFFER = 64  # Buffer tepi tile dalam unit extent, mencegah celah di batas tile
+MAP_TILE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Endpoint tile lokal (hanya terjangkau dari mesin server)
+TILE_SERVER_HOST = "127.0.0.1"
+TILE_SERVER_PORT = 8765
+# URL tile yang dipakai browser, mis. https://host/tiles di balik reverse proxy ke TILE_SERVER_HOST:TILE_SERVER_PORT
+# (http://127.0.0.1:8765 jika browser berjalan di mesin yang sama). Mode tile hanya aktif jika ini diisi;
+# tanpa itu peta besar tetap memakai geometri tertanam.
+MAP_TILE_BASE_URL = os.environ.get("MAP_TILE_BASE_URL")
+
+# Ekspor data geospatial: cache hasil per sidik jari data dan ukuran potongan streaming
+GEO_EXPORT_CACHE_MB = 200
+GEO_EXPORT_CHUNK_SIZE = 1024 * 1024  # byte per potongan saat streaming
+GEO_EXPORT_GEOJSON_BATCH_ROWS = 2000  # fitur per potongan GeoJSON
+
+# Layanan job clustering via HTTP (job_server.py)
+JOB_DIR = os.path.join(DATA_DIR, "jobs")
+JOB_SERVER_HOST = "127.0.0.1"
+JOB_SERVER_PORT = 8766
+JOB_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+JOB_QUEUE_LIMIT = 32  # Job antre + berjalan maksimum; di atas ini permintaan baru ditolak (503)
+JOB_TTL_SECONDS = 24 * 60 * 60  # Job selesai yang lebih tua dari ini dihapus beserta berkasnya
+
+# Job berat di latar (evaluasi DBI, clustering) agar halaman Streamlit tetap interaktif
+BACKGROUND_JOB_WORKERS = 2  # Job yang berjalan bersamaan di seluruh sesi dalam satu proses
+BACKGROUND_JOB_POLL_SECONDS = 1.0  # Interval pembaruan progress di UI
+
+# Cache hasil bersama lintas sesi (dataset terproses, evaluasi DBI, clustering, merge)
+RESULT_CACHE_MB = 512
+
+# Warm-up opsional saat server start (APP_WARMUP=1): layer batas default, KMeans kecil, peta folium
+WARMUP_ON_START = os.environ.get("APP_WARMUP", "").lower() in ("1", "true", "yes")
+
+# Analisis tersimpan (simpan/buka dari sidebar): array .npy (memory-mapped), frame Parquet, manifest.json
+RUN_DIR = os.path.join(DATA_DIR, "runs")
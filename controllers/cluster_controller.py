@@ -1,8 +1,12 @@
+import threading
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional, Dict, Any  # Import yang digabung
+from typing import Tuple, Optional, Dict, Any, Callable  # Import yang digabung
 from services.evaluation import evaluate_dbi_range
 from models.result_model import FullEvaluationResult, ClusteringResult
+from services.data_store import SessionDataStore
+from services.result_cache import get_result_cache
+from utils.helpers import fingerprint_array, fingerprint_frame
 from services.clustering import (
     perform_kmeans_clustering,
     add_clusters_to_data,
@@ -19,30 +23,60 @@ class ClusterController:
         self.df_norm_with_clusters = None
         self.interpretations = None
         
-    def perform_dbi_evaluation(self, scaled_data: np.ndarray, k_min: int = 2, k_max: int = 6) -> FullEvaluationResult:
-        """Melakukan evaluasi DBI untuk rentang nilai k"""
-        results, best_k, best_dbi = evaluate_dbi_range(scaled_data, k_min, k_max)
+    def perform_dbi_evaluation(
+        self,
+        scaled_data: np.ndarray,
+        k_min: int = 2,
+        k_max: int = 6,
+        progress_callback: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        wait_callback: Optional[Callable[[], None]] = None
+    ) -> FullEvaluationResult:
+        """
+        Melakukan evaluasi DBI untuk rentang nilai k (progress per k, bisa dibatalkan)
         
-        # Konversi ke model
-        evaluation_results = []
-        for result in results:
-            evaluation_results.append({
-                'k': result['k'],
-                'ssw': result['ssw'],
-                'ssb': result['ssb'],
-                'dbi': result['dbi'],
-                'labels': result['labels'],
-                'centroids': result['centroids']
-            })
+        Hasil dibagikan lintas sesi lewat cache bersama (kunci: isi scaled_data dan
+        rentang k); pada cache hit progress_callback tetap dipanggil untuk setiap k.
+        Jika sesi lain sedang menghitung kunci yang sama, wait_callback dipanggil
+        dan pembatalan tetap diperiksa selama menunggu.
+        """
+        def evaluate():
+            results, best_k, best_dbi = evaluate_dbi_range(
+                scaled_data, k_min, k_max, progress_callback=progress_callback, cancel_event=cancel_event
+            )
+            
+            # Konversi ke model
+            evaluation_results = []
+            for result in results:
+                evaluation_results.append({
+                    'k': result['k'],
+                    'ssw': result['ssw'],
+                    'ssb': result['ssb'],
+                    'dbi': result['dbi'],
+                    'labels': result['labels'],
+                    'centroids': result['centroids']
+                })
+            
+            computed.append(True)
+            return FullEvaluationResult(
+                evaluation_results=evaluation_results,
+                best_k=best_k,
+                best_dbi=best_dbi,
+                k_min=k_min,
+                k_max=k_max
+            )
         
-        self.evaluation_result = FullEvaluationResult(
-            evaluation_results=evaluation_results,
-            best_k=best_k,
-            best_dbi=best_dbi,
-            k_min=k_min,
-            k_max=k_max
+        computed = []
+        key = (fingerprint_array(scaled_data), k_min, k_max)
+        self.evaluation_result = get_result_cache().get_or_compute(
+            'evaluation', key, evaluate, cancel_event=cancel_event, on_wait=wait_callback
         )
         
+        if not computed and progress_callback is not None:
+            total = len(self.evaluation_result.evaluation_results)
+            for done, result in enumerate(self.evaluation_result.evaluation_results, start=1):
+                progress_callback(done, total, {'k': result.k, 'ssw': result.ssw, 'ssb': result.ssb, 'dbi': result.dbi})
+        
         return self.evaluation_result
     
     def get_evaluation_table_data(self):
@@ -68,42 +102,69 @@ class ClusterController:
         normalized_df: pd.DataFrame,
         numeric_cols: list,
         best_k: int,
-        merge_key_column: Optional[str] = None
+        merge_key_column: Optional[str] = None,
+        coordinate_columns: Optional[list] = None,
+        data_store: Optional[SessionDataStore] = None,
+        cancel_event: Optional[threading.Event] = None,
+        wait_callback: Optional[Callable[[], None]] = None
     ) -> ClusteringResult:
-        """Melakukan clustering K-Means dengan nilai k terbaik"""
-        # Lakukan clustering
-        clustering_output = perform_kmeans_clustering(scaled_data, best_k)
-        clusters = clustering_output['clusters']
-        centroids = clustering_output['centroids']
+        """
+        Melakukan clustering K-Means dengan nilai k terbaik
         
-        # Tambahkan cluster ke DataFrame
-        df_with_clusters, df_norm_with_clusters = add_clusters_to_data(
-            original_df, normalized_df, clusters
-        )
+        Jika data_store diberikan, label cluster disimpan sekali di store dan
+        frame ber-Cluster diambil sebagai view darinya. Hasil clustering
+        dibagikan lintas sesi lewat cache bersama; cancel_event dan wait_callback
+        berlaku selama menunggu perhitungan yang sama dari sesi lain.
+        """
+        def cluster():
+            # Lakukan clustering
+            clustering_output = perform_kmeans_clustering(scaled_data, best_k)
+            clusters = clustering_output['clusters']
+            centroids = clustering_output['centroids']
+            
+            # Analisis karakteristik cluster
+            cluster_analysis = analyze_cluster_characteristics(
+                original_df, numeric_cols, clusters
+            )
+            
+            # Siapkan data untuk merge dengan shapefile
+            merge_data = None
+            if merge_key_column or coordinate_columns:
+                try:
+                    merge_data = prepare_data_for_merge(
+                        original_df.assign(Cluster=clusters), clusters, centroids, numeric_cols,
+                        merge_key_column, coordinate_columns
+                    )
+                except ValueError as e:
+                    print(f"Peringatan: {e}")
+            
+            return ClusteringResult(
+                clusters=clusters,
+                centroids=centroids,
+                cluster_summary=cluster_analysis['cluster_summary'],
+                cluster_counts=cluster_analysis['cluster_counts'],
+                merge_data=merge_data
+            )
         
-        # Analisis karakteristik cluster
-        cluster_analysis = analyze_cluster_characteristics(
-            original_df, numeric_cols, clusters
+        # Hasil clustering dibagikan lintas sesi untuk data dan parameter yang sama
+        key = (
+            fingerprint_array(scaled_data), fingerprint_frame(original_df), best_k,
+            tuple(numeric_cols), merge_key_column, tuple(coordinate_columns or ())
         )
-        
-        # Siapkan data untuk merge dengan shapefile
-        merge_data = None
-        if merge_key_column:
-            try:
-                merge_data = prepare_data_for_merge(
-                    df_with_clusters, clusters, centroids, numeric_cols, merge_key_column
-                )
-            except ValueError as e:
-                print(f"Peringatan: {e}")
-        
-        # Simpan hasil clustering
-        self.clustering_result = ClusteringResult(
-            clusters=clusters,
-            centroids=centroids,
-            cluster_summary=cluster_analysis['cluster_summary'],
-            cluster_counts=cluster_analysis['cluster_counts'],
-            merge_data=merge_data
+        self.clustering_result = get_result_cache().get_or_compute(
+            'clustering', key, cluster, cancel_event=cancel_event, on_wait=wait_callback
         )
+        clusters = self.clustering_result.clusters
+        
+        # Tambahkan cluster ke DataFrame
+        if data_store is not None:
+            data_store.set_clusters(clusters)
+            df_with_clusters = data_store.frame_with_clusters()
+            df_norm_with_clusters = data_store.frame_with_clusters(normalized=True)
+        else:
+            df_with_clusters, df_norm_with_clusters = add_clusters_to_data(
+                original_df, normalized_df, clusters
+            )
         
         # Simpan DataFrame dengan cluster di session state untuk akses mudah
         self.df_with_clusters = df_with_clusters
@@ -111,6 +172,22 @@ class ClusterController:
         
         return self.clustering_result
     
+    def restore_results(
+        self,
+        evaluation_result: Optional[FullEvaluationResult],
+        clustering_result: Optional[ClusteringResult],
+        data_store: SessionDataStore,
+        interpretations: Optional[Dict[int, Dict[str, Any]]] = None
+    ):
+        """Memulihkan state controller dari analisis tersimpan (tanpa menghitung ulang)"""
+        self.evaluation_result = evaluation_result
+        self.clustering_result = clustering_result
+        self.interpretations = interpretations
+        if clustering_result is not None:
+            data_store.set_clusters(clustering_result.clusters)
+            self.df_with_clusters = data_store.frame_with_clusters()
+            self.df_norm_with_clusters = data_store.frame_with_clusters(normalized=True)
+    
     def get_clustering_result(self) -> Optional[ClusteringResult]:
         """Mendapatkan hasil clustering"""
         return self.clustering_result
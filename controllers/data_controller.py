@@ -1,16 +1,20 @@
+import os
 import pandas as pd
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, List
+from config import SHAPEFILE_ZIP_PATH, MERGE_KEY_MATCH_RATIO
 from models.data_model import DatasetMetadata, NormalizationResult
 from services.preprocessing import (
     detect_numeric_columns, 
     detect_potential_numeric_columns,  # Ditambahkan
     detect_non_numeric_columns, 
+    detect_coordinate_columns,
     validate_numeric_columns,
     check_missing_values, 
-    normalize_minmax,
-    convert_to_numpy
+    minmax_scale_matrix
 )
-from utils.file_io import read_csv_file, validate_file_format
+from services.data_store import SessionDataStore
+from services.result_cache import get_result_cache
+from utils.file_io import read_csv_file, read_csv_buffer, validate_file_format, buffer_sha256, file_sha256, BufferLike
 
 class DataController:
     def __init__(self):
@@ -23,9 +27,41 @@ class DataController:
         if not validate_file_format(filename):
             raise ValueError("Format file tidak didukung! Silakan upload file CSV.")
         
-        # Baca data
-        df = read_csv_file(file_path)
+        # Baca data (hanya jika isi file belum pernah diproses di proses ini)
+        return self._process_cached(file_sha256(file_path), filename, lambda: read_csv_file(file_path))
+    
+    def process_uploaded_buffer(self, buffer: BufferLike, filename: str) -> Tuple[DatasetMetadata, NormalizationResult]:
+        """Memproses file yang diupload langsung dari buffer di memori (tanpa file temporer)"""
+        # Validasi format file
+        if not validate_file_format(filename):
+            raise ValueError("Format file tidak didukung! Silakan upload file CSV.")
         
+        # Baca data langsung dari buffer (hanya jika isinya belum pernah diproses di proses ini)
+        return self._process_cached(buffer_sha256(buffer), filename, lambda: read_csv_buffer(buffer))
+    
+    def _process_cached(self, content_hash: str, filename: str, read_frame) -> Tuple[DatasetMetadata, NormalizationResult]:
+        """
+        Mengambil dataset terproses dari cache bersama (kunci: hash isi file),
+        atau memproses dan menyimpannya. Setiap pemanggil mendapat SessionDataStore
+        sendiri di atas kolom yang sama, karena label cluster disimpan per sesi.
+        """
+        metadata, norm_result = get_result_cache().get_or_compute(
+            'dataset', content_hash, lambda: self._process_dataframe(read_frame(), filename)
+        )
+        
+        data_store = norm_result.data_store.fork()
+        self.dataset_metadata = metadata.model_copy(update={'filename': filename})
+        self.normalization_result = NormalizationResult(
+            original_data=data_store.original_frame(),
+            normalized_data=data_store.normalized_frame(),
+            normalization_params=norm_result.normalization_params,
+            scaled_data=data_store.scaled_data,
+            data_store=data_store
+        )
+        return self.dataset_metadata, self.normalization_result
+    
+    def _process_dataframe(self, df: pd.DataFrame, filename: str) -> Tuple[DatasetMetadata, NormalizationResult]:
+        """Validasi, pembersihan, dan normalisasi DataFrame hasil pembacaan"""
         # Deteksi kolom numerik dan potensial numerik
         numeric_cols = detect_numeric_columns(df)
         potential_numeric_cols = detect_potential_numeric_columns(df)
@@ -34,6 +70,16 @@ class DataController:
         # Gabungkan kolom numerik dan potensial numerik
         all_numeric_cols = numeric_cols + potential_numeric_cols
         
+        # Identifikasi kolom untuk merge
+        merge_key_column = non_numeric_cols[0] if non_numeric_cols else None
+        
+        # Mode merge: nama wilayah atau spatial join (point-in-polygon);
+        # hanya dalam mode spatial kolom koordinat dikeluarkan dari fitur clustering
+        coordinate_cols = detect_coordinate_columns(df)
+        merge_mode = self._select_merge_mode(df, merge_key_column, coordinate_cols)
+        if merge_mode == "spatial":
+            all_numeric_cols = [col for col in all_numeric_cols if col not in coordinate_cols]
+        
         if not all_numeric_cols:
             raise ValueError("Tidak ditemukan kolom numerik dalam dataset.")
         
@@ -51,9 +97,6 @@ class DataController:
         # Handle missing values
         df_clean, missing_info = check_missing_values(df)
         
-        # Identifikasi kolom untuk merge
-        merge_key_column = non_numeric_cols[0] if non_numeric_cols else None
-        
         # Buat metadata
         self.dataset_metadata = DatasetMetadata(
             filename=filename,
@@ -63,23 +106,50 @@ class DataController:
             row_count=len(df_clean),
             memory_usage_mb=df_clean.memory_usage(deep=True).sum() / 1024 ** 2,
             missing_values_info=missing_info,
-            merge_key_column=merge_key_column
+            merge_key_column=merge_key_column,
+            coordinate_columns=coordinate_cols,
+            merge_mode=merge_mode
         )
         
-        # Normalisasi data
-        df_norm, norm_params = normalize_minmax(df_clean, all_numeric_cols)
-        scaled_data = convert_to_numpy(df_norm, all_numeric_cols)
+        # Normalisasi langsung ke satu matriks; frame ternormalisasi memakai matriks yang sama
+        scaled_data, norm_params = minmax_scale_matrix(df_clean, all_numeric_cols)
+        data_store = SessionDataStore(df_clean, all_numeric_cols, scaled_data)
         
-        # Simpan hasil normalisasi
+        # Simpan hasil normalisasi (semua frame adalah view dari data_store)
         self.normalization_result = NormalizationResult(
-            original_data=df_clean,
-            normalized_data=df_norm,
+            original_data=data_store.original_frame(),
+            normalized_data=data_store.normalized_frame(),
             normalization_params=norm_params,
-            scaled_data=scaled_data
+            scaled_data=data_store.scaled_data,
+            data_store=data_store
         )
         
         return self.dataset_metadata, self.normalization_result
     
+    def _select_merge_mode(self, df: pd.DataFrame, merge_key_column: Optional[str],
+                           coordinate_cols: Optional[List[str]]) -> Optional[str]:
+        """
+        Menentukan mode merge dengan shapefile.
+        
+        Data berkoordinat memakai spatial join, kecuali kolom teksnya memang berisi
+        nama wilayah layer default (mis. data kabupaten dengan titik pusat lat/lon);
+        kolom nama fasilitas/rumah tangga tidak cocok sehingga tetap spatial.
+        """
+        if not coordinate_cols:
+            return "name" if merge_key_column is not None else None
+        if merge_key_column is None or not os.path.exists(SHAPEFILE_ZIP_PATH):
+            return "spatial"
+        
+        try:
+            from services.boundary_layer import load_default_boundary_layer
+            region_index = load_default_boundary_layer(SHAPEFILE_ZIP_PATH).region_index
+        except Exception as e:
+            print(f"Peringatan: layer default tidak dapat dimuat untuk memilih mode merge ({e}).")
+            return "spatial"
+        
+        match_ratio = region_index.exact_match_ratio(df[merge_key_column])
+        return "name" if match_ratio >= MERGE_KEY_MATCH_RATIO else "spatial"
+    
     def get_data_preview(self, num_rows: int = 5) -> Dict[str, Any]:
         """Mendapatkan preview data"""
         if self.normalization_result is None:
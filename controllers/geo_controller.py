@@ -1,66 +1,123 @@
 import geopandas as gpd
-import streamlit as st
 import tempfile
 import zipfile
 import folium
 import os
-import shutil
-from config import SHAPEFILE_PATH, SHAPEFILE_KEY_COLUMN, SHAPEFILE_ZIP_PATH, SHAPEFILE_DIR
+import uuid
+from config import (
+    SHAPEFILE_PATH, SHAPEFILE_KEY_COLUMN, SHAPEFILE_ZIP_PATH, SHAPEFILE_DIR, MAP_TILE_FEATURE_THRESHOLD, MAP_TILE_BASE_URL
+)
 from services.geoprocessing import GeoProcessingService
 from services.map_visualization import MapVisualizationService
+from services.boundary_layer import BoundaryLayer, load_default_boundary_layer
+from services.geodata_store import get_geodata_store
+from services.workspace import get_workspace_manager
+from services.map_cache import MapRenderCache
+from services.vector_tiles import get_vector_tile_store, tiles_available
+from services.tile_server import get_tile_server
+from services.result_cache import get_result_cache
+from utils.file_io import buffer_sha256
+from utils.helpers import fingerprint_frame
 
 class GeoController:
     def __init__(self):
         self.shapefile = None
+        self.shapefile_attributes = None
+        self.boundary_layer = None
+        self._pending_upload = None
         self.geo_processor = GeoProcessingService()
         self.map_visualizer = MapVisualizationService()
+        self.map_cache = MapRenderCache()
+        # Pesan error render peta terakhir (ditampilkan oleh UI/CLI), None jika berhasil
+        self.last_map_error = None
+        # Mode tile butuh endpoint tile yang tetap hidup; dimatikan untuk ekspor batch
+        self.use_tiles = True
         self.extract_dir = None
+        # Identitas sesi untuk direktori kerja terisolasi
+        self.session_id = uuid.uuid4().hex
 
     def load_default_shapefile(self):
-        """Memuat shapefile default dari zip"""
+        """
+        Memuat shapefile default dari zip
+        
+        Raises:
+            FileNotFoundError: jika zip shapefile default tidak ada
+        """
+        # Periksa apakah file zip ada di lokasi yang benar
+        if not os.path.exists(SHAPEFILE_ZIP_PATH):
+            raise FileNotFoundError(f"File shapefile default tidak ditemukan di: {SHAPEFILE_ZIP_PATH}")
+        
         try:
-            # Periksa apakah file zip ada di lokasi yang benar
-            if not os.path.exists(SHAPEFILE_ZIP_PATH):
-                st.error(f"File shapefile default tidak ditemukan di: {SHAPEFILE_ZIP_PATH}")
-                st.info("""
-                Silakan lakukan salah satu dari berikut:
-                1. Pastikan file 'sultra_kabupaten_shapefile.zip' ada di direktori 'data/shapefiles/'
-                2. Atau unggah shapefile custom menggunakan opsi 'Custom'
-                """)
-                return False
-
-            # Ekstrak zip default ke temporary directory
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                with zipfile.ZipFile(SHAPEFILE_ZIP_PATH, 'r') as zip_ref:
-                    zip_ref.extractall(tmp_dir)
-                
-                # Baca shapefile yang diekstrak
-                shp_files = [f for f in os.listdir(tmp_dir) if f.endswith('.shp')]
-                if shp_files:
-                    self.shapefile = gpd.read_file(os.path.join(tmp_dir, shp_files[0]))
-                    st.success("Shapefile default berhasil diekstrak dan dimuat.")
-                    return True
-                else:
-                    st.error("Tidak ada file .shp dalam zip shapefile default.")
-                    return False
+            # Ambil layer default dari cache tingkat proses (GeoParquet jika tersedia)
+            layer = load_default_boundary_layer(SHAPEFILE_ZIP_PATH)
+            self.boundary_layer = layer
+            self.shapefile = layer.gdf
+            self.shapefile_attributes = None
+            self._pending_upload = None
+            return True
         except Exception as e:
-            st.error(f"Gagal memuat shapefile default: {str(e)}")
             import traceback
-            st.error(traceback.format_exc())
-            return False
-
+            print(f"Error detail: {traceback.format_exc()}")
+            raise Exception(f"Gagal memuat shapefile default: {str(e)}")
+    
     def process_uploaded_shapefile(self, uploaded_zip):
-        """Memproses shapefile zip yang diupload"""
+        """
+        Memproses shapefile zip yang diupload.
+        
+        Jika zip belum ada di store, hanya tabel atribut yang dibaca di tahap ini;
+        geometri lengkap dimuat saat merge setelah nama wilayah terbukti cocok.
+        """
         try:
-            # Ekstrak dan baca shapefile
-            gdf, extract_dir = self.geo_processor.extract_shapefile_zip(uploaded_zip)
-            self.shapefile = gdf
-            self.extract_dir = extract_dir
-            return gdf, extract_dir
+            # Lepas workspace upload sebelumnya milik sesi ini
+            self.cleanup_temp_files()
+            
+            # Upload identik cukup dimuat dari store berbasis hash isi zip
+            zip_hash = buffer_sha256(uploaded_zip)
+            gdf = get_geodata_store().get(zip_hash)
+            
+            if gdf is not None:
+                self.shapefile = gdf
+                self.shapefile_attributes = None
+                self.boundary_layer = BoundaryLayer(gdf, zip_hash)
+                self._pending_upload = None
+                return gdf, None
+            
+            # Preflight: validasi kolom kunci dari tabel atribut saja
+            self.shapefile_attributes = self.geo_processor.preflight_shapefile_zip(uploaded_zip)
+            self.shapefile = None
+            self.boundary_layer = None
+            self._pending_upload = (uploaded_zip, zip_hash)
+            return None, None
         except Exception as e:
             raise Exception(f"Gagal memproses shapefile: {str(e)}")
     
-    def merge_with_geodata(self, clustering_data, merge_column, numeric_cols):
+    def _load_pending_geometry(self):
+        """Memuat geometri lengkap dari upload yang sudah lolos preflight"""
+        uploaded_zip, zip_hash = self._pending_upload
+        extract_dir = None
+        
+        # Baca shapefile langsung dari buffer upload
+        try:
+            gdf = self.geo_processor.read_shapefile_zip_buffer(uploaded_zip)
+        except ValueError:
+            raise
+        except Exception as e:
+            # Fallback ke ekstraksi ke disk jika GDAL gagal membaca arsip dari memori
+            print(f"Peringatan: {e}. Menggunakan ekstraksi ke disk.")
+            workspace = get_workspace_manager().create(self.session_id)
+            try:
+                gdf, extract_dir = self.geo_processor.extract_shapefile_zip(uploaded_zip, workspace)
+            except Exception:
+                get_workspace_manager().release(workspace)
+                raise
+        
+        get_geodata_store().put(zip_hash, gdf)
+        self.shapefile = gdf
+        self.boundary_layer = BoundaryLayer(gdf, zip_hash)
+        self.extract_dir = extract_dir
+        self._pending_upload = None
+    
+    def merge_with_geodata(self, clustering_data, merge_column, numeric_cols, mode="name", coordinate_columns=None):
         """
         Menggabungkan data clustering dengan data geospatial
         
@@ -68,34 +125,81 @@ class GeoController:
             clustering_data (pd.DataFrame): Data hasil clustering
             merge_column (str): Nama kolom yang digunakan untuk merge
             numeric_cols (list): Daftar kolom numerik
+            mode (str): 'name' (join nama wilayah) atau 'spatial' (point-in-polygon)
+            coordinate_columns (list): [kolom_longitude, kolom_latitude] untuk mode 'spatial'
         
         Returns:
-            dict: Hasil merge dengan laporan
+            dict: Hasil merge dengan laporan (GeoDataFrame di dalamnya dibagikan lintas sesi, read-only)
         """
         try:
-            # Pastikan shapefile sudah dimuat
-            if self.shapefile is None:
+            # Pastikan shapefile sudah dimuat (atau minimal lolos preflight)
+            if self.shapefile is None and self._pending_upload is None:
                 raise Exception("Shapefile belum dimuat. Silakan pilih opsi shapefile terlebih dahulu.")
             
             # Pastikan data clustering memiliki kolom Cluster
             if 'Cluster' not in clustering_data.columns:
                 raise Exception("Data clustering tidak memiliki kolom 'Cluster'. Pastikan clustering telah dilakukan dengan benar.")
             
-            # Merge data clustering dengan shapefile
-            merge_report = self.geo_processor.merge_with_shapefile(
-                self.shapefile, 
-                clustering_data, 
-                merge_column,
-                numeric_cols
-            )
+            def merge():
+                if mode == "spatial":
+                    if not coordinate_columns or len(coordinate_columns) != 2:
+                        raise Exception("Mode spatial membutuhkan kolom longitude dan latitude.")
+                    
+                    # Spatial join selalu membutuhkan geometri lengkap
+                    if self.shapefile is None:
+                        self._load_pending_geometry()
+                    
+                    lon_column, lat_column = coordinate_columns
+                    merge_report = self.geo_processor.merge_points_with_shapefile(
+                        self.shapefile,
+                        clustering_data,
+                        lon_column,
+                        lat_column,
+                        numeric_cols
+                    )
+                else:
+                    # Geometri lengkap baru dimuat setelah nama wilayah terbukti cocok
+                    if self.shapefile is None:
+                        self.geo_processor.validate_merge_keys(self.shapefile_attributes, clustering_data, merge_column)
+                        self._load_pending_geometry()
+                    
+                    # Merge data clustering dengan shapefile
+                    merge_report = self.geo_processor.merge_with_shapefile(
+                        self.shapefile, 
+                        clustering_data, 
+                        merge_column,
+                        numeric_cols,
+                        region_index=self.boundary_layer.region_index if self.boundary_layer else None
+                    )
+                
+                # Ringkasan satu poligon per cluster disimpan bersama laporan merge
+                merge_report['cluster_overview'] = self.geo_processor.dissolve_by_cluster(
+                    merge_report['merged_gdf'], numeric_cols
+                )
+                return merge_report
+            
+            # Hasil merge dibagikan lintas sesi jika layer batas sudah dimuat penuh
+            # (upload yang baru lolos preflight belum punya sidik jari geometri)
+            if self.boundary_layer is not None and self.shapefile is not None:
+                key = (
+                    self.boundary_layer.fingerprint, fingerprint_frame(clustering_data), merge_column,
+                    tuple(numeric_cols), mode, tuple(coordinate_columns or ())
+                )
+                # Salinan dict agar pemanggil tidak mengubah entri cache
+                return dict(get_result_cache().get_or_compute('merge', key, merge))
             
-            return merge_report
+            return merge()
         except Exception as e:
             raise Exception(f"Gagal menggabungkan data dengan geodata: {str(e)}")
     
-    def generate_choropleth_map(self, merged_data, numeric_cols, best_k):
+    def generate_choropleth_map(self, merged_data, numeric_cols, best_k, multi_layer=False,
+                                cluster_overview=None, overview_only=False):
         """
         Menghasilkan peta choropleth untuk visualisasi cluster
+        
+        multi_layer: Cluster dan setiap indikator sebagai layer yang bisa dipilih
+        cluster_overview: hasil dissolve per cluster (merge_report['cluster_overview'])
+        overview_only: hanya menampilkan poligon per cluster
         """
         try:
             # Pastikan kolom Cluster ada dalam data
@@ -106,22 +210,119 @@ class GeoController:
             if not hasattr(merged_data, 'geometry') or merged_data.geometry.isnull().all():
                 raise ValueError("Data tidak memiliki geometri yang valid")
             
+            # Layer besar digambar dari piramida vector tile, bukan GeoJSON tertanam
+            # (butuh MAP_TILE_BASE_URL agar URL tile terjangkau dari browser)
+            tileset = None
+            if (self.use_tiles and MAP_TILE_BASE_URL and len(merged_data) > MAP_TILE_FEATURE_THRESHOLD
+                    and not overview_only):
+                tileset = self.prepare_tileset(merged_data, numeric_cols)
+            
             # Buat peta
-            choropleth_map = self.map_visualizer.create_choropleth_map(merged_data, numeric_cols, best_k)
+            # Titik label dan geometri LOD diambil dari cache layer batas wilayah
+            choropleth_map = self.map_visualizer.create_choropleth_map(
+                merged_data, numeric_cols, best_k, boundary_layer=self.boundary_layer,
+                multi_layer=multi_layer, cluster_overview=cluster_overview, overview_only=overview_only,
+                tileset=tileset
+            )
             
             # Pastikan peta berhasil dibuat
             if choropleth_map is None:
                 raise ValueError("Map visualizer gagal membuat peta")
-                
+            
+            self.last_map_error = getattr(choropleth_map, 'error_message', None)
             return choropleth_map
                 
         except Exception as e:
-            st.error(f"Error generating choropleth map: {str(e)}")
+            self.last_map_error = f"Error generating choropleth map: {str(e)}"
             import traceback
             print(f"Error detail: {traceback.format_exc()}")
             import folium
             from config import MAP_CENTER, MAP_ZOOM
-            return folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM)
+            fallback_map = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM)
+            fallback_map.is_fallback = True
+            return fallback_map
+    
+    def prepare_tileset(self, merged_data, numeric_cols):
+        """
+        Menyiapkan piramida vector tile untuk data gabungan dan menjalankan endpoint tile.
+        
+        Tile geometri hanya dibuat jika geometri/nama wilayah berubah; perubahan
+        cluster saja cukup menulis satu file atribut baru.
+        
+        Returns:
+            dict untuk MapVisualizationService (tile_url, attributes_url, zoom),
+            atau None jika encoder MVT tidak tersedia
+        """
+        if not tiles_available():
+            print("Peringatan: mapbox_vector_tile tidak terpasang, peta memakai geometri tertanam.")
+            return None
+        
+        store = get_vector_tile_store()
+        geometry_key = store.ensure_geometry_tiles(merged_data, SHAPEFILE_KEY_COLUMN)
+        
+        # Atribut per fitur sebagai array kolom yang diindeks fid (posisi baris)
+        centroid_columns = [f'Centroid_{col}' for col in numeric_cols if f'Centroid_{col}' in merged_data.columns]
+        attributes = {
+            column: merged_data[column].astype(object).where(merged_data[column].notna(), None).tolist()
+            for column in ['Cluster'] + centroid_columns
+        }
+        style_columns = self.map_visualizer.compute_style_columns(merged_data['Cluster'])
+        attributes['fill_color'] = style_columns['fill_color'].tolist()
+        attributes['fill_opacity'] = style_columns['fill_opacity'].tolist()
+        attribute_key = store.write_attributes(geometry_key, attributes)
+        
+        base_url = get_tile_server().base_url
+        return {
+            'tile_url': f"{base_url}/{geometry_key}/{{z}}/{{x}}/{{y}}.pbf",
+            'attributes_url': f"{base_url}/{geometry_key}/attributes/{attribute_key}.json",
+            'min_zoom': store.min_zoom,
+            'max_zoom': store.max_zoom
+        }
+    
+    def _map_cache_key(self, merged_data, numeric_cols, best_k, multi_layer=False, overview_mode=None):
+        """
+        Kunci cache peta: isi data gabungan, kolom numerik, best_k, palet, layer batas, dan mode.
+        Ringkasan cluster diturunkan dari data gabungan, jadi cukup mode tampilannya yang masuk kunci.
+        """
+        return (
+            fingerprint_frame(merged_data),
+            tuple(numeric_cols),
+            int(best_k),
+            tuple(sorted(self.map_visualizer.cluster_colormap.items())),
+            self.boundary_layer.fingerprint if self.boundary_layer else None,
+            bool(multi_layer),
+            overview_mode
+        )
+    
+    def generate_choropleth_html(self, merged_data, numeric_cols, best_k, multi_layer=False,
+                                 cluster_overview=None, overview_only=False):
+        """
+        HTML peta choropleth, diambil dari cache jika inputnya tidak berubah
+        sejak render sebelumnya
+        """
+        try:
+            overview_mode = None if cluster_overview is None else ('only' if overview_only else 'layer')
+            key = self._map_cache_key(merged_data, numeric_cols, best_k, multi_layer, overview_mode)
+        except Exception as e:
+            # Data yang tidak bisa di-hash tetap dirender, hanya tanpa cache
+            print(f"Peringatan: sidik jari peta gagal dihitung: {e}")
+            key = None
+        
+        if key is not None:
+            html = self.map_cache.get(key)
+            if html is not None:
+                self.last_map_error = None
+                return html
+        
+        choropleth_map = self.generate_choropleth_map(
+            merged_data, numeric_cols, best_k, multi_layer, cluster_overview, overview_only
+        )
+        html = choropleth_map.get_root().render()
+        
+        # Peta fallback (render gagal) tidak di-cache agar dicoba lagi pada rerun berikutnya
+        if key is not None and not getattr(choropleth_map, 'is_fallback', False):
+            self.map_cache.put(key, html)
+        return html
         
     def save_geodata(self, gdf, output_path):
         """Menyimpan data geospatial ke file"""
@@ -131,8 +332,12 @@ class GeoController:
         except Exception as e:
             raise Exception(f"Gagal menyimpan data geospatial: {str(e)}")
     
+    def touch_workspace(self):
+        """Menandai direktori kerja sesi ini masih dipakai agar tidak dihapus reaper TTL"""
+        if self.extract_dir:
+            get_workspace_manager().touch(self.extract_dir)
+    
     def cleanup_temp_files(self):
-        """Membersihkan file temporer"""
-        if self.extract_dir and os.path.exists(self.extract_dir):
-            shutil.rmtree(self.extract_dir)
-            self.extract_dir = None
\ No newline at end of file
+        """Membersihkan seluruh direktori kerja milik sesi ini"""
+        get_workspace_manager().release_session(self.session_id)
+        self.extract_dir = None
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""
+Layanan HTTP lokal untuk menjalankan job clustering dari tool lain.
+
+Contoh:
+    python job_server.py --workers 4
+    curl -X POST --data-binary @data.csv "http://127.0.0.1:8766/jobs?filename=data.csv&k_max=8"
+    curl http://127.0.0.1:8766/jobs/<job_id>
+    curl http://127.0.0.1:8766/jobs/<job_id>/result
+"""
+import argparse
+from config import JOB_SERVER_HOST, JOB_SERVER_PORT, JOB_WORKERS, JOB_QUEUE_LIMIT
+from services.job_service import JobManager, JobServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP job clustering K-Means")
+    parser.add_argument('--host', default=JOB_SERVER_HOST)
+    parser.add_argument('--port', type=int, default=JOB_SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS, help="Jumlah proses worker")
+    parser.add_argument('--queue-limit', type=int, default=JOB_QUEUE_LIMIT,
+                        help="Job aktif maksimum sebelum permintaan baru ditolak")
+    args = parser.parse_args(argv)
+    
+    server = JobServer(JobManager(workers=args.workers, queue_limit=args.queue_limit), args.host, args.port)
+    print(f"Layanan job berjalan di {server.base_url} ({args.workers} worker)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,8 @@ class DatasetMetadata(BaseModel):
     memory_usage_mb: float
     missing_values_info: Dict[str, Any]
     merge_key_column: Optional[str] = None
+    coordinate_columns: Optional[List[str]] = None  # [longitude, latitude] jika kolom koordinat terdeteksi
+    merge_mode: Optional[str] = None  # 'name' (join nama wilayah) atau 'spatial' (point-in-polygon)
 
 class NormalizationResult(BaseModel):
     """Hasil normalisasi data"""
@@ -19,6 +21,7 @@ class NormalizationResult(BaseModel):
     normalized_data: pd.DataFrame
     normalization_params: Dict[str, Any]
     scaled_data: Any  # numpy array
+    data_store: Any = None  # SessionDataStore pemilik data di atas
     
     class Config:
         arbitrary_types_allowed = True
\ No newline at end of file
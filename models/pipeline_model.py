@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import List, Dict, Optional
+
+
+class PipelineOptions(BaseModel):
+    """Opsi untuk menjalankan pipeline clustering tanpa UI"""
+    k_min: int = 2
+    k_max: int = 6
+    shapefile_zip: Optional[str] = None  # None = shapefile default
+    skip_geo: bool = False
+    export_formats: List[str] = ['geojson', 'geoparquet']
+    write_map: bool = True
+
+
+class PipelineResult(BaseModel):
+    """Ringkasan hasil pipeline untuk satu file input"""
+    input_file: str
+    output_dir: str
+    status: str  # 'ok' atau 'error'
+    best_k: Optional[int] = None
+    best_dbi: Optional[float] = None
+    row_count: Optional[int] = None
+    total_matched: Optional[int] = None
+    outputs: List[str] = []
+    warnings: List[str] = []
+    error: Optional[str] = None
+    stage_seconds: Dict[str, float] = {}
+
+
+class JobStatus(BaseModel):
+    """Status satu job clustering yang dikirim lewat layanan HTTP"""
+    job_id: str
+    status: str  # 'queued', 'running', 'done', 'error', atau 'cancelled'
+    input_file: str
+    options: PipelineOptions
+    created_at: float
+    finished_at: Optional[float] = None
+    result: Optional[PipelineResult] = None
+    error: Optional[str] = None
@@ -0,0 +1,22 @@
+import pandas as pd
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
+from models.data_model import DatasetMetadata, NormalizationResult
+from models.result_model import FullEvaluationResult, ClusteringResult
+
+
+class AnalysisRun(BaseModel):
+    """Analisis tersimpan yang dibuka kembali dari RUN_DIR"""
+    run_id: str
+    name: str
+    created_at: float
+    metadata: DatasetMetadata
+    normalization_result: NormalizationResult
+    evaluation_result: Optional[FullEvaluationResult] = None
+    clustering_result: Optional[ClusteringResult] = None
+    clustering_table: Optional[pd.DataFrame] = None
+    interpretations: Optional[Dict[int, Dict[str, Any]]] = None
+    merge_report: Optional[Dict[str, Any]] = None
+    
+    class Config:
+        arbitrary_types_allowed = True
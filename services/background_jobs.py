@@ -0,0 +1,96 @@
+import threading
+import time
+import traceback
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from config import BACKGROUND_JOB_WORKERS
+
+
+class BackgroundJob:
+    """
+    Pekerjaan berat yang berjalan di thread latar, terpisah dari thread skrip Streamlit.
+
+    Objek ini disimpan di session_state sehingga tetap bisa dipantau setelah
+    rerun; target menerima job itu sendiri untuk melaporkan progress dan
+    memeriksa cancel_event. Status: 'queued', 'running', 'done', 'error', 'cancelled'.
+    """
+    def __init__(self, name: str, target: Callable[['BackgroundJob'], Any]):
+        self.name = name
+        self._target = target
+        self.cancel_event = threading.Event()
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._future: Optional[Future] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ('queued', 'running')
+
+    @property
+    def elapsed(self) -> float:
+        """Detik sejak job mulai berjalan (0 jika masih antre)"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def report_progress(self, done: int, total: int, message: str = ''):
+        """Dipanggil target untuk memperbarui progress (0..1) dan pesan status"""
+        self.progress = done / total if total else 0.0
+        self.message = message
+
+    def cancel(self):
+        """Meminta pembatalan; job yang sedang berjalan berhenti di titik periksa berikutnya"""
+        self.cancel_event.set()
+        if self._future is not None and self._future.cancel():
+            self.status = 'cancelled'
+            self.finished_at = time.time()
+
+    def _run(self):
+        if self.cancel_event.is_set():
+            self.status = 'cancelled'
+            return
+        self.status = 'running'
+        self.started_at = time.time()
+        try:
+            result = self._target(self)
+            if self.cancel_event.is_set():
+                # Target tanpa titik periksa (mis. clustering) tetap selesai; hasilnya dibuang
+                self.status = 'cancelled'
+                return
+            self.result = result
+            self.progress = 1.0
+            self.status = 'done'
+        except CancelledError:
+            self.status = 'cancelled'
+        except Exception as e:
+            print(f"Error detail ({self.name}): {traceback.format_exc()}")
+            self.error = str(e)
+            self.status = 'error'
+        finally:
+            self.finished_at = time.time()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_background_executor() -> ThreadPoolExecutor:
+    """Thread pool bersama untuk job latar di seluruh sesi (dibatasi BACKGROUND_JOB_WORKERS)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKGROUND_JOB_WORKERS, thread_name_prefix="background-job")
+    return _executor
+
+
+def submit_background_job(name: str, target: Callable[[BackgroundJob], Any]) -> BackgroundJob:
+    """Membuat job dan memasukkannya ke thread pool bersama"""
+    job = BackgroundJob(name, target)
+    job._future = get_background_executor().submit(job._run)
+    return job
@@ -0,0 +1,201 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from config import (
+    SHAPEFILE_DIR, SHAPEFILE_KEY_COLUMN, SHAPEFILE_ZIP_PATH, DEFAULT_BOUNDARY_CACHE_PREFIX, LABEL_MIN_PIXELS,
+    MAP_LOD_TOLERANCES, LAYER_FID_COLUMN
+)
+from services.region_index import RegionNameIndex
+from utils.file_io import file_sha256, write_geoparquet, read_geoparquet
+
+
+class BoundaryLayer:
+    """
+    Layer batas wilayah beserta artefak turunannya.
+    
+    GeoDataFrame di dalamnya dibagikan antar sesi sehingga harus diperlakukan
+    read-only; operasi merge selalu menghasilkan GeoDataFrame baru.
+    """
+    def __init__(self, gdf: gpd.GeoDataFrame, fingerprint: str, key_column: str = SHAPEFILE_KEY_COLUMN):
+        self.gdf = gdf
+        self.fingerprint = fingerprint
+        self.key_column = key_column
+        self._region_index = None
+        self._label_anchors = None
+        self._lod_geometries = None
+        self._lock = threading.Lock()
+    
+    @property
+    def region_index(self) -> RegionNameIndex:
+        """Indeks nama wilayah, dibangun sekali per layer"""
+        if self._region_index is None:
+            with self._lock:
+                if self._region_index is None:
+                    self._region_index = RegionNameIndex(self.gdf[self.key_column])
+        return self._region_index
+    
+    @property
+    def label_anchors(self) -> pd.DataFrame:
+        """Titik label per wilayah, dihitung sekali per layer"""
+        if self._label_anchors is None:
+            with self._lock:
+                if self._label_anchors is None:
+                    self._label_anchors = compute_label_anchors(self.gdf, self.key_column)
+        return self._label_anchors
+    
+    @property
+    def lod_geometries(self) -> dict:
+        """Geometri tersimplifikasi untuk setiap level MAP_LOD_TOLERANCES, dihitung sekali per layer"""
+        if self._lod_geometries is None:
+            with self._lock:
+                if self._lod_geometries is None:
+                    self._lod_geometries = {
+                        level: simplify_coverage(self.gdf.geometry, tolerance)
+                        for level, tolerance in MAP_LOD_TOLERANCES.items()
+                    }
+        return self._lod_geometries
+    
+    def apply_lod(self, gdf: gpd.GeoDataFrame, level: str) -> gpd.GeoDataFrame:
+        """
+        Mengganti geometri gdf (hasil merge dengan layer ini) dengan versi level tertentu.
+        
+        Baris dicocokkan lewat LAYER_FID_COLUMN (posisi baris di layer ini, dibawa
+        oleh merge), bukan nama wilayah yang bisa berulang; baris tanpa fid yang
+        valid tetap memakai geometri aslinya.
+        """
+        if level == 'full' or level not in MAP_LOD_TOLERANCES or LAYER_FID_COLUMN not in gdf.columns:
+            return gdf
+        
+        simplified = np.asarray(self.lod_geometries[level].values, dtype=object)
+        fid = pd.to_numeric(gdf[LAYER_FID_COLUMN], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+        valid = (fid >= 0) & (fid < len(simplified))
+        geometry = np.asarray(gdf.geometry.values, dtype=object).copy()
+        geometry[valid] = simplified[fid[valid]]
+        return gdf.set_geometry(gpd.GeoSeries(geometry, index=gdf.index, crs=gdf.crs))
+
+
+def simplify_coverage(geometry: gpd.GeoSeries, tolerance: float) -> gpd.GeoSeries:
+    """
+    Simplifikasi yang menjaga topologi antar wilayah bertetangga.
+    
+    shapely.coverage_simplify menyederhanakan setiap batas bersama satu kali
+    sehingga tidak muncul celah/tumpang tindih antar wilayah. Untuk shapely lama
+    dipakai simplify(preserve_topology=True) per geometri.
+    """
+    if geometry.crs is not None and not geometry.crs.is_geographic:
+        # Toleransi dalam derajat; konversi kasar ke meter untuk CRS terproyeksi
+        tolerance = tolerance * 111_320
+    
+    values = geometry.values
+    if hasattr(shapely, 'coverage_simplify'):
+        simplified = shapely.coverage_simplify(values, tolerance)
+    else:
+        simplified = shapely.simplify(values, tolerance, preserve_topology=True)
+    return gpd.GeoSeries(simplified, index=geometry.index, crs=geometry.crs)
+
+
+def compute_label_anchors(gdf: gpd.GeoDataFrame, key_column: str = SHAPEFILE_KEY_COLUMN) -> pd.DataFrame:
+    """
+    Menghitung titik label untuk setiap wilayah secara vektor.
+    
+    representative_point selalu berada di dalam poligon (berbeda dengan centroid
+    pada wilayah berbentuk kepulauan). min_zoom diturunkan dari luas bounding box
+    sehingga wilayah kecil baru diberi label saat peta diperbesar.
+    """
+    geometry = gdf.geometry
+    valid = geometry.notna() & ~geometry.is_empty
+    gdf = gdf[valid]
+    
+    points = gdf.geometry.representative_point()
+    if gdf.crs is not None and not gdf.crs.equals("EPSG:4326"):
+        points = points.to_crs("EPSG:4326")
+        bounds = gdf.geometry.to_crs("EPSG:4326").bounds
+    else:
+        bounds = gdf.geometry.bounds
+    
+    # Zoom minimum agar wilayah selebar minimal LABEL_MIN_PIXELS piksel di layar
+    extent = np.sqrt((bounds['maxx'] - bounds['minx']) * (bounds['maxy'] - bounds['miny'])).clip(lower=1e-6)
+    min_zoom = np.ceil(np.log2(LABEL_MIN_PIXELS * 360.0 / (256.0 * extent))).clip(0, 18)
+    
+    return pd.DataFrame({
+        key_column: gdf[key_column].to_numpy(),
+        'lat': points.y.to_numpy(),
+        'lon': points.x.to_numpy(),
+        'min_zoom': min_zoom.astype(int).to_numpy()
+    })
+
+
+# Cache tingkat proses untuk layer default, dibagikan ke semua sesi
+_default_layer = None
+_default_layer_stat = None
+_default_layer_lock = threading.Lock()
+
+
+def _zip_stat(zip_path: str):
+    """Tanda perubahan murah (ukuran + mtime) untuk file zip sumber"""
+    stat = os.stat(zip_path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _parquet_cache_path(fingerprint: str) -> str:
+    """Path GeoParquet untuk versi zip tertentu"""
+    return os.path.join(SHAPEFILE_DIR, f"{DEFAULT_BOUNDARY_CACHE_PREFIX}.{fingerprint[:16]}.parquet")
+
+
+def _remove_stale_parquet(current_path: str):
+    """Menghapus GeoParquet dari versi zip sebelumnya"""
+    prefix = f"{DEFAULT_BOUNDARY_CACHE_PREFIX}."
+    for file in os.listdir(SHAPEFILE_DIR):
+        path = os.path.join(SHAPEFILE_DIR, file)
+        if file.startswith(prefix) and file.endswith(".parquet") and path != current_path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def _load_boundary_layer(zip_path: str) -> BoundaryLayer:
+    """Memuat layer dari GeoParquet jika ada, jika tidak parse zip lalu konversi"""
+    fingerprint = file_sha256(zip_path)
+    parquet_path = _parquet_cache_path(fingerprint)
+    
+    if os.path.exists(parquet_path):
+        try:
+            return BoundaryLayer(read_geoparquet(parquet_path), fingerprint)
+        except Exception as e:
+            print(f"Peringatan: cache GeoParquet rusak, membaca ulang zip: {e}")
+    
+    # Baca shapefile langsung dari zip melalui virtual filesystem GDAL
+    gdf = gpd.read_file(zip_path)
+    if write_geoparquet(gdf, parquet_path):
+        _remove_stale_parquet(parquet_path)
+    
+    return BoundaryLayer(gdf, fingerprint)
+
+
+def load_default_boundary_layer(zip_path: str = SHAPEFILE_ZIP_PATH) -> BoundaryLayer:
+    """
+    Mendapatkan layer batas wilayah default dari cache tingkat proses.
+    
+    Cache diinvalidasi jika ukuran/mtime zip sumber berubah; isi zip kemudian
+    di-hash ulang sehingga GeoParquet hanya dibuat ulang jika isinya berbeda.
+    """
+    global _default_layer, _default_layer_stat
+    
+    if not os.path.exists(zip_path):
+        raise FileNotFoundError(f"File shapefile default tidak ditemukan di: {zip_path}")
+    
+    stat = _zip_stat(zip_path)
+    layer = _default_layer
+    if layer is not None and _default_layer_stat == stat:
+        return layer
+    
+    with _default_layer_lock:
+        # Cek ulang setelah lock, sesi lain mungkin sudah memuat
+        if _default_layer is None or _default_layer_stat != stat:
+            _default_layer = _load_boundary_layer(zip_path)
+            _default_layer_stat = stat
+        return _default_layer
@@ -1,9 +1,6 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
 from typing import Tuple, Dict, Any, Optional
-import matplotlib.pyplot as plt
 
 def perform_kmeans_clustering(
     scaled_data: np.ndarray, 
@@ -11,6 +8,8 @@ def perform_kmeans_clustering(
     random_state: int = 42
 ) -> Dict[str, Any]:
     """Melakukan clustering K-Means dengan nilai k terbaik"""
+    from sklearn.cluster import KMeans
+    
     kmeans_final = KMeans(n_clusters=best_k, random_state=random_state, n_init=10)
     clusters = kmeans_final.fit_predict(scaled_data)
     centroids = kmeans_final.cluster_centers_
@@ -26,12 +25,9 @@ def add_clusters_to_data(
     normalized_df: pd.DataFrame, 
     clusters: np.ndarray
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-    """Menambahkan hasil clustering ke DataFrame"""
-    df_with_clusters = original_df.copy()
-    df_norm_with_clusters = normalized_df.copy()
-    
-    df_with_clusters['Cluster'] = clusters
-    df_norm_with_clusters['Cluster'] = clusters
+    """Menambahkan hasil clustering ke DataFrame (kolom lain tidak disalin, Copy-on-Write)"""
+    df_with_clusters = original_df.assign(Cluster=clusters)
+    df_norm_with_clusters = normalized_df.assign(Cluster=clusters)
     
     return df_with_clusters, df_norm_with_clusters
 
@@ -41,8 +37,7 @@ def analyze_cluster_characteristics(
     clusters: np.ndarray
 ) -> Dict[str, Any]:
     """Menganalisis karakteristik cluster"""
-    df_with_clusters = df.copy()
-    df_with_clusters['Cluster'] = clusters
+    df_with_clusters = df.assign(Cluster=clusters)
     
     cluster_summary = df_with_clusters.groupby('Cluster')[numeric_cols].mean()
     cluster_counts = df_with_clusters['Cluster'].value_counts().sort_index()
@@ -57,18 +52,22 @@ def prepare_data_for_merge(
     clusters: np.ndarray, 
     centroids: np.ndarray, 
     numeric_cols: list, 
-    merge_key_column: Optional[str] = None
+    merge_key_column: Optional[str] = None,
+    coordinate_columns: Optional[list] = None
 ) -> Tuple[pd.DataFrame, str]:
     """Mempersiapkan data untuk merge dengan shapefile"""
-    if merge_key_column is None:
+    if merge_key_column is None and not coordinate_columns:
         raise ValueError("Tidak ada kolom kunci untuk merge dengan shapefile")
     
     # Buat DataFrame khusus untuk merge
-    merge_data = df[[merge_key_column, 'Cluster']].copy()
+    key_columns = [merge_key_column] if merge_key_column is not None else []
+    key_columns += [col for col in (coordinate_columns or []) if col not in key_columns]
+    merge_data = df[key_columns + ['Cluster']]
     
     # Tambahkan informasi centroid untuk analisis spasial
+    clusters = np.asarray(clusters)
     for i, col in enumerate(numeric_cols):
-        merge_data[f'Centroid_{col}'] = [centroids[cluster, i] for cluster in clusters]
+        merge_data[f'Centroid_{col}'] = centroids[clusters, i]
     
     return merge_data
 
@@ -80,6 +79,7 @@ def visualize_clusters(
 ):
     """Membuat visualisasi cluster"""
     import matplotlib.pyplot as plt
+    from sklearn.decomposition import PCA
     
     plt.figure(figsize=(10, 8))
     
@@ -0,0 +1,93 @@
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# pandas < 3: aktifkan Copy-on-Write agar frame yang dirakit dari kolom yang sama tidak disalin
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+class SessionDataStore:
+    """
+    Penyimpanan kolumnar dataset untuk satu sesi.
+
+    Setiap data hanya disimpan sekali: kolom asli (setelah pembersihan), matriks
+    hasil normalisasi (n_baris x n_fitur, float64, read-only), dan label cluster.
+    Frame asli, frame ternormalisasi, dan frame dengan kolom Cluster dirakit
+    sebagai view di atas penyimpanan ini (Copy-on-Write), sehingga kolom numerik
+    ternormalisasi berbagi memori dengan scaled_data dan kolom non-numerik
+    berbagi memori dengan frame asli. Pemanggil yang mengubah frame hasil akan
+    mendapat salinan sendiri tanpa mengubah isi store.
+    """
+    def __init__(self, original: pd.DataFrame, numeric_columns: List[str], scaled: np.ndarray):
+        self.columns = list(original.columns)
+        self.numeric_columns = list(numeric_columns)
+        self._original = original.copy(deep=False)
+        self._scaled = np.ascontiguousarray(scaled, dtype=np.float64)
+        self._scaled.flags.writeable = False
+        self._clusters: Optional[np.ndarray] = None
+
+    def fork(self) -> 'SessionDataStore':
+        """Store baru di atas kolom dan matriks yang sama, tanpa label cluster (untuk sesi lain)"""
+        return SessionDataStore(self._original, self.numeric_columns, self._scaled)
+
+    @property
+    def scaled_data(self) -> np.ndarray:
+        """Matriks fitur ternormalisasi (read-only) untuk KMeans dan evaluasi DBI"""
+        return self._scaled
+
+    @property
+    def clusters(self) -> Optional[np.ndarray]:
+        return self._clusters
+
+    def set_clusters(self, clusters: np.ndarray):
+        """Menyimpan label cluster sekali untuk semua frame yang membutuhkan kolom Cluster"""
+        clusters = np.asarray(clusters)
+        if len(clusters) != len(self._original):
+            raise ValueError("Jumlah label cluster tidak sama dengan jumlah baris data")
+        clusters.flags.writeable = False
+        self._clusters = clusters
+
+    def original_frame(self) -> pd.DataFrame:
+        """View frame asli (setelah pembersihan missing values)"""
+        return self._original.copy(deep=False)
+
+    def normalized_frame(self) -> pd.DataFrame:
+        """View frame ternormalisasi: kolom numerik dari scaled_data, kolom lain dari frame asli"""
+        # copy=False wajib: sejak pandas 3 konstruktor menyalin array numpy secara default
+        numeric = pd.DataFrame(self._scaled, columns=self.numeric_columns, index=self._original.index, copy=False)
+        others = self._original.drop(columns=self.numeric_columns)
+        return pd.concat([others, numeric], axis=1)[self.columns]
+
+    def frame_with_clusters(self, normalized: bool = False) -> pd.DataFrame:
+        """View frame asli/ternormalisasi ditambah kolom Cluster"""
+        if self._clusters is None:
+            raise ValueError("Label cluster belum tersedia")
+        frame = self.normalized_frame() if normalized else self.original_frame()
+        return frame.assign(Cluster=pd.Series(self._clusters, index=frame.index, copy=False))
+
+    def memory_report(self) -> Dict[str, float]:
+        """
+        Pemakaian memori sesi dalam MB.
+
+        'fisik' adalah data yang benar-benar disimpan; 'tanpa_deduplikasi' adalah
+        perkiraan jika setiap frame yang dibagikan disimpan sebagai salinan sendiri
+        (frame asli, ternormalisasi, scaled_data, dan dua frame ber-Cluster).
+        """
+        mb = 1024 ** 2
+        original_bytes = int(self._original.memory_usage(deep=True).sum())
+        scaled_bytes = self._scaled.nbytes
+        cluster_bytes = self._clusters.nbytes if self._clusters is not None else 0
+
+        normalized_bytes = int(self.normalized_frame().memory_usage(deep=True).sum())
+        copies = original_bytes + normalized_bytes + scaled_bytes
+        if self._clusters is not None:
+            copies += original_bytes + normalized_bytes + 2 * cluster_bytes
+
+        return {
+            'kolom_asli': original_bytes / mb,
+            'matriks_normalisasi': scaled_bytes / mb,
+            'label_cluster': cluster_bytes / mb,
+            'fisik': (original_bytes + scaled_bytes + cluster_bytes) / mb,
+            'tanpa_deduplikasi': copies / mb,
+        }
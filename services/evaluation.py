@@ -1,10 +1,14 @@
+import threading
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.metrics import davies_bouldin_score
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import CancelledError
+from typing import List, Tuple, Dict, Any, Callable, Optional
 
 def calculate_dbi_for_k(scaled_data: np.ndarray, k: int, random_state: int = 42) -> Dict[str, Any]:
     """Menghitung DBI dan metrik lainnya untuk nilai k tertentu"""
+    # sklearn dimuat saat evaluasi pertama, bukan saat aplikasi dibuka
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import davies_bouldin_score
+    
     kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=10)
     labels = kmeans.fit_predict(scaled_data)
     centroids = kmeans.cluster_centers_
@@ -31,15 +35,32 @@ def calculate_dbi_for_k(scaled_data: np.ndarray, k: int, random_state: int = 42)
         'centroids': centroids
     }
 
-def evaluate_dbi_range(scaled_data: np.ndarray, k_min: int = 2, k_max: int = 6) -> Tuple[List[Dict[str, Any]], int, float]:
-    """Evaluasi DBI untuk rentang nilai k"""
+def evaluate_dbi_range(
+    scaled_data: np.ndarray,
+    k_min: int = 2,
+    k_max: int = 6,
+    progress_callback: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Tuple[List[Dict[str, Any]], int, float]:
+    """
+    Evaluasi DBI untuk rentang nilai k
+    
+    progress_callback(selesai, total, hasil_k) dipanggil setiap satu k selesai.
+    Jika cancel_event di-set, evaluasi berhenti sebelum k berikutnya dan
+    CancelledError dilempar.
+    """
     results = []
     dbis = []
+    total = k_max - k_min + 1
     
     for k in range(k_min, k_max + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError(f"Evaluasi DBI dibatalkan pada k={k}")
         result = calculate_dbi_for_k(scaled_data, k)
         results.append(result)
         dbis.append(result['dbi'])
+        if progress_callback is not None:
+            progress_callback(len(results), total, result)
     
     # Temukan k terbaik (DBI terkecil)
     best_idx = np.argmin(dbis)
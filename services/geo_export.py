@@ -0,0 +1,157 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Iterator
+import numpy as np
+import geopandas as gpd
+from config import (
+    GEO_EXPORT_CACHE_MB, GEO_EXPORT_CHUNK_SIZE, GEO_EXPORT_GEOJSON_BATCH_ROWS,
+    MAP_COORD_PRECISION, SHAPEFILE_SIDECAR_EXTENSIONS, LAYER_FID_COLUMN
+)
+from services.topology import to_topojson
+from utils.helpers import fingerprint_frame
+
+# Format ekspor yang didukung: label tombol, akhiran nama file, dan tipe MIME
+EXPORT_FORMATS = {
+    'geojson': {'label': 'GeoJSON', 'suffix': '_geodata.geojson', 'mime': 'application/geo+json'},
+    'topojson': {'label': 'TopoJSON (Ringkas)', 'suffix': '_geodata.topojson', 'mime': 'application/json'},
+    'shapefile': {'label': 'Shapefile (ZIP)', 'suffix': '_shapefile.zip', 'mime': 'application/zip'},
+    'flatgeobuf': {'label': 'FlatGeobuf', 'suffix': '_geodata.fgb', 'mime': 'application/octet-stream'},
+    'geoparquet': {'label': 'GeoParquet', 'suffix': '_geodata.parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+
+
+def _json_default(value):
+    """Konversi nilai numpy ke tipe Python untuk json.dumps"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _iter_file(path: str, chunk_size: int) -> Iterator[bytes]:
+    """Membaca file per potongan"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class GeoExportService:
+    """
+    Ekspor GeoDataFrame ke berbagai format, dibuat hanya saat diminta.
+    
+    iter_export menghasilkan isi file per potongan (untuk streaming ke file/HTTP);
+    export_bytes menggabungkannya dan menyimpan hasilnya di cache LRU dengan
+    kunci sidik jari data + format, dibatasi total ukuran byte.
+    """
+    def __init__(self, cache_mb: float = GEO_EXPORT_CACHE_MB, chunk_size: int = GEO_EXPORT_CHUNK_SIZE):
+        self.cache_bytes = int(cache_mb * 1024 ** 2)
+        self.chunk_size = chunk_size
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+    
+    def iter_export(self, gdf: gpd.GeoDataFrame, fmt: str, precision: int = MAP_COORD_PRECISION,
+                    layer_name: str = 'geodata') -> Iterator[bytes]:
+        """
+        Isi file ekspor untuk format tertentu, per potongan byte.
+        layer_name dipakai sebagai nama file anggota ZIP shapefile.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+        # fid layer hanya untuk keperluan internal peta, tidak ikut diekspor
+        gdf = gdf.drop(columns=LAYER_FID_COLUMN, errors='ignore')
+        if fmt == 'geojson':
+            yield from self._iter_geojson(gdf)
+        elif fmt == 'topojson':
+            data = to_topojson(gdf, precision).encode('utf-8')
+            for start in range(0, len(data), self.chunk_size):
+                yield data[start:start + self.chunk_size]
+        else:
+            yield from self._iter_file_format(gdf, fmt, layer_name)
+    
+    def _iter_geojson(self, gdf: gpd.GeoDataFrame) -> Iterator[bytes]:
+        """GeoJSON ditulis per kelompok fitur tanpa membangun satu string besar"""
+        # GeoJSON (RFC 7946) selalu dalam WGS84
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs(epsg=4326)
+        yield b'{"type":"FeatureCollection","features":['
+        for start in range(0, len(gdf), GEO_EXPORT_GEOJSON_BATCH_ROWS):
+            batch = gdf.iloc[start:start + GEO_EXPORT_GEOJSON_BATCH_ROWS]
+            body = ','.join(
+                json.dumps(feature, separators=(',', ':'), default=_json_default)
+                for feature in batch.iterfeatures(na='null', drop_id=True)
+            )
+            yield ((',' if start else '') + body).encode('utf-8')
+        yield b']}'
+    
+    def _iter_file_format(self, gdf: gpd.GeoDataFrame, fmt: str, layer_name: str) -> Iterator[bytes]:
+        """Format berbasis file ditulis ke direktori sementara lalu dibaca per potongan"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if fmt == 'flatgeobuf':
+                path = os.path.join(tmp_dir, 'export.fgb')
+                gdf.to_file(path, driver='FlatGeobuf')
+            elif fmt == 'geoparquet':
+                path = os.path.join(tmp_dir, 'export.parquet')
+                gdf.to_parquet(path, index=False)
+            else:
+                safe_name = "".join(c for c in layer_name if c.isalnum() or c in "-_") or 'geodata'
+                shp_path = os.path.join(tmp_dir, f"{safe_name}.shp")
+                gdf.to_file(shp_path, encoding='utf-8')
+                path = os.path.join(tmp_dir, 'export.zip')
+                with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    for extension in SHAPEFILE_SIDECAR_EXTENSIONS:
+                        member = shp_path[:-4] + extension
+                        if os.path.exists(member):
+                            zipf.write(member, os.path.basename(member))
+            yield from _iter_file(path, self.chunk_size)
+    
+    def export_bytes(self, gdf: gpd.GeoDataFrame, fmt: str, precision: int = MAP_COORD_PRECISION,
+                     layer_name: str = 'geodata') -> bytes:
+        """Isi file ekspor lengkap; hasil untuk data dan format yang sama diambil dari cache"""
+        key = (
+            fingerprint_frame(gdf), fmt,
+            precision if fmt == 'topojson' else None,
+            layer_name if fmt == 'shapefile' else None
+        )
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                return data
+        
+        buffer = io.BytesIO()
+        for chunk in self.iter_export(gdf, fmt, precision, layer_name):
+            buffer.write(chunk)
+        data = buffer.getvalue()
+        
+        with self._lock:
+            if len(data) <= self.cache_bytes and key not in self._cache:
+                self._cache[key] = data
+                self._cache_size += len(data)
+                while self._cache_size > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_size -= len(evicted)
+        return data
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_geo_export_service() -> GeoExportService:
+    """Instance GeoExportService bersama untuk seluruh proses"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GeoExportService()
+    return _service
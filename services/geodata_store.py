@@ -0,0 +1,118 @@
+import os
+import threading
+from typing import Optional
+import geopandas as gpd
+from config import GEODATA_STORE_DIR, GEODATA_STORE_QUOTA_MB
+from utils.file_io import write_geoparquet, read_geoparquet
+
+
+class GeoDataStore:
+    """
+    Penyimpanan GeoDataFrame hasil parsing shapefile, dengan kunci hash isi zip.
+    
+    Upload yang identik (dari sesi/pengguna mana pun) memakai entri yang sama.
+    Entri disimpan sebagai GeoParquet; mtime file dipakai sebagai waktu akses
+    terakhir untuk eviksi LRU ketika total ukuran melewati kuota.
+    """
+    def __init__(self, store_dir: str = GEODATA_STORE_DIR, quota_mb: float = GEODATA_STORE_QUOTA_MB):
+        self.store_dir = store_dir
+        self.quota_bytes = int(quota_mb * 1024 ** 2)
+        self._lock = threading.Lock()
+        os.makedirs(self.store_dir, exist_ok=True)
+    
+    def _entry_path(self, key: str) -> str:
+        """Path file GeoParquet untuk kunci tertentu"""
+        return os.path.join(self.store_dir, f"{key}.parquet")
+    
+    def contains(self, key: str) -> bool:
+        """Mengecek apakah kunci sudah ada di store"""
+        return os.path.exists(self._entry_path(key))
+    
+    def get(self, key: str) -> Optional[gpd.GeoDataFrame]:
+        """Mengambil GeoDataFrame dari store, None jika tidak ada"""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            gdf = read_geoparquet(path)
+        except Exception as e:
+            print(f"Peringatan: entri store rusak, dihapus: {e}")
+            self._remove(path)
+            return None
+        
+        # Tandai sebagai baru dipakai untuk LRU
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return gdf
+    
+    def put(self, key: str, gdf: gpd.GeoDataFrame) -> bool:
+        """Menyimpan GeoDataFrame ke store lalu menjalankan eviksi jika melebihi kuota"""
+        path = self._entry_path(key)
+        if os.path.exists(path):
+            os.utime(path, None)
+            return True
+        
+        if not write_geoparquet(gdf, path):
+            return False
+        
+        self.evict(keep=key)
+        return True
+    
+    def disk_usage(self) -> int:
+        """Total ukuran entri store dalam byte"""
+        return sum(size for _, size, _ in self._entries())
+    
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Menghapus entri paling lama tidak dipakai hingga total ukuran di bawah kuota"""
+        removed = 0
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.quota_bytes:
+                    break
+                if keep is not None and path == self._entry_path(keep):
+                    continue
+                if self._remove(path):
+                    total -= size
+                    removed += 1
+        return removed
+    
+    def _entries(self):
+        """Daftar (path, ukuran, waktu akses terakhir) untuk setiap entri"""
+        entries = []
+        for file in os.listdir(self.store_dir):
+            if not file.endswith(".parquet"):
+                continue
+            path = os.path.join(self.store_dir, file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    @staticmethod
+    def _remove(path: str) -> bool:
+        """Menghapus file entri, abaikan jika sudah dihapus proses lain"""
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_geodata_store() -> GeoDataStore:
+    """Instance GeoDataStore bersama untuk seluruh proses"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = GeoDataStore()
+    return _store
@@ -1,9 +1,17 @@
 import geopandas as gpd
+import io
 import zipfile
 import os
-import tempfile
+import shutil
 import numpy as np
-from config import SHAPEFILE_DIR
+import pandas as pd
+import shapely
+from config import (
+    SHAPEFILE_DIR, SHAPEFILE_SIDECAR_EXTENSIONS, SHAPEFILE_ATTRIBUTE_EXTENSIONS, REGION_NAME_ALIASES, LAYER_FID_COLUMN
+)
+from utils.file_io import as_binary_stream
+from services.workspace import get_workspace_manager
+from services.region_index import RegionNameIndex
 
 class GeoProcessingService:
     def __init__(self):
@@ -12,76 +20,150 @@ class GeoProcessingService:
         from config import SHAPEFILE_KEY_COLUMN
         self.name_column = SHAPEFILE_KEY_COLUMN  # Sekarang akan menggunakan 'KAB_KOTA'
     
-    def extract_shapefile_zip(self, uploaded_zip):
-        """Mengekstrak file shapefile zip yang diupload"""
+    def _select_shapefile_members(self, zip_ref):
+        """Memilih anggota arsip (.shp beserta sidecar) untuk shapefile pertama dalam zip"""
+        names = [
+            name for name in zip_ref.namelist()
+            if not name.endswith('/') and not name.startswith('__MACOSX/')
+        ]
+        shp_names = sorted(name for name in names if name.lower().endswith(".shp"))
+        if not shp_names:
+            raise ValueError("File .shp tidak ditemukan dalam arsip zip")
+        
+        base = os.path.splitext(shp_names[0])[0].lower()
+        members = {}
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if stem.lower() == base and ext.lower() in SHAPEFILE_SIDECAR_EXTENSIONS:
+                members[ext.lower()] = name
+        
+        for required in ('.shp', '.shx', '.dbf'):
+            if required not in members:
+                raise ValueError(f"File {required} tidak ditemukan dalam arsip zip")
+        return members
+    
+    def _build_member_zip(self, zip_ref, members, extensions):
+        """Membuat zip di memori yang hanya berisi anggota terpilih (tanpa kompresi ulang)"""
+        buffer = io.BytesIO()
+        base = os.path.splitext(os.path.basename(members['.shp']))[0]
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as member_zip:
+            for ext in extensions:
+                if ext in members:
+                    member_zip.writestr(f"{base}{ext}", zip_ref.read(members[ext]))
+        buffer.seek(0)
+        return buffer
+    
+    def preflight_shapefile_zip(self, uploaded_zip):
+        """
+        Membaca hanya tabel atribut shapefile (tanpa geometri) untuk validasi awal.
+        
+        Hanya .dbf/.shx/.cpg yang didekompresi sehingga arsip yang salah gagal
+        dalam hitungan milidetik, sebelum geometri lengkap di-parse.
+        """
+        with zipfile.ZipFile(as_binary_stream(uploaded_zip)) as zip_ref:
+            members = self._select_shapefile_members(zip_ref)
+            attribute_zip = self._build_member_zip(zip_ref, members, SHAPEFILE_ATTRIBUTE_EXTENSIONS)
+        
         try:
-            # Simpan file zip sementara
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_zip:
-                tmp_zip.write(uploaded_zip.getvalue())
-                tmp_zip_path = tmp_zip.name
-            
-            # Buat direktori untuk ekstraksi
-            extract_dir = os.path.join(SHAPEFILE_DIR, "temp_extracted")
-            os.makedirs(extract_dir, exist_ok=True)
-            
-            # Ekstrak file zip
-            with zipfile.ZipFile(tmp_zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_dir)
-            
-            # Cari file .shp
-            shp_file = None
-            for file in os.listdir(extract_dir):
-                if file.endswith(".shp"):
-                    shp_file = os.path.join(extract_dir, file)
-                    break
+            attributes = gpd.read_file(attribute_zip, ignore_geometry=True)
+        except Exception as e:
+            raise Exception(f"Gagal membaca tabel atribut shapefile: {str(e)}")
+        
+        if self.name_column not in attributes.columns:
+            raise ValueError(f"Kolom {self.name_column} tidak ditemukan dalam shapefile")
+        
+        return attributes
+    
+    def validate_merge_keys(self, attributes, clustering_data, merge_key_column):
+        """Memastikan minimal satu nama wilayah cocok sebelum geometri dimuat"""
+        if merge_key_column not in clustering_data.columns:
+            raise ValueError(f"Kolom {merge_key_column} tidak ditemukan dalam data clustering")
+        
+        region_index = RegionNameIndex(attributes[self.name_column])
+        clustering_data_std, _ = self.standardize_region_names(clustering_data, merge_key_column, region_index)
+        matched = int(clustering_data_std[merge_key_column].isin(attributes[self.name_column]).sum())
+        if matched == 0:
+            raise ValueError(
+                f"Tidak ada nama wilayah pada kolom '{merge_key_column}' yang cocok dengan "
+                f"kolom {self.name_column} pada shapefile"
+            )
+        return matched
+    
+    def read_shapefile_zip_buffer(self, uploaded_zip):
+        """Membaca shapefile zip langsung dari buffer di memori (virtual filesystem GDAL)"""
+        # Hanya anggota shapefile yang dibutuhkan yang diteruskan ke GDAL
+        with zipfile.ZipFile(as_binary_stream(uploaded_zip)) as zip_ref:
+            members = self._select_shapefile_members(zip_ref)
+            shapefile_zip = self._build_member_zip(zip_ref, members, SHAPEFILE_SIDECAR_EXTENSIONS)
+        
+        try:
+            return gpd.read_file(shapefile_zip)
+        except Exception as e:
+            raise Exception(f"Gagal membaca shapefile dari buffer: {str(e)}")
+    
+    def extract_shapefile_zip(self, uploaded_zip, extract_dir=None):
+        """Mengekstrak file shapefile zip yang diupload ke direktori kerja terisolasi"""
+        created_dir = False
+        try:
+            # Setiap upload mendapat direktori sendiri agar tidak bertabrakan antar sesi
+            if extract_dir is None:
+                extract_dir = get_workspace_manager().create("shared")
+                created_dir = True
             
-            if not shp_file:
-                raise ValueError("File .shp tidak ditemukan dalam arsip zip")
+            # Ekstrak hanya anggota shapefile yang dibutuhkan, langsung dari buffer
+            with zipfile.ZipFile(as_binary_stream(uploaded_zip), 'r') as zip_ref:
+                members = self._select_shapefile_members(zip_ref)
+                base = os.path.splitext(os.path.basename(members['.shp']))[0]
+                for ext, name in members.items():
+                    with zip_ref.open(name) as src, open(os.path.join(extract_dir, f"{base}{ext}"), 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
             
             # Baca shapefile
-            gdf = gpd.read_file(shp_file)
-            
-            # Bersihkan file sementara
-            os.unlink(tmp_zip_path)
+            gdf = gpd.read_file(os.path.join(extract_dir, f"{base}.shp"))
             
             return gdf, extract_dir
             
         except Exception as e:
-            # Bersihkan file sementara jika ada error
-            if 'tmp_zip_path' in locals() and os.path.exists(tmp_zip_path):
-                os.unlink(tmp_zip_path)
+            if created_dir:
+                get_workspace_manager().release(extract_dir)
             raise Exception(f"Gagal mengekstrak shapefile: {str(e)}")
     
-    def standardize_region_names(self, data, merge_key_column):
-        """Standarisasi nama wilayah untuk memastikan match dengan shapefile"""
-        name_mapping = {
-            'KOTA BAUBAU': 'KOTA BAU BAU',
-            # Tambahkan mapping lainnya jika diperlukan
-        }
+    def standardize_region_names(self, data, merge_key_column, region_index=None):
+        """
+        Standarisasi nama wilayah untuk memastikan match dengan shapefile.
         
-        data_standardized = data.copy()
-        data_standardized[merge_key_column] = data_standardized[merge_key_column].str.upper()
+        Returns:
+            (data dengan kolom kunci terstandarisasi, {nama asli: nama shapefile} hasil pencocokan fuzzy)
+        """
+        if region_index is None:
+            # Tanpa layer: cukup huruf besar + alias nama utuh (bukan substring)
+            standardized = data[merge_key_column].str.upper().replace(REGION_NAME_ALIASES)
+            fuzzy_matches = {}
+        else:
+            standardized, fuzzy_matches = region_index.resolve(data[merge_key_column])
         
-        for old_name, new_name in name_mapping.items():
-            data_standardized[merge_key_column] = data_standardized[merge_key_column].str.replace(old_name, new_name)
-        
-        return data_standardized
+        # Hanya kolom kunci yang diganti; kolom lain tidak disalin ulang
+        return data.assign(**{merge_key_column: standardized}), fuzzy_matches
     
-    def merge_with_shapefile(self, gdf, clustering_data, merge_key_column, numeric_cols):
+    def merge_with_shapefile(self, gdf, clustering_data, merge_key_column, numeric_cols, region_index=None):
         """Menggabungkan data clustering dengan shapefile"""
-        # Standardisasi nama wilayah
-        clustering_data_std = self.standardize_region_names(clustering_data, merge_key_column)
-        
         # Pastikan kolom KAB_KOTA ada di shapefile
         if self.name_column not in gdf.columns:
             raise ValueError(f"Kolom {self.name_column} tidak ditemukan dalam shapefile")
         
+        # Standardisasi nama wilayah melalui indeks nama layer
+        if region_index is None:
+            region_index = RegionNameIndex(gdf[self.name_column])
+        clustering_data_std, fuzzy_matches = self.standardize_region_names(
+            clustering_data, merge_key_column, region_index
+        )
+        
         # Pastikan kolom Cluster ada di data clustering
         if 'Cluster' not in clustering_data_std.columns:
             raise ValueError("Kolom 'Cluster' tidak ditemukan dalam data clustering")
         
-        # Merge shapefile dengan data clustering
-        gdf_merged = gdf.merge(
+        # Merge shapefile dengan data clustering; posisi baris layer ikut sebagai fid
+        gdf_merged = gdf.assign(**{LAYER_FID_COLUMN: np.arange(len(gdf))}).merge(
             clustering_data_std,
             left_on=self.name_column,
             right_on=merge_key_column,
@@ -96,7 +178,146 @@ class GeoProcessingService:
             'merged_gdf': gdf_merged,
             'missing_in_shapefile': missing_in_shapefile,
             'missing_in_data': missing_in_data,
+            # Nama data yang dicocokkan secara fuzzy, untuk diperiksa pengguna
+            'fuzzy_matches': pd.DataFrame({
+                merge_key_column: list(fuzzy_matches.keys()),
+                self.name_column: list(fuzzy_matches.values())
+            }, dtype=object),
             'total_matched': len(gdf_merged[gdf_merged['Cluster'].notna()])
         }
         
-        return merge_report
\ No newline at end of file
+        return merge_report
+    
+    def dissolve_by_cluster(self, gdf_merged, numeric_cols=None):
+        """
+        Menggabungkan geometri wilayah per Cluster menjadi satu (multi)poligon per cluster.
+        
+        Wilayah dikelompokkan sekali lewat faktorisasi, lalu setiap kelompok
+        di-union dengan coverage_union_all (batas bersama cukup dihapus, jauh lebih
+        cepat dari union umum); union umum dipakai jika coverage tidak ter-node
+        dengan benar atau hasilnya tidak valid.
+        
+        Returns:
+            gpd.GeoDataFrame: Cluster, Jumlah_Wilayah, Centroid_* (jika ada), dan geometri
+        """
+        clusters = pd.to_numeric(gdf_merged['Cluster'], errors='coerce')
+        has_data = clusters.notna().to_numpy() & gdf_merged.geometry.notna().to_numpy()
+        codes, uniques = pd.factorize(clusters[has_data].astype(int), sort=True)
+        geometries = gdf_merged.geometry.values[has_data]
+        
+        order = np.argsort(codes, kind='stable')
+        offsets = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        coverage_union = getattr(shapely, 'coverage_union_all', None)
+        
+        dissolved = []
+        for pos in range(len(uniques)):
+            members = geometries[order[offsets[pos]:offsets[pos + 1]]]
+            geometry = None
+            if coverage_union is not None:
+                try:
+                    geometry = coverage_union(members)
+                except shapely.errors.GEOSException:
+                    # Coverage tidak ter-node dengan benar (batas bersama tidak identik)
+                    pass
+            if geometry is None or not geometry.is_valid:
+                geometry = shapely.union_all(members)
+            dissolved.append(geometry)
+        
+        overview = pd.DataFrame({
+            'Cluster': np.asarray(uniques, dtype=int),
+            'Jumlah_Wilayah': np.diff(offsets)
+        })
+        # Rata-rata centroid per cluster (mode nama: nilainya sama di seluruh wilayah cluster)
+        centroid_cols = [
+            f'Centroid_{col}' for col in (numeric_cols or []) if f'Centroid_{col}' in gdf_merged.columns
+        ]
+        if centroid_cols:
+            centroid_means = gdf_merged.loc[has_data, centroid_cols].groupby(codes).mean()
+            overview = overview.join(centroid_means.reset_index(drop=True))
+        
+        return gpd.GeoDataFrame(overview, geometry=dissolved, crs=gdf_merged.crs)
+    
+    def assign_points_to_polygons(self, gdf, data, lon_column, lat_column, points_crs="EPSG:4326"):
+        """
+        Menentukan poligon untuk setiap titik (point-in-polygon) memakai STRtree.
+        
+        STRtree menyaring pasangan kandidat berdasarkan bounding box secara massal,
+        lalu setiap poligon (prepared) diuji sekaligus terhadap semua kandidatnya.
+        
+        Returns:
+            np.ndarray: posisi baris poligon untuk setiap titik, -1 jika di luar semua poligon
+        """
+        lon = pd.to_numeric(data[lon_column], errors='coerce').to_numpy(dtype=float)
+        lat = pd.to_numeric(data[lat_column], errors='coerce').to_numpy(dtype=float)
+        points = shapely.points(lon, lat)
+        if gdf.crs is not None and gdf.crs != points_crs:
+            points = gpd.GeoSeries(points, crs=points_crs).to_crs(gdf.crs).values
+            lon, lat = shapely.get_x(points), shapely.get_y(points)
+        
+        geometries = gdf.geometry.values
+        tree = shapely.STRtree(geometries)
+        point_idx, polygon_idx = tree.query(points)
+        
+        # Kelompokkan kandidat per poligon
+        order = np.argsort(polygon_idx, kind='stable')
+        point_idx, polygon_idx = point_idx[order], polygon_idx[order]
+        offsets = np.searchsorted(polygon_idx, np.arange(len(geometries) + 1))
+        
+        assignment = np.full(len(points), -1, dtype=np.int64)
+        for pos in range(len(geometries)):
+            candidates = point_idx[offsets[pos]:offsets[pos + 1]]
+            # Titik di batas dua poligon: poligon pertama yang menang
+            candidates = candidates[assignment[candidates] < 0]
+            if len(candidates) == 0:
+                continue
+            geometry = geometries[pos]
+            shapely.prepare(geometry)
+            hit = shapely.intersects_xy(geometry, lon[candidates], lat[candidates])
+            assignment[candidates[hit]] = pos
+        
+        return assignment
+    
+    def merge_points_with_shapefile(self, gdf, clustering_data, lon_column, lat_column, numeric_cols):
+        """Menggabungkan data clustering tingkat titik dengan shapefile melalui spatial join"""
+        if self.name_column not in gdf.columns:
+            raise ValueError(f"Kolom {self.name_column} tidak ditemukan dalam shapefile")
+        if 'Cluster' not in clustering_data.columns:
+            raise ValueError("Kolom 'Cluster' tidak ditemukan dalam data clustering")
+        
+        base_gdf = gdf.reset_index(drop=True)
+        assignment = self.assign_points_to_polygons(base_gdf, clustering_data, lon_column, lat_column)
+        inside = assignment >= 0
+        
+        points_inside = clustering_data[inside].assign(_polygon=assignment[inside])
+        points_inside[self.name_column] = base_gdf[self.name_column].to_numpy()[assignment[inside]]
+        
+        # Agregasi per poligon: cluster dominan, jumlah titik, rata-rata centroid
+        grouped = points_inside.groupby('_polygon')
+        cluster_counts = points_inside.groupby(['_polygon', 'Cluster']).size().reset_index(name='n')
+        dominant = (
+            cluster_counts.sort_values(['_polygon', 'n'], ascending=[True, False])
+            .drop_duplicates('_polygon')
+            .set_index('_polygon')['Cluster']
+        )
+        aggregated = pd.DataFrame({
+            'Cluster': dominant,
+            'Jumlah_Titik': grouped.size()
+        })
+        centroid_cols = [f'Centroid_{col}' for col in numeric_cols if f'Centroid_{col}' in clustering_data.columns]
+        if centroid_cols:
+            aggregated = aggregated.join(grouped[centroid_cols].mean())
+        
+        gdf_merged = base_gdf.assign(**{LAYER_FID_COLUMN: np.arange(len(base_gdf))}).join(aggregated)
+        
+        merge_report = {
+            'merged_gdf': gdf_merged,
+            'missing_in_shapefile': clustering_data[~inside],
+            'missing_in_data': base_gdf[~base_gdf.index.isin(aggregated.index)],
+            'total_matched': len(aggregated),
+            'merge_mode': 'spatial',
+            'points_assigned': int(inside.sum()),
+            'points_outside': int((~inside).sum())
+        }
+        
+        return merge_report
+
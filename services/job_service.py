@@ -0,0 +1,357 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from config import (
+    ALLOWED_FILE_EXTENSIONS, MAX_FILE_SIZE, JOB_DIR, JOB_SERVER_HOST, JOB_SERVER_PORT,
+    JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_TTL_SECONDS
+)
+from models.pipeline_model import JobStatus, PipelineOptions
+from services.geo_export import EXPORT_FORMATS
+from services.pipeline import run_pipeline, init_pipeline_worker
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class JobQueueFullError(RuntimeError):
+    """Antrean job penuh; klien sebaiknya mencoba lagi nanti"""
+
+
+class JobManager:
+    """
+    Antrean job clustering di atas process pool berukuran tetap.
+
+    Setiap job menjalankan run_pipeline untuk satu CSV di proses worker.
+    Struktur berkas: JOB_DIR/<job_id>/input/<file.csv> dan JOB_DIR/<job_id>/output/.
+    Status 'running' berarti job sudah diambil pool (termasuk yang menunggu
+    di antrean internal pool), bukan jaminan sedang dieksekusi.
+    """
+    def __init__(
+        self,
+        root: str = JOB_DIR,
+        workers: int = JOB_WORKERS,
+        queue_limit: int = JOB_QUEUE_LIMIT,
+        ttl_seconds: float = JOB_TTL_SECONDS
+    ):
+        self.root = root
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, JobStatus] = {}
+        self._futures: Dict[str, Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_pipeline_worker)
+        return self._pool
+
+    def submit(self, data: bytes, filename: str, options: PipelineOptions) -> JobStatus:
+        """
+        Menyimpan CSV dan memasukkan job ke antrean.
+
+        Raises:
+            ValueError: jika file atau opsi tidak valid
+            JobQueueFullError: jika job aktif sudah mencapai queue_limit
+        """
+        filename = os.path.basename(filename or 'data.csv')
+        if os.path.splitext(filename)[1].lower() not in ALLOWED_FILE_EXTENSIONS:
+            raise ValueError(f"Ekstensi file tidak didukung: {filename}")
+        if not data:
+            raise ValueError("Isi file kosong")
+        if len(data) > MAX_FILE_SIZE:
+            raise ValueError(f"Ukuran file melebihi batas {MAX_FILE_SIZE // (1024 * 1024)}MB")
+        if options.k_min < 2 or options.k_max < options.k_min:
+            raise ValueError("Rentang k tidak valid: k_min minimal 2 dan k_max >= k_min")
+        unknown = [fmt for fmt in options.export_formats if fmt not in EXPORT_FORMATS]
+        if unknown:
+            raise ValueError(f"Format ekspor tidak dikenal: {', '.join(unknown)}")
+
+        self.reap_expired()
+
+        with self._lock:
+            active = sum(job.status in ACTIVE_STATUSES for job in self._jobs.values())
+            if active >= self.queue_limit:
+                raise JobQueueFullError(f"Antrean penuh ({active} job aktif)")
+
+            job_id = uuid.uuid4().hex
+            input_dir = os.path.join(self._job_dir(job_id), 'input')
+            output_dir = os.path.join(self._job_dir(job_id), 'output')
+            os.makedirs(input_dir)
+            input_path = os.path.join(input_dir, filename)
+            with open(input_path, 'wb') as f:
+                f.write(data)
+
+            try:
+                future = self._get_pool().submit(run_pipeline, input_path, output_dir, options)
+            except BrokenProcessPool:
+                # Worker mati (mis. kehabisan memori): buat pool baru sekali
+                self._pool = None
+                future = self._get_pool().submit(run_pipeline, input_path, output_dir, options)
+
+            job = JobStatus(
+                job_id=job_id, status='queued', input_file=filename,
+                options=options, created_at=time.time()
+            )
+            self._jobs[job_id] = job
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        return job.model_copy()
+
+    def _on_done(self, job_id: str, future: Future):
+        """Mencatat hasil job (dipanggil oleh thread pool saat future selesai)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.finished_at = time.time()
+            if future.cancelled():
+                job.status = 'cancelled'
+            elif future.exception() is not None:
+                job.status = 'error'
+                job.error = str(future.exception())
+            else:
+                job.status = 'done'
+                job.result = future.result()
+            self._futures.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Salinan status job, atau None jika tidak dikenal"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            future = self._futures.get(job_id)
+            if job.status == 'queued' and future is not None and future.running():
+                job.status = 'running'
+            return job.model_copy()
+
+    def list(self) -> List[JobStatus]:
+        """Status semua job, terbaru lebih dulu"""
+        with self._lock:
+            job_ids = list(self._jobs)
+        jobs = [self.get(job_id) for job_id in job_ids]
+        return sorted((job for job in jobs if job is not None), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Membatalkan job yang masih antre; job yang sudah berjalan tidak bisa dibatalkan"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        return future is not None and future.cancel()
+
+    def delete(self, job_id: str) -> bool:
+        """Menghapus job yang tidak aktif beserta berkasnya"""
+        self.cancel(job_id)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ACTIVE_STATUSES:
+                return False
+            del self._jobs[job_id]
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+        return True
+
+    def output_path(self, job_id: str, name: str) -> Optional[str]:
+        """Path berkas hasil job; hanya berkas yang tercatat di hasil pipeline yang bisa diambil"""
+        job = self.get(job_id)
+        if job is None or job.result is None:
+            return None
+        for path in job.result.outputs:
+            if os.path.basename(path) == name and os.path.exists(path):
+                return path
+        return None
+
+    def reap_expired(self):
+        """Menghapus job selesai yang lebih tua dari TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+        for job_id in expired:
+            self.delete(job_id)
+
+    def stats(self) -> dict:
+        """Ringkasan jumlah job per status"""
+        counts = {}
+        for job in self.list():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'workers': self.workers, 'queue_limit': self.queue_limit, 'jobs': counts}
+
+    def shutdown(self, wait: bool = True):
+        """Menghentikan pool; job yang masih antre dibatalkan"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+def _parse_options(query: Dict[str, List[str]]) -> PipelineOptions:
+    """Opsi pipeline dari query string (?k_min=2&k_max=6&formats=geojson,shapefile&map=0&geo=1)"""
+    def value(name, default=None):
+        return query.get(name, [default])[0]
+
+    def flag(name, default):
+        raw = value(name)
+        return default if raw is None else raw.lower() not in ('0', 'false', 'no')
+
+    try:
+        options = {'k_min': int(value('k_min', 2)), 'k_max': int(value('k_max', 6))}
+    except ValueError:
+        raise ValueError("k_min dan k_max harus bilangan bulat")
+    formats = value('formats')
+    if formats is not None:
+        options['export_formats'] = [fmt.strip() for fmt in formats.split(',') if fmt.strip()]
+    options['write_map'] = flag('map', True)
+    options['skip_geo'] = not flag('geo', True)
+    return PipelineOptions(**options)
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoint JSON untuk JobManager:
+        POST   /jobs?filename=data.csv&k_min=2&k_max=6   (body: isi CSV)
+        GET    /jobs, /jobs/<id>, /jobs/<id>/result, /jobs/<id>/files/<nama>
+        DELETE /jobs/<id>
+        GET    /health
+    """
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def manager(self) -> JobManager:
+        return self.server.manager
+
+    def _send_json(self, code: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, code: int, message: str):
+        self._send_json(code, {'error': message})
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        return parts, parse_qs(parsed.query)
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ['jobs']:
+            return self._send_error_json(404, "Endpoint tidak ditemukan")
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_FILE_SIZE:
+            # Body tidak dibaca, jadi koneksi tidak bisa dipakai ulang
+            self.close_connection = True
+            return self._send_error_json(413, f"Ukuran file melebihi batas {MAX_FILE_SIZE // (1024 * 1024)}MB")
+        data = self.rfile.read(length)
+
+        try:
+            options = _parse_options(query)
+            job = self.manager.submit(data, query.get('filename', ['data.csv'])[0], options)
+        except ValueError as e:
+            return self._send_error_json(400, str(e))
+        except JobQueueFullError as e:
+            return self._send_error_json(503, str(e))
+
+        self._send_json(202, job.model_dump(mode='json'))
+
+    def do_GET(self):
+        parts, _ = self._route()
+
+        if parts == ['health']:
+            return self._send_json(200, self.manager.stats())
+        if parts == ['jobs']:
+            return self._send_json(200, [job.model_dump(mode='json', exclude={'result'}) for job in self.manager.list()])
+        if len(parts) < 2 or parts[0] != 'jobs':
+            return self._send_error_json(404, "Endpoint tidak ditemukan")
+
+        job = self.manager.get(parts[1])
+        if job is None:
+            return self._send_error_json(404, "Job tidak ditemukan")
+
+        if len(parts) == 2:
+            return self._send_json(200, job.model_dump(mode='json', exclude={'result'}))
+
+        if parts[2] == 'result' and len(parts) == 3:
+            if job.status in ACTIVE_STATUSES:
+                return self._send_error_json(409, f"Job belum selesai (status: {job.status})")
+            if job.status != 'done':
+                return self._send_error_json(500, job.error or f"Job {job.status}")
+            result = job.result.model_dump(mode='json')
+            # Path lokal diganti nama berkas yang bisa diambil lewat /files/<nama>
+            result['outputs'] = [os.path.basename(path) for path in job.result.outputs]
+            result.pop('input_file', None)
+            result.pop('output_dir', None)
+            return self._send_json(200, result)
+
+        if parts[2] == 'files' and len(parts) == 4:
+            path = self.manager.output_path(job.job_id, parts[3])
+            if path is None:
+                return self._send_error_json(404, "Berkas hasil tidak ditemukan")
+            size = os.path.getsize(path)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(size))
+            self.send_header('Content-Disposition', f'attachment; filename="{parts[3]}"')
+            self.end_headers()
+            with open(path, 'rb') as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+
+        self._send_error_json(404, "Endpoint tidak ditemukan")
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'jobs':
+            return self._send_error_json(404, "Endpoint tidak ditemukan")
+        job = self.manager.get(parts[1])
+        if job is None:
+            return self._send_error_json(404, "Job tidak ditemukan")
+        if not self.manager.delete(job.job_id):
+            return self._send_error_json(409, "Job sedang berjalan dan tidak bisa dihapus")
+        self._send_json(200, {'job_id': job.job_id, 'deleted': True})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class JobServer:
+    """Server HTTP untuk JobManager; request ditangani per thread, job dijalankan di process pool"""
+    def __init__(self, manager: Optional[JobManager] = None,
+                 host: str = JOB_SERVER_HOST, port: int = JOB_SERVER_PORT):
+        self.manager = manager or JobManager()
+        self._server = ThreadingHTTPServer((host, port), _JobRequestHandler)
+        self._server.daemon_threads = True
+        self._server.manager = self.manager
+        self.host, self.port = self._server.server_address[:2]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def serve_forever(self):
+        """Menjalankan server sampai dihentikan (Ctrl+C atau shutdown())"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.manager.shutdown(wait=False)
+
+    def shutdown(self):
+        self._server.shutdown()
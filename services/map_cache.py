@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+from config import MAP_RENDER_CACHE_SIZE
+
+
+class MapRenderCache:
+    """
+    Cache HTML peta yang sudah dirender, dengan kunci sidik jari input peta.
+    
+    Rerun Streamlit yang tidak mengubah input peta cukup menampilkan HTML
+    dari cache; entri paling lama tidak dipakai dibuang saat kapasitas penuh (LRU).
+    """
+    def __init__(self, max_entries: int = MAP_RENDER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[str]:
+        """Mengambil HTML untuk kunci tertentu, None jika belum ada"""
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+    
+    def put(self, key: Hashable, html: str):
+        """Menyimpan HTML dan membuang entri LRU jika melebihi kapasitas"""
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Mengosongkan cache"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,388 @@
+import html
+import json
+from typing import List, Optional
+import pandas as pd
+from branca.element import MacroElement, Element
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from jinja2 import Template
+
+
+class LabelLayer(MacroElement):
+    """
+    Layer label wilayah ringan untuk peta Folium.
+    
+    Semua label dikirim sebagai satu array JSON [lat, lon, nama, min_zoom];
+    marker dibuat di browser dan hanya label dengan min_zoom <= zoom saat ini
+    yang berada di dalam viewport yang ditampilkan (decluttering).
+    """
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+            <style>
+                .region-label div {
+                    font-size: 9px; font-weight: bold; color: black; white-space: nowrap;
+                    transform: translate(-50%, -50%);
+                    text-shadow: -1px -1px 0 white, 1px -1px 0 white, -1px 1px 0 white, 1px 1px 0 white;
+                }
+            </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+            (function() {
+                var map = {{ this._parent.get_name() }};
+                var labels = {{ this.data }};
+                var group = L.layerGroup().addTo(map);
+                var markers = new Array(labels.length);
+                function update() {
+                    var zoom = map.getZoom();
+                    var bounds = map.getBounds().pad(0.2);
+                    for (var i = 0; i < labels.length; i++) {
+                        var d = labels[i];
+                        var visible = zoom >= d[3] && bounds.contains([d[0], d[1]]);
+                        if (visible && !markers[i]) {
+                            markers[i] = L.marker([d[0], d[1]], {
+                                interactive: false,
+                                keyboard: false,
+                                icon: L.divIcon({className: 'region-label', html: '<div>' + d[2] + '</div>', iconSize: null})
+                            });
+                            group.addLayer(markers[i]);
+                        } else if (!visible && markers[i]) {
+                            group.removeLayer(markers[i]);
+                            markers[i] = null;
+                        }
+                    }
+                }
+                map.on('zoomend moveend', update);
+                map.whenReady(update);
+            })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, anchors: pd.DataFrame, label_column: str):
+        super().__init__()
+        self._name = "LabelLayer"
+        rows = zip(
+            anchors['lat'].round(5).tolist(),
+            anchors['lon'].round(5).tolist(),
+            [html.escape(str(name)) for name in anchors[label_column].tolist()],
+            anchors['min_zoom'].astype(int).tolist()
+        )
+        self.data = json.dumps([list(row) for row in rows], separators=(',', ':'))
+
+
+
+class ChoroplethLayer(JSCSSMixin, Layer):
+    """
+    Layer poligon choropleth dengan satu aturan style bersama di browser.
+    
+    Warna dan opasitas isi sudah dihitung di Python sebagai properti fitur
+    (fill_color, fill_opacity), sehingga tidak ada style_function Python yang
+    dipanggil per fitur dan tidak ada dict style per fitur di HTML.
+    data berupa TopoJSON (object_name wajib) atau GeoJSON FeatureCollection.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var data = {{ this.data }};
+                var features = {% if this.object_name %}topojson.feature(data, data.objects[{{ this.object_name|tojson }}]){% else %}data{% endif %};
+                var tooltipFields = {{ this.tooltip_fields|tojson }};
+                var popupFields = {{ this.popup_fields|tojson }};
+                var highlight = {{ this.highlight_style|tojson }};
+                function escape(value) {
+                    if (value === null || value === undefined) { return ''; }
+                    if (typeof value === 'number') { value = value.toLocaleString(); }
+                    return String(value).replace(/[&<>"']/g, function(c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+                function rows(props, fields) {
+                    return fields.map(function(f) {
+                        return '<tr><th>' + escape(f[1]) + '</th><td>' + escape(props[f[0]]) + '</td></tr>';
+                    }).join('');
+                }
+                var layer = L.geoJson(features, {
+                    style: function(feature) {
+                        return {
+                            fillColor: feature.properties.fill_color,
+                            fillOpacity: feature.properties.fill_opacity,
+                            color: {{ this.line_color|tojson }},
+                            weight: {{ this.line_weight|tojson }}
+                        };
+                    },
+                    onEachFeature: function(feature, featureLayer) {
+                        var props = feature.properties;
+                        if (tooltipFields.length) {
+                            featureLayer.bindTooltip('<table>' + rows(props, tooltipFields) + '</table>', {sticky: true});
+                        }
+                        if (popupFields.length) {
+                            featureLayer.bindPopup('<table>' + rows(props, popupFields) + '</table>');
+                        }
+                        featureLayer.on({
+                            mouseover: function(e) { e.target.setStyle(highlight); },
+                            mouseout: function(e) { layer.resetStyle(e.target); }
+                        });
+                    }
+                });
+                return layer;
+            })();
+            {%- if this.show %}
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }});
+            {%- endif %}
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data: dict, object_name: Optional[str] = None,
+                 tooltip_fields: Optional[List[str]] = None, tooltip_aliases: Optional[List[str]] = None,
+                 popup_fields: Optional[List[str]] = None, popup_aliases: Optional[List[str]] = None,
+                 line_color: str = 'black', line_weight: float = 1,
+                 highlight_style: Optional[dict] = None, name: Optional[str] = None,
+                 overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "ChoroplethLayer"
+        self.object_name = object_name
+        # Decoder TopoJSON hanya dimuat jika data berupa TopoJSON
+        self.default_js = [
+            ("topojson", "https://cdnjs.cloudflare.com/ajax/libs/topojson/1.6.9/topojson.min.js")
+        ] if object_name else []
+        # '</' di-escape agar isi atribut tidak bisa menutup tag <script>
+        self.data = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+        self.tooltip_fields = list(zip(tooltip_fields or [], tooltip_aliases or tooltip_fields or []))
+        self.popup_fields = list(zip(popup_fields or [], popup_aliases or popup_fields or []))
+        self.line_color = line_color
+        self.line_weight = line_weight
+        self.highlight_style = highlight_style or {}
+
+
+class MultiChoroplethLayer(JSCSSMixin, Layer):
+    """
+    Beberapa layer choropleth yang memakai satu payload geometri.
+    
+    Geometri (TopoJSON/GeoJSON) hanya berisi kolom label; setiap layer atribut
+    dikirim sebagai satu array nilai sejajar urutan fitur ditambah tabel kelas
+    warnanya. Pergantian layer di browser hanya memanggil setStyle, tanpa
+    mengirim atau membangun ulang geometri.
+    
+    Setiap entri attribute_layers berbentuk:
+        {'name': str, 'kind': 'categorical' | 'numeric', 'values': list,
+         'classes': [{'value' | 'max': ..., 'color': str, 'label': str}, ...]}
+    Kelas kategorikal dicocokkan lewat 'value'; kelas numerik lewat batas
+    atas 'max' (terurut naik).
+    """
+    _template = Template("""
+        {% macro header(this, kwargs) %}
+            <style>
+                .choropleth-control { background: white; padding: 6px 8px; border: 1px solid grey;
+                    border-radius: 5px; font-size: 12px; color: black; }
+                .choropleth-control label { display: block; margin: 0; cursor: pointer; }
+                .choropleth-control .legend-item i { width: 15px; height: 15px; display: inline-block;
+                    margin-right: 5px; border: 1px solid #000; vertical-align: middle; }
+            </style>
+        {% endmacro %}
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var map = {{ this._parent.get_name() }};
+                var data = {{ this.data }};
+                var features = {% if this.object_name %}topojson.feature(data, data.objects[{{ this.object_name|tojson }}]){% else %}data{% endif %};
+                var layers = {{ this.attribute_layers }};
+                var labelField = {{ this.label_field|tojson }};
+                var noData = {{ this.no_data_style|tojson }};
+                var highlight = {{ this.highlight_style|tojson }};
+                var active = 0;
+                // Indeks fitur = posisi nilai di array layer (fitur tanpa geometri tetap dihitung)
+                features.features.forEach(function(feature, i) { feature.properties._i = i; });
+                function escape(value) {
+                    if (value === null || value === undefined) { return ''; }
+                    if (typeof value === 'number') { value = value.toLocaleString(); }
+                    return String(value).replace(/[&<>"']/g, function(c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+                function colorOf(spec, value) {
+                    if (value === null || value === undefined) { return null; }
+                    for (var c = 0; c < spec.classes.length; c++) {
+                        var cls = spec.classes[c];
+                        if (spec.kind === 'categorical' ? cls.value === value : value <= cls.max) { return cls.color; }
+                    }
+                    return spec.kind === 'categorical' ? null : spec.classes[spec.classes.length - 1].color;
+                }
+                function style(feature) {
+                    var spec = layers[active];
+                    var color = colorOf(spec, spec.values[feature.properties._i]);
+                    return {
+                        fillColor: color || noData.color,
+                        fillOpacity: color ? {{ this.fill_opacity|tojson }} : noData.opacity,
+                        color: {{ this.line_color|tojson }},
+                        weight: {{ this.line_weight|tojson }}
+                    };
+                }
+                function row(name, value) {
+                    return '<tr><th>' + escape(name) + ': </th><td>' + escape(value) + '</td></tr>';
+                }
+                var layer = L.geoJson(features, {
+                    style: style,
+                    onEachFeature: function(feature, featureLayer) {
+                        var i = feature.properties._i;
+                        featureLayer.bindTooltip(function() {
+                            var spec = layers[active];
+                            return '<table>' + row({{ this.label_alias|tojson }}, feature.properties[labelField]) +
+                                row(spec.name, spec.values[i]) + '</table>';
+                        }, {sticky: true});
+                        featureLayer.bindPopup(function() {
+                            var html = row({{ this.label_alias|tojson }}, feature.properties[labelField]);
+                            for (var l = 0; l < layers.length; l++) { html += row(layers[l].name, layers[l].values[i]); }
+                            return '<table>' + html + '</table>';
+                        });
+                        featureLayer.on({
+                            mouseover: function(e) { e.target.setStyle(highlight); },
+                            mouseout: function(e) { layer.resetStyle(e.target); }
+                        });
+                    }
+                }).addTo(map);
+
+                var control = L.control({position: 'topright'});
+                var legend = L.control({position: 'bottomleft'});
+                control.onAdd = function() {
+                    var div = L.DomUtil.create('div', 'choropleth-control');
+                    div.innerHTML = '<b>Layer</b>' + layers.map(function(spec, l) {
+                        return '<label><input type="radio" name="{{ this.get_name() }}_active" value="' + l + '"' +
+                            (l === active ? ' checked' : '') + '> ' + escape(spec.name) + '</label>';
+                    }).join('');
+                    L.DomEvent.disableClickPropagation(div);
+                    L.DomEvent.on(div, 'change', function(e) {
+                        active = parseInt(e.target.value, 10);
+                        layer.setStyle(style);
+                        legend.update();
+                    });
+                    return div;
+                };
+                legend.onAdd = function() {
+                    this._div = L.DomUtil.create('div', 'choropleth-control');
+                    this.update();
+                    return this._div;
+                };
+                legend.update = function() {
+                    var spec = layers[active];
+                    this._div.innerHTML = '<b>' + escape(spec.name) + '</b>' + spec.classes.map(function(cls) {
+                        return '<div class="legend-item"><i style="background:' + cls.color + '"></i>' + escape(cls.label) + '</div>';
+                    }).join('') + '<div class="legend-item"><i style="background:' + noData.color + '"></i>' +
+                        escape(noData.label) + '</div>';
+                };
+                control.addTo(map);
+                legend.addTo(map);
+                return layer;
+            })();
+        {% endmacro %}
+    """)
+    
+    def __init__(self, data: dict, attribute_layers: List[dict], label_field: str,
+                 label_alias: Optional[str] = None, object_name: Optional[str] = None,
+                 fill_opacity: float = 0.7, no_data_style: Optional[dict] = None,
+                 line_color: str = 'black', line_weight: float = 1,
+                 highlight_style: Optional[dict] = None, name: Optional[str] = None,
+                 overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "MultiChoroplethLayer"
+        self.object_name = object_name
+        self.default_js = [
+            ("topojson", "https://cdnjs.cloudflare.com/ajax/libs/topojson/1.6.9/topojson.min.js")
+        ] if object_name else []
+        self.data = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+        self.attribute_layers = json.dumps(attribute_layers, separators=(',', ':')).replace('</', '<\\/')
+        self.label_field = label_field
+        self.label_alias = label_alias or label_field
+        self.fill_opacity = fill_opacity
+        self.no_data_style = no_data_style or {'color': 'gray', 'opacity': 0.3, 'label': 'Tidak ada data'}
+        self.line_color = line_color
+        self.line_weight = line_weight
+        self.highlight_style = highlight_style or {}
+
+
+class VectorTileLayer(JSCSSMixin, Layer):
+    """
+    Layer choropleth dari piramida Mapbox Vector Tile (Leaflet.VectorGrid).
+    
+    Tile hanya berisi geometri dan fid; atribut (fill_color, fill_opacity, dan
+    kolom popup) diambil sekali dari attributes_url sebagai array per kolom
+    yang diindeks dengan fid, lalu dipakai oleh satu fungsi style bersama.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var map = {{ this._parent.get_name() }};
+                var attrs = null;
+                var popupFields = {{ this.popup_fields|tojson }};
+                var highlight = {{ this.highlight_style|tojson }};
+                function escape(value) {
+                    if (value === null || value === undefined) { return ''; }
+                    if (typeof value === 'number') { value = value.toLocaleString(); }
+                    return String(value).replace(/[&<>"']/g, function(c) {
+                        return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                    });
+                }
+                function style(props) {
+                    var fid = props.fid;
+                    return {
+                        fill: true,
+                        fillColor: attrs.fill_color[fid],
+                        fillOpacity: attrs.fill_opacity[fid],
+                        color: {{ this.line_color|tojson }},
+                        weight: {{ this.line_weight|tojson }}
+                    };
+                }
+                var layerStyles = {};
+                layerStyles[{{ this.layer_name|tojson }}] = style;
+                var layer = L.vectorGrid.protobuf({{ this.tile_url|tojson }}, {
+                    rendererFactory: L.canvas.tile,
+                    interactive: true,
+                    minNativeZoom: {{ this.min_zoom }},
+                    maxNativeZoom: {{ this.max_zoom }},
+                    getFeatureId: function(feature) { return feature.properties.fid; },
+                    vectorTileLayerStyles: layerStyles
+                });
+                layer.on('click', function(e) {
+                    var fid = e.layer.properties.fid;
+                    var html = '<tr><th>' + escape({{ this.label_alias|tojson }}) + '</th><td>' + escape(e.layer.properties.name) + '</td></tr>';
+                    popupFields.forEach(function(f) {
+                        html += '<tr><th>' + escape(f[1]) + '</th><td>' + escape(attrs[f[0]][fid]) + '</td></tr>';
+                    });
+                    L.popup().setLatLng(e.latlng).setContent('<table>' + html + '</table>').openOn(map);
+                });
+                layer.on('mouseover', function(e) {
+                    layer.setFeatureStyle(e.layer.properties.fid, Object.assign(style(e.layer.properties), highlight));
+                });
+                layer.on('mouseout', function(e) { layer.resetFeatureStyle(e.layer.properties.fid); });
+                // Layer baru ditambahkan setelah atribut tersedia agar style tidak pernah kosong
+                fetch({{ this.attributes_url|tojson }})
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        attrs = data;
+                        {%- if this.show %}
+                        layer.addTo(map);
+                        {%- endif %}
+                    });
+                return layer;
+            })();
+        {% endmacro %}
+    """)
+    
+    default_js = [
+        ("leaflet.vectorgrid", "https://unpkg.com/leaflet.vectorgrid@1.3.0/dist/Leaflet.VectorGrid.bundled.min.js")
+    ]
+    
+    def __init__(self, tile_url: str, attributes_url: str, layer_name: str = 'regions',
+                 min_zoom: int = 0, max_zoom: int = 14, label_alias: str = 'Nama',
+                 popup_fields: Optional[List[str]] = None, popup_aliases: Optional[List[str]] = None,
+                 line_color: str = 'black', line_weight: float = 1,
+                 highlight_style: Optional[dict] = None, name: Optional[str] = None,
+                 overlay: bool = True, control: bool = True, show: bool = True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "VectorTileLayer"
+        self.tile_url = tile_url
+        self.attributes_url = attributes_url
+        self.layer_name = layer_name
+        self.min_zoom = int(min_zoom)
+        self.max_zoom = int(max_zoom)
+        self.label_alias = label_alias
+        self.popup_fields = list(zip(popup_fields or [], popup_aliases or popup_fields or []))
+        self.line_color = line_color
+        self.line_weight = line_weight
+        self.highlight_style = highlight_style or {}
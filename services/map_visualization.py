@@ -1,8 +1,15 @@
-import streamlit as st
+import json
 import folium
 from folium.plugins import MarkerCluster
 import numpy as np
-from config import MAP_CENTER, MAP_ZOOM
+import pandas as pd
+from config import (
+    MAP_CENTER, MAP_ZOOM, SHAPEFILE_KEY_COLUMN, MAP_LOD_TOLERANCES, MAP_VIEWPORT_WIDTH_PX,
+    MAP_GEOMETRY_ENCODING, MAP_COORD_PRECISION, MAP_INDICATOR_PALETTE
+)
+from services.boundary_layer import compute_label_anchors, simplify_coverage
+from services.map_layers import ChoroplethLayer, LabelLayer, MultiChoroplethLayer, VectorTileLayer
+from services.topology import encode_topojson, round_coordinates
 
 class MapVisualizationService:
     def __init__(self):
@@ -15,9 +22,115 @@ class MapVisualizationService:
             5: 'darkred',
             6: 'lightblue'
         }
+        # Style wilayah tanpa data cluster dan cluster di luar palet
+        self.no_data_color = 'gray'
+        self.fill_opacity = 0.7
+        self.no_data_opacity = 0.3
     
-    def create_choropleth_map(self, gdf_merged, numeric_cols, best_k):
-        """Membuat peta choropleth untuk visualisasi cluster"""
+    def compute_style_columns(self, clusters: pd.Series) -> dict:
+        """
+        Kolom fill_color dan fill_opacity untuk setiap fitur.
+        
+        Palet hanya dicari sekali per nilai cluster unik, lalu disebar ke
+        semua fitur lewat indeks faktorisasi.
+        """
+        codes, uniques = pd.factorize(pd.to_numeric(clusters, errors='coerce'))
+        colors = np.array(
+            [self.cluster_colormap.get(int(value), self.no_data_color) for value in uniques] + [self.no_data_color],
+            dtype=object
+        )
+        opacities = np.full(len(uniques) + 1, self.fill_opacity)
+        opacities[-1] = self.no_data_opacity  # Kode -1 (NaN) diarahkan ke elemen terakhir
+        return {
+            'fill_color': colors[codes],
+            'fill_opacity': opacities[codes]
+        }
+    
+    def build_attribute_layers(self, gdf, numeric_cols, palette=MAP_INDICATOR_PALETTE):
+        """
+        Spesifikasi layer atribut untuk peta multi-layer: Cluster (kategorikal)
+        lalu satu layer per kolom Centroid_* (kelas kuantil).
+        
+        Setiap layer hanya berisi satu array nilai sejajar urutan baris gdf
+        ditambah tabel kelas warna.
+        """
+        clusters = pd.to_numeric(gdf['Cluster'], errors='coerce')
+        cluster_values = sorted(int(value) for value in clusters.dropna().unique())
+        layers = [{
+            'name': 'Cluster',
+            'kind': 'categorical',
+            'values': [None if pd.isna(value) else int(value) for value in clusters.tolist()],
+            'classes': [
+                {'value': value, 'color': self.cluster_colormap.get(value, self.no_data_color), 'label': f'Cluster {value}'}
+                for value in cluster_values
+            ]
+        }]
+        
+        for col in numeric_cols:
+            column = f'Centroid_{col}'
+            if column not in gdf.columns:
+                continue
+            values = pd.to_numeric(gdf[column], errors='coerce').round(4)
+            valid = values.dropna().to_numpy()
+            if len(valid) == 0:
+                continue
+            # Batas atas kelas dari kuantil; batas duplikat (nilai sama) digabung
+            breaks = np.unique(np.quantile(valid, np.linspace(0, 1, len(palette) + 1)[1:]))
+            colors = [palette[int(round(i * (len(palette) - 1) / max(len(breaks) - 1, 1)))] for i in range(len(breaks))]
+            lower = [float(valid.min())] + breaks[:-1].tolist()
+            layers.append({
+                'name': col,
+                'kind': 'numeric',
+                'values': [None if pd.isna(value) else float(value) for value in values.tolist()],
+                'classes': [
+                    {'max': round(float(upper), 6), 'color': color, 'label': f'{low:,.4g} – {upper:,.4g}'}
+                    for low, upper, color in zip(lower, breaks.tolist(), colors)
+                ]
+            })
+        return layers
+    
+    def select_lod_level(self, bounds, target="web", viewport_px=MAP_VIEWPORT_WIDTH_PX):
+        """
+        Memilih level-of-detail geometri untuk target output.
+        
+        Untuk 'web' dipilih level paling kasar yang toleransinya tidak melebihi
+        setengah piksel pada tampilan awal; target lain ('print', 'export')
+        memakai geometri penuh.
+        """
+        if target != "web":
+            return "full"
+        
+        minx, miny, maxx, maxy = bounds
+        degrees_per_pixel = max(maxx - minx, maxy - miny) / viewport_px
+        candidates = [
+            (tolerance, level) for level, tolerance in MAP_LOD_TOLERANCES.items()
+            if tolerance <= degrees_per_pixel / 2
+        ]
+        return max(candidates)[1] if candidates else "full"
+    
+    def create_choropleth_map(self, gdf_merged, numeric_cols, best_k, label_anchors=None,
+                              boundary_layer=None, lod_level="auto",
+                              encoding=MAP_GEOMETRY_ENCODING, precision=MAP_COORD_PRECISION,
+                              multi_layer=False, cluster_overview=None, overview_only=False,
+                              tileset=None):
+        """
+        Membuat peta choropleth untuk visualisasi cluster
+        
+        label_anchors: titik label hasil BoundaryLayer.label_anchors; dihitung
+        dari gdf_merged jika tidak diberikan
+        boundary_layer: layer asal gdf_merged, sumber geometri LOD yang sudah di-cache
+        lod_level: 'auto', 'full', atau salah satu kunci MAP_LOD_TOLERANCES
+        encoding: 'topojson' (ringkas) atau 'geojson'
+        precision: jumlah digit desimal koordinat yang dikirim ke browser
+        multi_layer: jika True, Cluster dan setiap indikator menjadi layer yang bisa
+        dipilih di peta dengan satu payload geometri bersama
+        cluster_overview: GeoDataFrame satu poligon per cluster (hasil dissolve);
+        ditambahkan sebagai layer ringkasan yang bisa diaktifkan
+        overview_only: hanya menggambar layer ringkasan (beberapa fitur saja)
+        tileset: dict {'tile_url', 'attributes_url', 'min_zoom', 'max_zoom'} dari
+        piramida vector tile; jika diberikan, wilayah digambar dari tile (mode
+        multi_layer tidak berlaku) dan geometri tidak ditanam di HTML
+        """
         try:
             # Debug: Print informasi tentang data
             print(f"Data yang diterima: {type(gdf_merged)}")
@@ -28,18 +141,15 @@ class MapVisualizationService:
             
             # Pastikan gdf_merged adalah GeoDataFrame yang valid
             if gdf_merged is None or gdf_merged.empty:
-                st.error("Data geospatial tidak valid atau kosong")
                 return self._create_fallback_map("Data geospatial tidak valid atau kosong")
             
             # Pastikan kolom 'Cluster' ada
             if 'Cluster' not in gdf_merged.columns:
-                st.error("Kolom 'Cluster' tidak ditemukan dalam data geospatial")
                 print("Kolom yang tersedia:", list(gdf_merged.columns))
                 return self._create_fallback_map("Kolom 'Cluster' tidak ditemukan dalam data geospatial")
             
             # Pastikan ada geometri
             if not hasattr(gdf_merged, 'geometry') or gdf_merged.geometry.isnull().all():
-                st.error("Data tidak memiliki geometri yang valid")
                 return self._create_fallback_map("Data tidak memiliki geometri yang valid")
             
             # Hitung bounds untuk fokus pada wilayah yang relevan
@@ -47,6 +157,14 @@ class MapVisualizationService:
             print(f"Data bounds: {minx}, {miny}, {maxx}, {maxy}")
             
             
+            # Gunakan geometri tersimplifikasi sesuai level tampilan (mode tile punya simplifikasi per zoom sendiri)
+            if boundary_layer is not None and tileset is None:
+                if lod_level == "auto":
+                    lod_level = self.select_lod_level((minx, miny, maxx, maxy))
+                gdf_merged = boundary_layer.apply_lod(gdf_merged, lod_level)
+                if label_anchors is None:
+                    label_anchors = boundary_layer.label_anchors
+            
             # Buat peta dasar
             m = folium.Map(
                 location=[(miny + maxy) / 2, (minx + maxx) / 2],
@@ -74,74 +192,151 @@ class MapVisualizationService:
             </style>
             """))
             
-            # Style function untuk pewarnaan berdasarkan cluster
-            def style_function(feature):
-                try:
-                    cluster = feature['properties']['Cluster']
-                    if cluster is None or np.isnan(cluster):
-                        return {'fillColor': 'gray', 'color': 'black', 'weight': 1, 'fillOpacity': 0.3}
-                    else:
-                        # Pastikan cluster bisa di-convert ke integer
-                        cluster_int = int(cluster)
-                        return {
-                            'fillColor': self.cluster_colormap.get(cluster_int, 'gray'),
-                            'color': 'black',
-                            'weight': 1,
-                            'fillOpacity': 0.7
-                        }
-                except (ValueError, TypeError, KeyError):
-                    # Jika terjadi error, kembalikan style default
-                    return {'fillColor': 'gray', 'color': 'black', 'weight': 1, 'fillOpacity': 0.3}
-            
-            # Highlight function
-            def highlight_function(feature):
-                return {
-                    'fillColor': '#ffff00',
-                    'color': '#ffff00',
-                    'weight': 3,
-                    'fillOpacity': 0.7
-                }
+            highlight_style = {'fillColor': '#ffff00', 'color': '#ffff00', 'weight': 3, 'fillOpacity': 0.7}
             
-            # Buat GeoJson layer
-            folium.GeoJson(
-                gdf_merged,
-                style_function=style_function,
-                highlight_function=highlight_function,
-                tooltip=folium.GeoJsonTooltip(
-                    fields=['KAB_KOTA', 'Cluster'],
-                    aliases=['Kabupaten/Kota: ', 'Cluster: '],
-                    localize=True
-                ),
-                popup=folium.GeoJsonPopup(
-                    fields=['KAB_KOTA', 'Cluster'] + [f'Centroid_{col}' for col in numeric_cols],
-                    aliases=['Kabupaten/Kota: ', 'Cluster: '] + [f'{col}: ' for col in numeric_cols],
-                    localize=True
-                ),
-                name='Clustering Results'
-            ).add_to(m)
-            
-            # Tambahkan label untuk setiap kabupaten/kota
-            for idx, row in gdf_merged.iterrows():
-                if row['geometry'] is not None:
-                    centroid = row['geometry'].centroid
-                    folium.Marker(
-                        location=[centroid.y, centroid.x],
-                        icon=folium.DivIcon(
-                            html=f'<div style="font-size: 9px; font-weight: bold; color: black; text-shadow: -1px -1px 0 white, 1px -1px 0 white, -1px 1px 0 white, 1px 1px 0 white;">{row["KAB_KOTA"]}</div>'
-                        )
-                    ).add_to(m)
-            
-            # Tambahkan legenda
-            self._add_legend(m, best_k)
+            if overview_only and cluster_overview is not None:
+                # Skala provinsi/nasional: cukup satu poligon per cluster, tanpa layer per wilayah
+                self._add_overview_layer(
+                    m, cluster_overview, numeric_cols, lod_level, encoding, precision, highlight_style, show=True
+                )
+                self._add_legend(m, best_k)
+                return m
+            
+            # Hanya kolom yang dipakai peta yang dikirim ke browser
+            centroid_columns = [
+                f'Centroid_{col}' for col in numeric_cols if f'Centroid_{col}' in gdf_merged.columns
+            ]
+            if tileset is not None:
+                # Layer besar: geometri dari piramida tile, atribut dari JSON terpisah
+                VectorTileLayer(
+                    tileset['tile_url'],
+                    tileset['attributes_url'],
+                    min_zoom=tileset['min_zoom'],
+                    max_zoom=tileset['max_zoom'],
+                    label_alias='Kabupaten/Kota: ',
+                    popup_fields=['Cluster'] + centroid_columns,
+                    popup_aliases=['Cluster: '] + [
+                        f"{col.replace('Centroid_', '', 1)}: " for col in centroid_columns
+                    ],
+                    line_color='black',
+                    line_weight=1,
+                    highlight_style=highlight_style,
+                    name='Clustering Results'
+                ).add_to(m)
+                multi_layer = False
+            else:
+                self._add_region_layer(
+                    m, gdf_merged, numeric_cols, centroid_columns, multi_layer, encoding, precision, highlight_style
+                )
+            
+            # Tambahkan label wilayah sebagai satu layer ringan
+            if label_anchors is None:
+                label_anchors = compute_label_anchors(gdf_merged, SHAPEFILE_KEY_COLUMN)
+            LabelLayer(label_anchors, SHAPEFILE_KEY_COLUMN).add_to(m)
+            
+            # Ringkasan per cluster sebagai layer opsional (nonaktif di awal)
+            if cluster_overview is not None:
+                self._add_overview_layer(
+                    m, cluster_overview, numeric_cols, lod_level, encoding, precision, highlight_style, show=False
+                )
+                folium.LayerControl(collapsed=False).add_to(m)
+            
+            # Tambahkan legenda (mode multi-layer memakai legenda per layer di browser)
+            if not multi_layer:
+                self._add_legend(m, best_k)
             
             return m
             
         except Exception as e:
-            st.error(f"Error creating choropleth map: {str(e)}")
             import traceback
             print(f"Error detail: {traceback.format_exc()}")
             return self._create_fallback_map(f"Error: {str(e)}")
     
+    def _add_region_layer(self, map_object, gdf_merged, numeric_cols, centroid_columns, multi_layer,
+                          encoding, precision, highlight_style):
+        """Menambahkan layer wilayah dengan geometri tertanam (TopoJSON/GeoJSON) di HTML"""
+        if multi_layer:
+            # Geometri hanya membawa nama wilayah; nilai tiap layer dikirim terpisah sebagai array
+            gdf_render = gdf_merged[['KAB_KOTA', gdf_merged.geometry.name]]
+        else:
+            gdf_render = gdf_merged[['KAB_KOTA', 'Cluster'] + centroid_columns + [gdf_merged.geometry.name]]
+            # Warna dan opasitas isi dihitung sekali (vektor) dan dikirim sebagai properti fitur
+            gdf_render = gdf_render.assign(**self.compute_style_columns(gdf_render['Cluster']))
+
+        if encoding == "topojson":
+            # TopoJSON: batas bersama ditulis sekali, koordinat dikuantisasi + delta
+            layer_data, object_name = encode_topojson(gdf_render, precision), 'regions'
+        else:
+            # GeoJSON dengan presisi koordinat terbatas
+            layer_data = json.loads(round_coordinates(gdf_render, precision).to_json(drop_id=True))
+            object_name = None
+
+        if multi_layer:
+            MultiChoroplethLayer(
+                layer_data,
+                self.build_attribute_layers(gdf_merged, numeric_cols),
+                label_field='KAB_KOTA',
+                label_alias='Kabupaten/Kota',
+                object_name=object_name,
+                fill_opacity=self.fill_opacity,
+                no_data_style={'color': self.no_data_color, 'opacity': self.no_data_opacity, 'label': 'Tidak ada data'},
+                highlight_style=highlight_style,
+                name='Clustering Results'
+            ).add_to(map_object)
+        else:
+            ChoroplethLayer(
+                layer_data,
+                object_name=object_name,
+                tooltip_fields=['KAB_KOTA', 'Cluster'],
+                tooltip_aliases=['Kabupaten/Kota: ', 'Cluster: '],
+                popup_fields=['KAB_KOTA', 'Cluster'] + centroid_columns,
+                popup_aliases=['Kabupaten/Kota: ', 'Cluster: '] + [
+                    f'{col}: ' for col in numeric_cols if f'Centroid_{col}' in gdf_merged.columns
+                ],
+                line_color='black',
+                line_weight=1,
+                highlight_style=highlight_style,
+                name='Clustering Results'
+            ).add_to(map_object)
+    
+    def _add_overview_layer(self, map_object, cluster_overview, numeric_cols, lod_level,
+                            encoding, precision, highlight_style, show=True):
+        """Menambahkan layer ringkasan satu poligon per cluster"""
+        overview = cluster_overview
+        if lod_level == "auto":
+            lod_level = self.select_lod_level(tuple(overview.total_bounds))
+        if lod_level in MAP_LOD_TOLERANCES:
+            # Poligon hasil dissolve tetap membentuk coverage, jadi disederhanakan bersama
+            overview = overview.set_geometry(simplify_coverage(overview.geometry, MAP_LOD_TOLERANCES[lod_level]))
+        
+        centroid_columns = [
+            f'Centroid_{col}' for col in numeric_cols if f'Centroid_{col}' in overview.columns
+        ]
+        overview = overview[['Cluster', 'Jumlah_Wilayah'] + centroid_columns + [overview.geometry.name]]
+        overview = overview.assign(**self.compute_style_columns(overview['Cluster']))
+        
+        if encoding == "topojson":
+            layer_data, object_name = encode_topojson(overview, precision, object_name='clusters'), 'clusters'
+        else:
+            layer_data = json.loads(round_coordinates(overview, precision).to_json(drop_id=True))
+            object_name = None
+        
+        ChoroplethLayer(
+            layer_data,
+            object_name=object_name,
+            tooltip_fields=['Cluster', 'Jumlah_Wilayah'],
+            tooltip_aliases=['Cluster: ', 'Jumlah wilayah: '],
+            popup_fields=['Cluster', 'Jumlah_Wilayah'] + centroid_columns,
+            popup_aliases=['Cluster: ', 'Jumlah wilayah: '] + [
+                f"{col.replace('Centroid_', '', 1)}: " for col in centroid_columns
+            ],
+            line_color='black',
+            line_weight=2,
+            highlight_style=highlight_style,
+            name='Ringkasan Cluster',
+            show=show
+        ).add_to(map_object)
+    
     def _create_fallback_map(self, message="Terjadi kesalahan"):
         """Membuat peta fallback jika terjadi error"""
         m = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM)
@@ -149,6 +344,9 @@ class MapVisualizationService:
         m.get_root().html.add_child(folium.Element(
             f'<div style="position: fixed; top: 10px; left: 50px; z-index: 1000; background-color: white; padding: 10px; border: 1px solid gray;">{message}</div>'
         ))
+        # Penanda agar peta fallback tidak ikut disimpan di cache render; pesan ditampilkan oleh pemanggil
+        m.is_fallback = True
+        m.error_message = message
         return m
     
     def _add_legend(self, map_object, best_k):
@@ -169,7 +367,7 @@ class MapVisualizationService:
         for cluster_id in range(best_k):
             legend_html += f'''
             <div style="margin: 2px 0;">
-                <i style="background: {self.cluster_colormap.get(cluster_id, 'gray')};
+                <i style="background: {self.cluster_colormap.get(cluster_id, self.no_data_color)};
                     width: 15px; height: 15px; display: inline-block; margin-right: 5px; border: 1px solid #000;"></i>
                 <span style="color: black">Cluster {cluster_id}</span>
             </div>
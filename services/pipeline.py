@@ -0,0 +1,227 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from glob import glob
+from typing import Callable, List, Optional
+import pandas as pd
+from controllers.data_controller import DataController
+from controllers.cluster_controller import ClusterController
+from controllers.geo_controller import GeoController
+from models.pipeline_model import PipelineOptions, PipelineResult
+from services.geo_export import EXPORT_FORMATS, get_geo_export_service
+
+
+@contextmanager
+def _stage(result: PipelineResult, name: str):
+    """Mencatat durasi satu tahap pipeline"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result.stage_seconds[name] = round(time.perf_counter() - start, 3)
+
+
+def run_pipeline(csv_path: str, output_dir: str, options: Optional[PipelineOptions] = None) -> PipelineResult:
+    """
+    Menjalankan seluruh tahapan untuk satu file CSV: ingest, evaluasi DBI,
+    clustering, merge shapefile, lalu ekspor tabel, peta, data geospatial,
+    dan laporan markdown ke output_dir.
+    
+    Error pada tahap geospatial dicatat sebagai peringatan; error pada tahap
+    data/clustering menghentikan pipeline (dilempar ke pemanggil).
+    """
+    options = options or PipelineOptions()
+    filename = os.path.basename(csv_path)
+    stem = os.path.splitext(filename)[0]
+    os.makedirs(output_dir, exist_ok=True)
+    result = PipelineResult(input_file=csv_path, output_dir=output_dir, status='ok')
+    
+    def output_path(name):
+        path = os.path.join(output_dir, name)
+        result.outputs.append(path)
+        return path
+    
+    # 1. Ingest dan normalisasi
+    data_controller = DataController()
+    with _stage(result, 'ingest'):
+        metadata, norm_result = data_controller.process_uploaded_file(csv_path, filename)
+    result.row_count = metadata.row_count
+    
+    # 2. Evaluasi DBI
+    cluster_controller = ClusterController()
+    with _stage(result, 'dbi'):
+        evaluation_result = cluster_controller.perform_dbi_evaluation(
+            norm_result.scaled_data, k_min=options.k_min, k_max=options.k_max
+        )
+    result.best_k = evaluation_result.best_k
+    result.best_dbi = float(evaluation_result.best_dbi)
+    
+    # 3. Clustering dengan k terbaik
+    with _stage(result, 'clustering'):
+        clustering_result = cluster_controller.perform_kmeans_clustering(
+            norm_result.scaled_data,
+            norm_result.original_data,
+            norm_result.normalized_data,
+            metadata.numeric_columns,
+            evaluation_result.best_k,
+            metadata.merge_key_column,
+            metadata.coordinate_columns,
+            data_store=norm_result.data_store
+        )
+    
+    # 4. Tabel dan laporan
+    with _stage(result, 'tables'):
+        pd.DataFrame(cluster_controller.get_evaluation_table_data()).to_csv(
+            output_path(f"{stem}_evaluasi_dbi.csv"), index=False
+        )
+        cluster_controller.df_with_clusters.to_csv(output_path(f"{stem}_data_cluster.csv"), index=False)
+        if metadata.merge_key_column:
+            clustering_table, _ = cluster_controller.create_clustering_table(
+                metadata.merge_key_column, metadata.numeric_columns
+            )
+            clustering_table.to_csv(output_path(f"{stem}_clustering_results.csv"), index=False)
+            report = cluster_controller.generate_comprehensive_report()
+            with open(output_path(f"{stem}_laporan.md"), 'w', encoding='utf-8') as f:
+                f.write(report)
+        else:
+            result.warnings.append("Tidak ada kolom wilayah; tabel lengkap dan laporan dilewati.")
+    
+    # 5. Merge geospatial, peta, dan ekspor data geospatial
+    if options.skip_geo:
+        return result
+    if clustering_result.merge_data is None:
+        result.warnings.append("Data tidak punya kolom wilayah/koordinat; tahap geospatial dilewati.")
+        return result
+    
+    geo_controller = GeoController()
+    # Peta batch harus berdiri sendiri, tanpa endpoint tile lokal
+    geo_controller.use_tiles = False
+    try:
+        with _stage(result, 'geo_merge'):
+            if options.shapefile_zip:
+                with open(options.shapefile_zip, 'rb') as f:
+                    geo_controller.process_uploaded_shapefile(f)
+                    merge_report = _merge(geo_controller, clustering_result, metadata)
+            else:
+                geo_controller.load_default_shapefile()
+                merge_report = _merge(geo_controller, clustering_result, metadata)
+        result.total_matched = int(merge_report['total_matched'])
+        fuzzy_matches = merge_report.get('fuzzy_matches')
+        if fuzzy_matches is not None and len(fuzzy_matches) > 0:
+            pairs = ", ".join(f"{source} -> {target}" for source, target in fuzzy_matches.itertuples(index=False))
+            result.warnings.append(f"Nama wilayah dicocokkan secara fuzzy (periksa kebenarannya): {pairs}")
+        merged_gdf = merge_report['merged_gdf']
+        
+        if options.write_map:
+            with _stage(result, 'map'):
+                html = geo_controller.generate_choropleth_html(
+                    merged_gdf, metadata.numeric_columns, evaluation_result.best_k,
+                    cluster_overview=merge_report.get('cluster_overview')
+                )
+                if geo_controller.last_map_error:
+                    result.warnings.append(geo_controller.last_map_error)
+                with open(output_path(f"{stem}_peta.html"), 'w', encoding='utf-8') as f:
+                    f.write(html)
+        
+        with _stage(result, 'export'):
+            export_service = get_geo_export_service()
+            for fmt in options.export_formats:
+                path = output_path(f"{stem}{EXPORT_FORMATS[fmt]['suffix']}")
+                with open(path, 'wb') as f:
+                    for chunk in export_service.iter_export(merged_gdf, fmt, layer_name=stem):
+                        f.write(chunk)
+    except Exception as e:
+        result.warnings.append(f"Tahap geospatial gagal: {str(e)}")
+    finally:
+        geo_controller.cleanup_temp_files()
+    
+    return result
+
+
+def _merge(geo_controller, clustering_result, metadata):
+    """Merge hasil clustering dengan shapefile yang sudah dimuat (mode nama atau spasial)"""
+    return geo_controller.merge_with_geodata(
+        clustering_result.merge_data,
+        metadata.merge_key_column,
+        metadata.numeric_columns,
+        mode=metadata.merge_mode or "name",
+        coordinate_columns=metadata.coordinate_columns
+    )
+
+
+def _run_pipeline_job(csv_path: str, output_dir: str, options: PipelineOptions) -> PipelineResult:
+    """Pembungkus untuk worker: error dikembalikan sebagai hasil, bukan dilempar"""
+    try:
+        return run_pipeline(csv_path, output_dir, options)
+    except Exception as e:
+        print(f"Error detail ({csv_path}): {traceback.format_exc()}")
+        return PipelineResult(input_file=csv_path, output_dir=output_dir, status='error', error=str(e))
+
+
+def init_pipeline_worker():
+    """Batasi thread BLAS/OpenMP per worker agar proses paralel tidak saling berebut core"""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def run_batch(
+    input_dir: str,
+    output_dir: str,
+    options: Optional[PipelineOptions] = None,
+    workers: int = 1,
+    pattern: str = "*.csv",
+    on_result: Optional[Callable[[PipelineResult], None]] = None
+) -> List[PipelineResult]:
+    """
+    Menjalankan pipeline untuk setiap file input di direktori, paralel per file.
+    
+    Setiap file menulis ke output_dir/<nama_file>/. Ringkasan semua file
+    disimpan di output_dir/ringkasan_batch.csv.
+    """
+    options = options or PipelineOptions()
+    csv_paths = sorted(glob(os.path.join(input_dir, pattern)))
+    if not csv_paths:
+        raise ValueError(f"Tidak ada file yang cocok dengan '{pattern}' di {input_dir}")
+    
+    jobs = [
+        (path, os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0]), options)
+        for path in csv_paths
+    ]
+    
+    results = []
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=init_pipeline_worker) as pool:
+            futures = [pool.submit(_run_pipeline_job, *job) for job in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+                if on_result:
+                    on_result(results[-1])
+    else:
+        for job in jobs:
+            results.append(_run_pipeline_job(*job))
+            if on_result:
+                on_result(results[-1])
+    
+    results.sort(key=lambda r: r.input_file)
+    os.makedirs(output_dir, exist_ok=True)
+    pd.DataFrame([
+        {
+            'file': os.path.basename(r.input_file),
+            'status': r.status,
+            'best_k': r.best_k,
+            'best_dbi': r.best_dbi,
+            'jumlah_baris': r.row_count,
+            'wilayah_cocok': r.total_matched,
+            'peringatan': ' | '.join(r.warnings),
+            'error': r.error,
+            'detik': round(sum(r.stage_seconds.values()), 3)
+        }
+        for r in results
+    ]).astype({'best_k': 'Int64', 'jumlah_baris': 'Int64', 'wilayah_cocok': 'Int64'}).to_csv(os.path.join(output_dir, 'ringkasan_batch.csv'), index=False)
+    
+    return results
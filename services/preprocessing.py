@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Optional
 
 def detect_numeric_columns(df: pd.DataFrame) -> list:
     """Mendeteksi kolom numerik dalam dataframe"""
@@ -30,6 +30,21 @@ def detect_potential_numeric_columns(df: pd.DataFrame) -> list:
     
     return potential_numeric_cols
 
+def detect_coordinate_columns(df: pd.DataFrame) -> Optional[List[str]]:
+    """
+    Mendeteksi kolom koordinat (longitude, latitude) berdasarkan nama kolom.
+    Mengembalikan [kolom_lon, kolom_lat] atau None jika tidak lengkap
+    """
+    lon_names = {'lon', 'lng', 'long', 'longitude', 'bujur'}
+    lat_names = {'lat', 'latitude', 'lintang'}
+    
+    lon_col = next((col for col in df.columns if str(col).strip().lower() in lon_names), None)
+    lat_col = next((col for col in df.columns if str(col).strip().lower() in lat_names), None)
+    
+    if lon_col is None or lat_col is None:
+        return None
+    return [lon_col, lat_col]
+
 def detect_non_numeric_columns(df: pd.DataFrame) -> list:
     """Mendeteksi kolom non-numerik dalam dataframe"""
     return df.select_dtypes(exclude=[np.number]).columns.tolist()
@@ -80,24 +95,38 @@ def check_missing_values(df: pd.DataFrame) -> Tuple[pd.DataFrame, dict]:
         
     return df, missing_info
 
-def normalize_minmax(df: pd.DataFrame, numeric_cols: list) -> Tuple[pd.DataFrame, dict]:
-    """Melakukan normalisasi Min-Max pada kolom numerik"""
-    df_norm = df.copy()
+def minmax_scale_matrix(df: pd.DataFrame, numeric_cols: list) -> Tuple[np.ndarray, dict]:
+    """
+    Normalisasi Min-Max langsung ke satu matriks float64 (n_baris x n_kolom).
+    
+    Matriks dialokasikan sekali dan dinormalisasi in-place per kolom, sehingga
+    bisa dipakai bersama sebagai scaled_data dan isi kolom frame ternormalisasi.
+    """
+    matrix = np.empty((len(df), len(numeric_cols)), dtype=np.float64)
     normalization_params = {}
     
-    for col in numeric_cols:
+    for i, col in enumerate(numeric_cols):
         # Pastikan kolom numerik
-        df_norm[col] = pd.to_numeric(df_norm[col], errors='coerce')
+        matrix[:, i] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        column = matrix[:, i]
         
-        col_min = df_norm[col].min()
-        col_max = df_norm[col].max()
+        col_min = np.nanmin(column)
+        col_max = np.nanmax(column)
         normalization_params[col] = {"min": col_min, "max": col_max}
-
+        
         if col_max == col_min:
-            df_norm[col] = 0  # Handle kolom konstan
+            column[:] = 0  # Handle kolom konstan
         else:
-            df_norm[col] = (df_norm[col] - col_min) / (col_max - col_min)
-            
+            column -= col_min
+            column /= col_max - col_min
+    
+    return matrix, normalization_params
+
+def normalize_minmax(df: pd.DataFrame, numeric_cols: list) -> Tuple[pd.DataFrame, dict]:
+    """Melakukan normalisasi Min-Max pada kolom numerik"""
+    matrix, normalization_params = minmax_scale_matrix(df, numeric_cols)
+    df_norm = df.copy(deep=False)
+    df_norm[numeric_cols] = matrix
     return df_norm, normalization_params
 
 def convert_to_numpy(df_norm: pd.DataFrame, numeric_cols: list) -> np.ndarray:
@@ -0,0 +1,168 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import pandas as pd
+from config import REGION_NAME_ALIASES, REGION_FUZZY_THRESHOLD, REGION_FUZZY_MARGIN, REGION_RESOLVE_CACHE_SIZE
+
+_PUNCTUATION = re.compile(r"[^A-Z0-9 ]+")
+_KAB_PREFIX = re.compile(r"^(KABUPATEN|KAB)\s+")
+_KOTA_PREFIX = re.compile(r"^(KOTA|KOTAMADYA|KOT)\s+")
+
+
+def normalize_region_key(name) -> Optional[str]:
+    """
+    Kunci ternormalisasi untuk nama wilayah.
+    
+    Huruf besar, tanda baca dan spasi dihapus, prefix "KAB."/"KABUPATEN" dibuang,
+    dan prefix "KOTA" dipertahankan sebagai penanda ("KOTA|BAUBAU" vs "|BUTON").
+    """
+    if name is None or (isinstance(name, float) and pd.isna(name)):
+        return None
+    text = _PUNCTUATION.sub(" ", str(name).upper())
+    text = " ".join(text.split())
+    text = _KAB_PREFIX.sub("", text)
+    is_kota = _KOTA_PREFIX.match(text) is not None
+    text = _KOTA_PREFIX.sub("", text)
+    compact = text.replace(" ", "")
+    if not compact:
+        return None
+    return f"{'KOTA' if is_kota else ''}|{compact}"
+
+
+def _trigrams(key: str) -> set:
+    """Himpunan trigram karakter dari kunci (dengan padding)"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RegionNameIndex:
+    """
+    Indeks nama wilayah untuk satu layer batas wilayah.
+    
+    Dibangun sekali per layer: kunci ternormalisasi dan alias disimpan dalam
+    tabel hash, dengan fallback fuzzy berbasis trigram untuk nama yang tidak
+    cocok (hanya jika kandidat terbaik unggul jelas atas kandidat kedua).
+    Nama unik yang sudah diresolusi di-memo (LRU, maksimal
+    cache_size nama) sehingga pencocokan kolom berukuran besar cukup satu kali
+    Series.map tanpa memo tumbuh tanpa batas pada layer yang dibagikan antar sesi.
+    """
+    def __init__(self, names: Iterable[str], aliases: Dict[str, str] = REGION_NAME_ALIASES,
+                 fuzzy_threshold: float = REGION_FUZZY_THRESHOLD, fuzzy_margin: float = REGION_FUZZY_MARGIN,
+                 cache_size: int = REGION_RESOLVE_CACHE_SIZE):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_margin = fuzzy_margin
+        self.cache_size = cache_size
+        self._lookup: Dict[str, str] = {}
+        # nama -> (nama kanonik atau None, hasil fuzzy?)
+        self._resolved: "OrderedDict[str, Tuple[Optional[str], bool]]" = OrderedDict()
+        self._resolved_lock = threading.Lock()
+        
+        canonical_names = [name for name in pd.unique(pd.Series(list(names), dtype=object)) if pd.notna(name)]
+        for name in canonical_names:
+            key = normalize_region_key(name)
+            if key is not None:
+                self._lookup.setdefault(key, name)
+        
+        # Izinkan nama kota tanpa prefix "KOTA" selama tidak bentrok dengan kabupaten
+        for key, name in list(self._lookup.items()):
+            if key.startswith("KOTA|"):
+                bare_key = key[len("KOTA"):]
+                self._lookup.setdefault(bare_key, name)
+        
+        # Alias eksplisit, hanya jika targetnya ada di layer ini
+        for alias, target in aliases.items():
+            alias_key = normalize_region_key(alias)
+            target_name = self._lookup.get(normalize_region_key(target))
+            if alias_key is not None and target_name is not None:
+                self._lookup.setdefault(alias_key, target_name)
+        
+        self._fuzzy_keys = [(key, _trigrams(key)) for key in self._lookup]
+    
+    def _fuzzy_match(self, key: str) -> Optional[str]:
+        """
+        Mencari nama paling mirip berdasarkan kemiripan Jaccard trigram.
+        
+        Kandidat terbaik harus mencapai fuzzy_threshold dan unggul minimal
+        fuzzy_margin atas nama kanonik lain yang paling mirip; jika tidak,
+        nama dianggap ambigu dan tidak diresolusi.
+        """
+        grams = _trigrams(key)
+        scores: Dict[str, float] = {}
+        for candidate, candidate_grams in self._fuzzy_keys:
+            score = len(grams & candidate_grams) / len(grams | candidate_grams)
+            name = self._lookup[candidate]
+            if score > scores.get(name, 0.0):
+                scores[name] = score
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_name, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best_score < self.fuzzy_threshold or best_score - runner_up < self.fuzzy_margin:
+            return None
+        return best_name
+    
+    def _resolve_cached(self, name) -> Tuple[Optional[str], bool]:
+        """Nama kanonik dan penanda apakah hasilnya dari pencocokan fuzzy (di-memo)"""
+        with self._resolved_lock:
+            if name in self._resolved:
+                self._resolved.move_to_end(name)
+                return self._resolved[name]
+        key = normalize_region_key(name)
+        result = (None, False)
+        if key is not None:
+            exact = self._lookup.get(key)
+            result = (exact, False) if exact is not None else (self._fuzzy_match(key), True)
+            if result[0] is None:
+                result = (None, False)
+        with self._resolved_lock:
+            self._resolved[name] = result
+            while len(self._resolved) > self.cache_size:
+                self._resolved.popitem(last=False)
+        return result
+    
+    def exact_match_ratio(self, names: pd.Series) -> float:
+        """Proporsi nama unik yang cocok persis (termasuk alias, tanpa fuzzy) dengan nama layer"""
+        uniques = names.dropna().unique()
+        if len(uniques) == 0:
+            return 0.0
+        matched = sum(normalize_region_key(name) in self._lookup for name in uniques)
+        return matched / len(uniques)
+    
+    def resolve_name(self, name) -> Optional[str]:
+        """Meresolusi satu nama ke nama kanonik pada layer, None jika tidak ditemukan"""
+        return self._resolve_cached(name)[0]
+    
+    def resolve(self, names: pd.Series) -> Tuple[pd.Series, Dict[str, str]]:
+        """
+        Meresolusi kolom nama ke nama kanonik pada layer.
+        
+        Nama yang tidak ditemukan dikembalikan dalam huruf besar agar tetap
+        tampil di laporan wilayah yang tidak match. Hasil fuzzy dibuang jika
+        nama targetnya sudah dipakai nama lain di kolom yang sama (cocok persis
+        atau fuzzy), agar satu poligon tidak menerima dua baris data.
+        
+        Returns:
+            (kolom hasil resolusi, {nama asli: nama kanonik} untuk hasil fuzzy yang dipakai)
+        """
+        uniques = names.dropna().unique()
+        resolved = {name: self._resolve_cached(name) for name in uniques}
+        
+        claims: Dict[str, int] = {}
+        for target, _ in resolved.values():
+            if target is not None:
+                claims[target] = claims.get(target, 0) + 1
+        
+        mapping = {}
+        fuzzy_matches = {}
+        for name, (target, is_fuzzy) in resolved.items():
+            if target is not None and is_fuzzy and claims[target] > 1:
+                target = None
+            if target is None:
+                mapping[name] = str(name).upper()
+                continue
+            mapping[name] = target
+            if is_fuzzy:
+                fuzzy_matches[name] = target
+        return names.map(mapping), fuzzy_matches
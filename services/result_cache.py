@@ -0,0 +1,168 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from config import RESULT_CACHE_MB
+
+# Interval pemeriksaan cancel_event saat menunggu perhitungan bersama milik sesi lain
+_WAIT_POLL_SECONDS = 0.2
+
+
+def estimate_nbytes(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Perkiraan ukuran memori sebuah hasil (DataFrame, array, model pydantic,
+    dict/list bersarang). Objek yang sama dihitung sekali.
+    """
+    seen = _seen if _seen is not None else set()
+    if value is None or id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(deep=True, index=True).sum())
+        geometry_name = getattr(value, '_geometry_column_name', None)
+        if geometry_name in value.columns:
+            # memory_usage hanya menghitung pointer geometri; tambahkan 16 byte per koordinat
+            import shapely
+            size += int(shapely.get_num_coordinates(value[geometry_name].values).sum()) * 16
+        return size
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, BaseModel):
+        return sum(estimate_nbytes(getattr(value, name), seen) for name in type(value).model_fields)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, seen) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, seen) for v in value)
+    return sys.getsizeof(value)
+
+
+class SharedResultCache:
+    """
+    Cache hasil analisis yang dibagikan ke semua sesi dalam satu proses.
+
+    Entri dikelompokkan per namespace ('dataset', 'evaluation', 'clustering',
+    'merge') dan dikunci dengan sidik jari isi data, sehingga analis kedua
+    yang membuka data yang sama langsung mendapat hasil yang sudah ada.
+    Total ukuran dibatasi max_mb; entri yang paling lama tidak dipakai
+    dibuang lebih dulu (LRU). Nilai yang disimpan dibagikan antar sesi dan
+    harus diperlakukan read-only.
+    """
+    def __init__(self, max_mb: float = RESULT_CACHE_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._inflight: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, event: str):
+        counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0, 'evictions': 0})
+        counters[event] += 1
+
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """Nilai tersimpan (ditandai baru dipakai), atau None jika tidak ada"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self._count(namespace, 'misses')
+                return None
+            self._entries.move_to_end((namespace, key))
+            self._count(namespace, 'hits')
+            return entry[0]
+
+    def put(self, namespace: str, key: Hashable, value: Any, nbytes: Optional[int] = None):
+        """Menyimpan nilai; nilai yang lebih besar dari batas total tidak disimpan"""
+        nbytes = estimate_nbytes(value) if nbytes is None else nbytes
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop((namespace, key), None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[(namespace, key)] = (value, nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes:
+                (evicted_namespace, _), (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+                self._count(evicted_namespace, 'evictions')
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        key: Hashable,
+        compute: Callable[[], Any],
+        cancel_event: Optional[threading.Event] = None,
+        on_wait: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Nilai dari cache, atau hasil compute() yang langsung disimpan.
+
+        Permintaan bersamaan untuk kunci yang sama menunggu satu perhitungan
+        yang sedang berjalan, bukan menghitung ulang. Selama menunggu, on_wait
+        dipanggil sekali dan cancel_event diperiksa berkala (CancelledError).
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._inflight.setdefault((namespace, key), threading.Lock())
+        if not key_lock.acquire(blocking=False):
+            if on_wait is not None:
+                on_wait()
+            while not key_lock.acquire(timeout=_WAIT_POLL_SECONDS):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise CancelledError()
+        try:
+            # Mungkin sudah dihitung sesi lain selama menunggu
+            with self._lock:
+                entry = self._entries.get((namespace, key))
+                if entry is not None:
+                    self._entries.move_to_end((namespace, key))
+            if entry is not None:
+                return entry[0]
+            try:
+                value = compute()
+                self.put(namespace, key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop((namespace, key), None)
+        finally:
+            key_lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Jumlah entri, ukuran total (MB), dan hit/miss/eviction per namespace"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_mb': self._total_bytes / 1024 ** 2,
+                'max_mb': self.max_bytes / 1024 ** 2,
+                'namespaces': {namespace: dict(counters) for namespace, counters in self._counters.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> SharedResultCache:
+    """Instance SharedResultCache bersama untuk seluruh proses"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SharedResultCache()
+    return _cache
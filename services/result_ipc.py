@@ -0,0 +1,198 @@
+import json
+import os
+from typing import Any, Dict, Tuple, Union
+import numpy as np
+import pandas as pd
+from models.data_model import NormalizationResult
+from models.result_model import DBIEvaluationResult, ClusteringResult
+from services.data_store import SessionDataStore
+
+RESULT_IPC_VERSION = 1
+
+ResultModel = Union[NormalizationResult, DBIEvaluationResult, ClusteringResult]
+
+
+def _json_default(value):
+    """Konversi nilai numpy ke tipe Python untuk json.dumps"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _split_result(result: ResultModel) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Memisahkan model menjadi field skalar (JSON) dan bagian besar (array/DataFrame)"""
+    if isinstance(result, NormalizationResult):
+        fields = {
+            'normalization_params': result.normalization_params,
+            'numeric_columns': list(result.normalization_params),
+        }
+        # normalized_data tidak disimpan: dirakit ulang dari original_data + scaled_data
+        return fields, {'original_data': result.original_data, 'scaled_data': result.scaled_data}
+    if isinstance(result, DBIEvaluationResult):
+        fields = {'k': result.k, 'ssw': result.ssw, 'ssb': result.ssb, 'dbi': result.dbi}
+        return fields, {'labels': result.labels, 'centroids': result.centroids}
+    if isinstance(result, ClusteringResult):
+        fields = {'cluster_counts': {int(k): int(v) for k, v in result.cluster_counts.items()}}
+        parts = {
+            'clusters': result.clusters,
+            'centroids': result.centroids,
+            'cluster_summary': result.cluster_summary,
+            'merge_data': result.merge_data,
+        }
+        return fields, {name: part for name, part in parts.items() if part is not None}
+    raise TypeError(f"Tipe hasil tidak didukung untuk Arrow IPC: {type(result).__name__}")
+
+
+def _build_result(model: str, fields: Dict[str, Any], parts: Dict[str, Any]) -> ResultModel:
+    if model == 'NormalizationResult':
+        data_store = SessionDataStore(parts['original_data'], fields['numeric_columns'], parts['scaled_data'])
+        return NormalizationResult(
+            original_data=data_store.original_frame(),
+            normalized_data=data_store.normalized_frame(),
+            normalization_params=fields['normalization_params'],
+            scaled_data=data_store.scaled_data,
+            data_store=data_store
+        )
+    if model == 'DBIEvaluationResult':
+        return DBIEvaluationResult(labels=parts['labels'], centroids=parts['centroids'], **fields)
+    if model == 'ClusteringResult':
+        return ClusteringResult(
+            clusters=parts['clusters'],
+            centroids=parts['centroids'],
+            cluster_summary=parts['cluster_summary'],
+            cluster_counts={int(k): v for k, v in fields['cluster_counts'].items()},
+            merge_data=parts.get('merge_data')
+        )
+    raise ValueError(f"Model tidak dikenal di data Arrow IPC: {model}")
+
+
+def _array_batch(array: np.ndarray):
+    """Array 1D sebagai satu kolom; array 2D sebagai FixedSizeList (satu baris Arrow per baris matriks)"""
+    import pyarrow as pa
+    array = np.ascontiguousarray(array)
+    if array.ndim == 1:
+        column = pa.array(array)
+    elif array.ndim == 2:
+        column = pa.FixedSizeListArray.from_arrays(pa.array(array.reshape(-1)), array.shape[1])
+    else:
+        raise ValueError(f"Array berdimensi {array.ndim} tidak didukung")
+    return pa.record_batch([column], names=['values'])
+
+
+def _write_stream(sink, batch):
+    import pyarrow as pa
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+
+def _read_stream(reader):
+    """Membaca satu stream IPC sampai penanda akhir sehingga stream berikutnya bisa dibuka"""
+    import pyarrow as pa
+    batches = list(pa.ipc.open_stream(reader))
+    return batches[0]
+
+
+def write_result(result: ResultModel, sink):
+    """
+    Menulis hasil ke sink Arrow (BufferOutputStream, OSFile, dll.).
+
+    Formatnya adalah rangkaian stream Arrow IPC: stream pertama berisi header
+    (nama model dan field skalar di metadata skema, daftar bagian sebagai
+    kolom), diikuti satu stream per bagian. DataFrame disimpan lewat
+    RecordBatch.from_pandas (index ikut disimpan), array numerik sebagai
+    buffer Arrow tanpa salinan antara.
+    """
+    import pyarrow as pa
+    fields, parts = _split_result(result)
+    kinds = ['frame' if isinstance(part, pd.DataFrame) else 'array' for part in parts.values()]
+
+    metadata = {
+        'result_ipc_version': str(RESULT_IPC_VERSION),
+        'model': type(result).__name__,
+        'fields': json.dumps(fields, default=_json_default),
+    }
+    header = pa.record_batch(
+        [pa.array(list(parts), pa.string()), pa.array(kinds, pa.string())],
+        schema=pa.schema([('part', pa.string()), ('kind', pa.string())], metadata=metadata)
+    )
+    _write_stream(sink, header)
+
+    for part, kind in zip(parts.values(), kinds):
+        if kind == 'frame':
+            _write_stream(sink, pa.RecordBatch.from_pandas(part, preserve_index=True))
+        else:
+            _write_stream(sink, _array_batch(part))
+
+
+def read_result(source) -> ResultModel:
+    """
+    Membaca hasil dari Buffer/MemoryMappedFile Arrow.
+
+    Array numerik dan kolom numerik DataFrame tanpa nilai kosong menunjuk
+    langsung ke buffer sumber (read-only, tanpa salinan); kolom teks
+    dikonversi ke objek pandas.
+    """
+    import pyarrow as pa
+    reader = pa.BufferReader(source) if isinstance(source, pa.Buffer) else source
+
+    header = _read_stream(reader)
+    metadata = {key.decode(): value.decode() for key, value in header.schema.metadata.items()}
+    if int(metadata.get('result_ipc_version', 0)) != RESULT_IPC_VERSION:
+        raise ValueError(f"Versi format Arrow IPC tidak didukung: {metadata.get('result_ipc_version')}")
+
+    parts = {}
+    for name, kind in zip(header.column('part').to_pylist(), header.column('kind').to_pylist()):
+        batch = _read_stream(reader)
+        if kind == 'frame':
+            # split_blocks: kolom numerik tidak digabung ke blok baru, sehingga tetap zero-copy
+            parts[name] = batch.to_pandas(split_blocks=True)
+        else:
+            column = batch.column(0)
+            if pa.types.is_fixed_size_list(column.type):
+                parts[name] = column.values.to_numpy(zero_copy_only=True).reshape(-1, column.type.list_size)
+            else:
+                parts[name] = column.to_numpy(zero_copy_only=True)
+
+    return _build_result(metadata['model'], json.loads(metadata['fields']), parts)
+
+
+def serialize_result(result: ResultModel):
+    """Hasil sebagai pyarrow.Buffer (bisa dikirim ke proses lain atau disimpan di cache)"""
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    write_result(result, sink)
+    return sink.getvalue()
+
+
+def deserialize_result(buffer: Union[bytes, bytearray, memoryview, Any]) -> ResultModel:
+    """Membaca hasil dari buffer di memori; array hasil menunjuk ke buffer tersebut"""
+    import pyarrow as pa
+    return read_result(buffer if isinstance(buffer, pa.Buffer) else pa.py_buffer(buffer))
+
+
+def save_result_ipc(result: ResultModel, file_path: str):
+    """Menyimpan hasil ke file Arrow IPC secara atomik"""
+    import pyarrow as pa
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            write_result(result, sink)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_result_ipc(file_path: str) -> ResultModel:
+    """
+    Memuat hasil dari file Arrow IPC lewat memory-map.
+
+    Proses lain yang membuka file yang sama berbagi halaman page cache yang
+    sama, sehingga hasil dibagikan antar proses worker tanpa salinan.
+    """
+    import pyarrow as pa
+    with pa.memory_map(file_path, 'r') as source:
+        return read_result(source.read_buffer())
@@ -0,0 +1,264 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config import RUN_DIR
+from models.data_model import DatasetMetadata, NormalizationResult
+from models.result_model import FullEvaluationResult, ClusteringResult
+from models.run_model import AnalysisRun
+from services.data_store import SessionDataStore
+
+MANIFEST_NAME = "manifest.json"
+RUN_FORMAT_VERSION = 1
+
+# Frame di merge_report yang disimpan sebagai (Geo)Parquet; kunci lain yang bernilai skalar masuk manifest
+_MERGE_FRAMES = ('merged_gdf', 'missing_in_shapefile', 'missing_in_data', 'cluster_overview', 'fuzzy_matches')
+
+
+def _json_default(value):
+    """Konversi nilai numpy ke tipe Python untuk json.dump"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class RunStore:
+    """
+    Penyimpanan analisis lengkap di disk agar bisa dibuka kembali tanpa menghitung ulang.
+
+    Struktur berkas: RUN_DIR/<run_id>/manifest.json, array numerik sebagai .npy
+    (dibuka dengan memory-map saat dimuat), dan frame sebagai Parquet
+    (GeoParquet untuk frame bergeometri). Manifest berisi metadata dataset,
+    parameter normalisasi, metrik evaluasi, jumlah anggota cluster,
+    interpretasi, nilai skalar laporan merge, dan daftar berkas.
+    """
+    def __init__(self, root: str = RUN_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _run_dir(self, run_id: str) -> str:
+        # run_id berasal dari daftar run; tolak path traversal
+        if not run_id or os.path.basename(run_id) != run_id or run_id.startswith('.'):
+            raise ValueError(f"ID analisis tidak valid: {run_id}")
+        return os.path.join(self.root, run_id)
+
+    def save(
+        self,
+        name: str,
+        metadata: DatasetMetadata,
+        normalization_result: NormalizationResult,
+        evaluation_result: Optional[FullEvaluationResult] = None,
+        clustering_result: Optional[ClusteringResult] = None,
+        clustering_table: Optional[pd.DataFrame] = None,
+        interpretations: Optional[Dict[int, Dict[str, Any]]] = None,
+        merge_report: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Menyimpan analisis (tahap yang belum dijalankan dilewati); mengembalikan run_id"""
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        tmp_dir = os.path.join(self.root, f".{run_id}.tmp")
+        os.makedirs(tmp_dir)
+        files: Dict[str, Dict[str, Any]] = {}
+
+        def save_array(key: str, array):
+            filename = f"{key}.npy"
+            np.save(os.path.join(tmp_dir, filename), np.ascontiguousarray(array))
+            files[key] = {'file': filename}
+
+        def save_frame(key: str, frame: pd.DataFrame):
+            filename = f"{key}.parquet"
+            frame.to_parquet(os.path.join(tmp_dir, filename))
+            files[key] = {'file': filename, 'geo': getattr(frame, '_geometry_column_name', None) in frame.columns}
+
+        try:
+            manifest: Dict[str, Any] = {
+                'format_version': RUN_FORMAT_VERSION,
+                'run_id': run_id,
+                'name': name or metadata.filename,
+                'created_at': time.time(),
+                'dataset_metadata': metadata.model_dump(),
+                'normalization_params': normalization_result.normalization_params,
+            }
+
+            save_frame('original_data', normalization_result.original_data)
+            save_array('scaled_data', normalization_result.scaled_data)
+
+            if evaluation_result is not None:
+                results = evaluation_result.evaluation_results
+                manifest['evaluation'] = {
+                    'best_k': evaluation_result.best_k,
+                    'best_dbi': evaluation_result.best_dbi,
+                    'k_min': evaluation_result.k_min,
+                    'k_max': evaluation_result.k_max,
+                    'metrics': [{'k': r.k, 'ssw': r.ssw, 'ssb': r.ssb, 'dbi': r.dbi} for r in results],
+                }
+                # Label semua k dalam satu matriks (n_k x n_baris); centroid ditumpuk per baris, k baris per hasil
+                save_array('evaluation_labels', np.stack([np.asarray(r.labels) for r in results]))
+                save_array('evaluation_centroids', np.concatenate([np.asarray(r.centroids) for r in results]))
+
+            if clustering_result is not None:
+                # Kunci dict JSON harus str/int Python (label cluster bisa numpy.int32)
+                manifest['clustering'] = {
+                    'cluster_counts': {int(k): int(v) for k, v in clustering_result.cluster_counts.items()}
+                }
+                save_array('clusters', clustering_result.clusters)
+                save_array('centroids', clustering_result.centroids)
+                save_frame('cluster_summary', clustering_result.cluster_summary)
+                if clustering_result.merge_data is not None:
+                    save_frame('merge_data', clustering_result.merge_data)
+
+            if clustering_table is not None:
+                save_frame('clustering_table', clustering_table)
+            if interpretations is not None:
+                manifest['interpretations'] = {int(k): v for k, v in interpretations.items()}
+
+            if merge_report is not None:
+                manifest['merge_report'] = {
+                    key: value for key, value in merge_report.items() if key not in _MERGE_FRAMES
+                }
+                for key in _MERGE_FRAMES:
+                    if merge_report.get(key) is not None:
+                        save_frame(key, merge_report[key])
+
+            manifest['files'] = files
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, default=_json_default)
+
+            # Rename direktori atomik: daftar run tidak pernah melihat run setengah jadi
+            os.replace(tmp_dir, self._run_dir(run_id))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return run_id
+
+    def read_manifest(self, run_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self._run_dir(run_id), MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """Ringkasan analisis tersimpan, terbaru lebih dulu"""
+        runs = []
+        for run_id in os.listdir(self.root):
+            if run_id.startswith('.'):
+                continue
+            try:
+                manifest = self.read_manifest(run_id)
+            except (OSError, ValueError):
+                continue
+            runs.append({
+                'run_id': run_id,
+                'name': manifest['name'],
+                'created_at': manifest['created_at'],
+                'filename': manifest['dataset_metadata']['filename'],
+                'row_count': manifest['dataset_metadata']['row_count'],
+                'best_k': manifest.get('evaluation', {}).get('best_k'),
+                'stages': [stage for stage in ('evaluation', 'clustering', 'merge_report') if stage in manifest],
+            })
+        return sorted(runs, key=lambda run: run['created_at'], reverse=True)
+
+    def load(self, run_id: str) -> AnalysisRun:
+        """
+        Membuka analisis tersimpan.
+
+        Array dibuka dengan memory-map (read-only) sehingga hanya halaman yang
+        dipakai yang dibaca dari disk; frame ternormalisasi dirakit sebagai view
+        di atas scaled_data lewat SessionDataStore.
+        """
+        run_dir = self._run_dir(run_id)
+        manifest = self.read_manifest(run_id)
+        if manifest.get('format_version') != RUN_FORMAT_VERSION:
+            raise ValueError(f"Versi format analisis tersimpan tidak didukung: {manifest.get('format_version')}")
+        files = manifest['files']
+
+        def load_array(key: str) -> np.ndarray:
+            return np.load(os.path.join(run_dir, files[key]['file']), mmap_mode='r')
+
+        def load_frame(key: str) -> Optional[pd.DataFrame]:
+            if key not in files:
+                return None
+            path = os.path.join(run_dir, files[key]['file'])
+            if files[key]['geo']:
+                import geopandas as gpd
+                return gpd.read_parquet(path)
+            return pd.read_parquet(path)
+
+        metadata = DatasetMetadata(**manifest['dataset_metadata'])
+        data_store = SessionDataStore(load_frame('original_data'), metadata.numeric_columns, load_array('scaled_data'))
+        normalization_result = NormalizationResult(
+            original_data=data_store.original_frame(),
+            normalized_data=data_store.normalized_frame(),
+            normalization_params=manifest['normalization_params'],
+            scaled_data=data_store.scaled_data,
+            data_store=data_store
+        )
+
+        evaluation_result = None
+        if 'evaluation' in manifest:
+            evaluation = manifest['evaluation']
+            labels = load_array('evaluation_labels')
+            centroids = load_array('evaluation_centroids')
+            offsets = np.cumsum([metrics['k'] for metrics in evaluation['metrics']])[:-1]
+            evaluation_result = FullEvaluationResult(
+                evaluation_results=[
+                    {**metrics, 'labels': labels[i], 'centroids': k_centroids}
+                    for i, (metrics, k_centroids) in enumerate(zip(evaluation['metrics'], np.split(centroids, offsets)))
+                ],
+                best_k=evaluation['best_k'],
+                best_dbi=evaluation['best_dbi'],
+                k_min=evaluation['k_min'],
+                k_max=evaluation['k_max']
+            )
+
+        clustering_result = None
+        if 'clustering' in manifest:
+            clustering_result = ClusteringResult(
+                clusters=load_array('clusters'),
+                centroids=load_array('centroids'),
+                cluster_summary=load_frame('cluster_summary'),
+                cluster_counts={int(k): v for k, v in manifest['clustering']['cluster_counts'].items()},
+                merge_data=load_frame('merge_data')
+            )
+            data_store.set_clusters(clustering_result.clusters)
+
+        merge_report = None
+        if 'merge_report' in manifest:
+            merge_report = dict(manifest['merge_report'])
+            for key in _MERGE_FRAMES:
+                merge_report[key] = load_frame(key)
+
+        interpretations = manifest.get('interpretations')
+        return AnalysisRun(
+            run_id=run_id,
+            name=manifest['name'],
+            created_at=manifest['created_at'],
+            metadata=metadata,
+            normalization_result=normalization_result,
+            evaluation_result=evaluation_result,
+            clustering_result=clustering_result,
+            clustering_table=load_frame('clustering_table'),
+            interpretations={int(k): v for k, v in interpretations.items()} if interpretations is not None else None,
+            merge_report=merge_report
+        )
+
+    def delete(self, run_id: str):
+        shutil.rmtree(self._run_dir(run_id), ignore_errors=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_run_store() -> RunStore:
+    """Instance RunStore bersama untuk seluruh proses"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RunStore()
+    return _store
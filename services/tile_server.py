@@ -0,0 +1,89 @@
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from config import TILE_DIR, TILE_SERVER_HOST, TILE_SERVER_PORT, MAP_TILE_BASE_URL
+
+
+class _TileRequestHandler(SimpleHTTPRequestHandler):
+    """Handler file statis untuk piramida tile: CORS, tipe konten MVT, tanpa log per request"""
+    extensions_map = {
+        **SimpleHTTPRequestHandler.extensions_map,
+        '.pbf': 'application/x-protobuf',
+        '.json': 'application/json',
+    }
+    
+    def end_headers(self):
+        # Peta dirender di iframe Streamlit dengan origin berbeda
+        self.send_header('Access-Control-Allow-Origin', '*')
+        # Tile dengan kunci isi yang sama tidak pernah berubah
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        super().end_headers()
+    
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class TileServer:
+    """
+    Endpoint HTTP lokal yang menyajikan piramida vector tile dari TILE_DIR.
+    
+    Berjalan di thread daemon dalam proses Streamlit; port 0 berarti port bebas
+    dipilih otomatis.
+    """
+    def __init__(self, root: str = TILE_DIR, host: str = TILE_SERVER_HOST, port: int = TILE_SERVER_PORT):
+        self.root = root
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Menjalankan server jika belum berjalan"""
+        if self._server is not None:
+            return
+        handler = functools.partial(_TileRequestHandler, directory=self.root)
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        except OSError:
+            # Port sudah dipakai (mis. proses Streamlit lain): pilih port bebas
+            self._server = ThreadingHTTPServer((self.host, 0), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="tile-server", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Menghentikan server"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """URL dasar tile yang dipakai browser"""
+        if MAP_TILE_BASE_URL:
+            return MAP_TILE_BASE_URL.rstrip('/')
+        return f"http://{self.host}:{self.port}"
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_tile_server() -> TileServer:
+    """Instance TileServer bersama untuk seluruh proses (dijalankan saat pertama dipakai)"""
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                server = TileServer()
+                server.start()
+                _server = server
+    return _server
@@ -0,0 +1,171 @@
+import json
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from config import MAP_COORD_PRECISION
+
+
+def round_coordinates(gdf: gpd.GeoDataFrame, precision: int = MAP_COORD_PRECISION) -> gpd.GeoDataFrame:
+    """Membulatkan koordinat geometri ke sejumlah digit desimal (vektor, tanpa loop per fitur)"""
+    rounded = shapely.transform(gdf.geometry.values, lambda coords: np.round(coords, precision))
+    return gdf.set_geometry(gpd.GeoSeries(rounded, index=gdf.index, crs=gdf.crs))
+
+
+def to_compact_geojson(gdf: gpd.GeoDataFrame, precision: int = MAP_COORD_PRECISION) -> str:
+    """GeoJSON dengan presisi koordinat terbatas"""
+    return round_coordinates(gdf, precision).to_json(drop_id=True)
+
+
+def _feature_properties(gdf: gpd.GeoDataFrame) -> List[dict]:
+    """Atribut non-geometri dalam bentuk yang aman untuk JSON (NaN -> null)"""
+    attributes = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    return json.loads(attributes.to_json(orient='records', date_format='iso'))
+
+
+def _polygon_rings(geometry) -> List[List[np.ndarray]]:
+    """Daftar poligon, masing-masing daftar ring (exterior lalu interior) berupa array koordinat"""
+    if geometry is None or geometry.is_empty:
+        return []
+    if geometry.geom_type == 'Polygon':
+        polygons = [geometry]
+    elif geometry.geom_type == 'MultiPolygon':
+        polygons = list(geometry.geoms)
+    else:
+        raise ValueError(f"Tipe geometri {geometry.geom_type} tidak didukung untuk TopoJSON")
+    return [
+        [np.asarray(polygon.exterior.coords)[:, :2]] +
+        [np.asarray(ring.coords)[:, :2] for ring in polygon.interiors]
+        for polygon in polygons
+    ]
+
+
+class _ArcBuilder:
+    """Memotong ring pada titik junction dan menyimpan arc unik (arc bersama ditulis sekali)"""
+    def __init__(self, junctions: set):
+        self.junctions = junctions
+        self.arcs: List[np.ndarray] = []
+        self._index: Dict[bytes, int] = {}
+
+    def _add_arc(self, arc: np.ndarray) -> int:
+        """Menambahkan arc, atau mengembalikan referensi arc yang sama/terbalik yang sudah ada"""
+        key = arc.tobytes()
+        if key in self._index:
+            return self._index[key]
+        reversed_key = arc[::-1].tobytes()
+        if reversed_key in self._index:
+            return ~self._index[reversed_key]
+        self._index[key] = len(self.arcs)
+        self.arcs.append(arc)
+        return self._index[key]
+
+    def ring_arcs(self, ring: np.ndarray, ring_keys: np.ndarray) -> List[int]:
+        """Mengubah satu ring tertutup (tanpa titik penutup) menjadi daftar indeks arc"""
+        is_junction = np.fromiter((key in self.junctions for key in ring_keys), dtype=bool, count=len(ring_keys))
+        junction_pos = np.nonzero(is_junction)[0]
+
+        if len(junction_pos) == 0:
+            # Ring tanpa junction: putar ke titik terkecil agar ring identik (juga yang
+            # arahnya terbalik, mis. pulau dan lubang enclave) dikenali sebagai arc yang sama
+            start = int(np.argmin(ring_keys))
+            rotated = np.roll(ring, -start, axis=0)
+            return [self._add_arc(np.vstack([rotated, rotated[:1]]))]
+
+        # Putar ring agar dimulai di junction pertama, lalu potong antar junction
+        rotated = np.roll(ring, -junction_pos[0], axis=0)
+        closed = np.vstack([rotated, rotated[:1]])
+        cuts = list(junction_pos - junction_pos[0]) + [len(ring)]
+        return [self._add_arc(closed[cuts[i]:cuts[i + 1] + 1]) for i in range(len(cuts) - 1)]
+
+
+def _find_junctions(rings: List[np.ndarray], keys: List[np.ndarray]) -> set:
+    """
+    Titik junction: titik yang muncul dengan pasangan tetangga berbeda pada ring
+    yang berbeda, yaitu tempat batas bersama dimulai atau berakhir.
+    """
+    if not rings:
+        return set()
+    point_keys = np.concatenate(keys)
+    prev_keys = np.concatenate([np.roll(k, 1) for k in keys])
+    next_keys = np.concatenate([np.roll(k, -1) for k in keys])
+    occurrences = pd.DataFrame({
+        'point': point_keys,
+        'a': np.minimum(prev_keys, next_keys),
+        'b': np.maximum(prev_keys, next_keys)
+    }).drop_duplicates()
+    neighbour_sets = occurrences.groupby('point').size()
+    return set(neighbour_sets.index[neighbour_sets > 1].tolist())
+
+
+def encode_topojson(gdf: gpd.GeoDataFrame, precision: int = MAP_COORD_PRECISION,
+                    object_name: str = 'regions') -> dict:
+    """
+    Mengubah GeoDataFrame poligon menjadi TopoJSON.
+
+    Koordinat dikuantisasi ke grid integer sesuai presisi desimal, batas yang
+    dipakai bersama dua wilayah disimpan sekali sebagai arc, dan setiap arc
+    di-delta-encode sehingga sebagian besar angka hanya 1-3 digit.
+    """
+    bounds = gdf.total_bounds
+    x0, y0 = float(bounds[0]), float(bounds[1])
+    scale = 10.0 ** -precision
+
+    # Kuantisasi semua ring dan buang titik berurutan yang menjadi sama
+    structure = []
+    rings, keys = [], []
+    for geometry in gdf.geometry.values:
+        feature_polygons = []
+        for polygon in _polygon_rings(geometry):
+            polygon_rings = []
+            for coords in polygon:
+                quantized = np.round((coords - (x0, y0)) / scale).astype(np.int64)
+                keep = np.ones(len(quantized), dtype=bool)
+                keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+                quantized = quantized[keep][:-1]  # Titik penutup dibuang, ring dianggap tertutup
+                if len(quantized) < 3:
+                    continue
+                polygon_rings.append(len(rings))
+                rings.append(quantized)
+                keys.append(quantized[:, 0] * (1 << 31) + quantized[:, 1])
+            if polygon_rings:
+                feature_polygons.append(polygon_rings)
+        structure.append(feature_polygons)
+
+    builder = _ArcBuilder(_find_junctions(rings, keys))
+    ring_arcs = [builder.ring_arcs(ring, ring_keys) for ring, ring_keys in zip(rings, keys)]
+
+    geometries = []
+    for feature_polygons, properties in zip(structure, _feature_properties(gdf)):
+        if not feature_polygons:
+            geometries.append({'type': None, 'properties': properties})
+        elif len(feature_polygons) == 1:
+            geometries.append({
+                'type': 'Polygon',
+                'arcs': [ring_arcs[ring] for ring in feature_polygons[0]],
+                'properties': properties
+            })
+        else:
+            geometries.append({
+                'type': 'MultiPolygon',
+                'arcs': [[ring_arcs[ring] for ring in polygon] for polygon in feature_polygons],
+                'properties': properties
+            })
+
+    # Delta encoding: titik pertama absolut, selanjutnya selisih dari titik sebelumnya
+    encoded_arcs = [
+        np.vstack([arc[:1], np.diff(arc, axis=0)]).tolist() for arc in builder.arcs
+    ]
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [scale, scale], 'translate': [x0, y0]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded_arcs
+    }
+
+
+def to_topojson(gdf: gpd.GeoDataFrame, precision: int = MAP_COORD_PRECISION,
+                object_name: str = 'regions') -> str:
+    """TopoJSON dalam bentuk string JSON ringkas"""
+    return json.dumps(encode_topojson(gdf, precision, object_name), separators=(',', ':'))
@@ -0,0 +1,386 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import geopandas as gpd
+import shapely
+from config import (
+    TILE_DIR, TILE_STORE_QUOTA_MB, MAP_TILE_MIN_ZOOM, MAP_TILE_MAX_ZOOM, MAP_TILE_EXTENT, MAP_TILE_BUFFER,
+    MAP_TILE_WORKERS, SHAPEFILE_KEY_COLUMN
+)
+from services.boundary_layer import simplify_coverage
+from utils.helpers import fingerprint_frame
+
+# mapbox_vector_tile bersifat opsional; tanpa paket ini peta kembali memakai layer tertanam
+try:
+    import mapbox_vector_tile
+    from mapbox_vector_tile.encoder import on_invalid_geometry_make_valid
+except ImportError:
+    mapbox_vector_tile = None
+
+# Versi format piramida; naikkan jika isi tile geometri berubah agar cache lama tidak dipakai
+TILE_FORMAT_VERSION = 1
+TILE_LAYER_NAME = 'regions'
+EARTH_HALF_CIRCUMFERENCE = 20037508.342789244  # meter, EPSG:3857
+
+
+def tiles_available() -> bool:
+    """Mengecek apakah encoder Mapbox Vector Tile tersedia"""
+    return mapbox_vector_tile is not None
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Batas tile XYZ dalam meter Web Mercator (minx, miny, maxx, maxy)"""
+    size = 2 * EARTH_HALF_CIRCUMFERENCE / (1 << z)
+    minx = -EARTH_HALF_CIRCUMFERENCE + x * size
+    maxy = EARTH_HALF_CIRCUMFERENCE - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def _tile_range(bounds: np.ndarray, z: int) -> np.ndarray:
+    """Indeks tile (x0, y0, x1, y1) yang menutupi setiap bbox (dalam meter Web Mercator)"""
+    n = 1 << z
+    size = 2 * EARTH_HALF_CIRCUMFERENCE / n
+    x0 = np.floor((bounds[:, 0] + EARTH_HALF_CIRCUMFERENCE) / size)
+    x1 = np.floor((bounds[:, 2] + EARTH_HALF_CIRCUMFERENCE) / size)
+    y0 = np.floor((EARTH_HALF_CIRCUMFERENCE - bounds[:, 3]) / size)
+    y1 = np.floor((EARTH_HALF_CIRCUMFERENCE - bounds[:, 1]) / size)
+    return np.clip(np.column_stack([x0, y0, x1, y1]), 0, n - 1).astype(np.int64)
+
+
+def _zoom_tolerance(z: int) -> float:
+    """
+    Toleransi simplifikasi untuk zoom z: satu piksel layar (tile 256 px), dalam
+    derajat seperti toleransi simplify_coverage (dikonversi ke meter di sana)
+    """
+    return 360.0 / (256 * (1 << z))
+
+
+def _encode_tile_batch(tasks: List[tuple]) -> int:
+    """
+    Memotong, mengkuantisasi, dan menulis sekumpulan tile (dijalankan di proses worker).
+
+    Setiap task: (path, z, x, y, fids, names, wkbs) dengan geometri dalam meter Web Mercator.
+    """
+    written = 0
+    for path, z, x, y, fids, names, wkbs in tasks:
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        size = maxx - minx
+        pad = size * MAP_TILE_BUFFER / MAP_TILE_EXTENT
+        geometries = shapely.clip_by_rect(
+            shapely.from_wkb(wkbs), minx - pad, miny - pad, maxx + pad, maxy + pad
+        )
+        # Kuantisasi vektor ke grid tile (y ke bawah), sekali untuk semua fitur tile ini
+        scale = MAP_TILE_EXTENT / size
+        geometries = shapely.transform(
+            geometries,
+            lambda coords: np.round(np.column_stack([
+                (coords[:, 0] - minx) * scale,
+                (maxy - coords[:, 1]) * scale
+            ]))
+        )
+        keep = ~shapely.is_empty(geometries)
+        features = [
+            {'geometry': geometry, 'properties': {'fid': int(fid), 'name': name}}
+            for geometry, fid, name in zip(geometries[keep], np.asarray(fids)[keep], np.asarray(names, dtype=object)[keep])
+        ]
+        if not features:
+            continue
+        data = mapbox_vector_tile.encode(
+            [{'name': TILE_LAYER_NAME, 'features': features}],
+            default_options={
+                'extents': MAP_TILE_EXTENT,
+                'y_coord_down': True,
+                'on_invalid_geometry': on_invalid_geometry_make_valid
+            }
+        )
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        written += 1
+    return written
+
+
+class VectorTileStore:
+    """
+    Piramida Mapbox Vector Tile statis di disk untuk layer batas wilayah besar.
+
+    Tile hanya berisi geometri, nomor fitur (fid), dan nama wilayah; atribut
+    cluster disimpan terpisah sebagai JSON kecil. Struktur:
+        TILE_DIR/<geometry_key>/{z}/{x}/{y}.pbf
+        TILE_DIR/<geometry_key>/attributes/<attribute_key>.json
+    Jika hanya cluster yang berubah, geometry_key tetap sama sehingga tile
+    tidak dibuat ulang; cukup satu file atribut baru yang ditulis.
+
+    Total ukuran dibatasi quota_mb: mtime penanda 'complete' dan file atribut
+    dipakai sebagai waktu akses terakhir untuk eviksi LRU (piramida dihapus
+    utuh beserta atributnya).
+    """
+    def __init__(self, root: str = TILE_DIR, min_zoom: int = MAP_TILE_MIN_ZOOM,
+                 max_zoom: int = MAP_TILE_MAX_ZOOM, workers: int = MAP_TILE_WORKERS,
+                 quota_mb: float = TILE_STORE_QUOTA_MB):
+        self.root = root
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.workers = workers
+        self.quota_bytes = int(quota_mb * 1024 ** 2)
+        self._lock = threading.Lock()
+        # Piramida yang sedang dibuat (belum punya penanda complete), tidak boleh dievict
+        self._building = set()
+        self._evict_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def geometry_key(self, gdf: gpd.GeoDataFrame, key_column: str = SHAPEFILE_KEY_COLUMN) -> str:
+        """Kunci piramida: isi geometri + nama wilayah + rentang zoom + versi format"""
+        geometry_frame = gdf[[key_column, gdf.geometry.name]].reset_index(drop=True)
+        settings = f"{TILE_FORMAT_VERSION}:{self.min_zoom}-{self.max_zoom}:{MAP_TILE_EXTENT}:{MAP_TILE_BUFFER}"
+        return hashlib.sha256(f"{fingerprint_frame(geometry_frame)}:{settings}".encode('utf-8')).hexdigest()[:24]
+
+    def _pyramid_dir(self, geometry_key: str) -> str:
+        return os.path.join(self.root, geometry_key)
+
+    def ensure_geometry_tiles(self, gdf: gpd.GeoDataFrame, key_column: str = SHAPEFILE_KEY_COLUMN) -> str:
+        """
+        Membuat piramida tile geometri jika belum ada; mengembalikan geometry_key.
+
+        Per zoom, geometri disederhanakan sebagai coverage dengan toleransi satu
+        piksel, lalu tile dibagi ke beberapa proses worker untuk dipotong dan di-encode.
+        """
+        if not tiles_available():
+            raise RuntimeError("Paket mapbox_vector_tile tidak terpasang")
+
+        geometry_key = self.geometry_key(gdf, key_column)
+        pyramid_dir = self._pyramid_dir(geometry_key)
+        complete_marker = os.path.join(pyramid_dir, 'complete')
+
+        with self._lock:
+            if os.path.exists(complete_marker):
+                # Tandai sebagai baru dipakai untuk LRU
+                _touch(complete_marker)
+                return geometry_key
+
+            with self._evict_lock:
+                self._building.add(geometry_key)
+            try:
+                written = self._build_pyramid(gdf, key_column, pyramid_dir)
+                tile_bytes = _directory_size(pyramid_dir, exclude='attributes')
+                os.makedirs(pyramid_dir, exist_ok=True)
+                with open(complete_marker, 'w') as f:
+                    json.dump({
+                        'tiles': written, 'bytes': tile_bytes,
+                        'min_zoom': self.min_zoom, 'max_zoom': self.max_zoom
+                    }, f)
+            finally:
+                with self._evict_lock:
+                    self._building.discard(geometry_key)
+            print(f"Piramida vector tile {geometry_key}: {written} tile ditulis")
+
+        self.evict(keep_geometry=geometry_key)
+        return geometry_key
+
+    def _build_pyramid(self, gdf: gpd.GeoDataFrame, key_column: str, pyramid_dir: str) -> int:
+        """Menulis semua tile piramida; mengembalikan jumlah tile yang ditulis"""
+        geometry = gdf.geometry if gdf.crs is not None else gdf.geometry.set_crs(epsg=4326)
+        projected = geometry.to_crs(epsg=3857)
+        names = gdf[key_column].astype(str).to_numpy(dtype=object)
+        valid = projected.notna().to_numpy() & ~projected.is_empty.to_numpy()
+        fids = np.nonzero(valid)[0]
+
+        batches = []
+        for z in range(self.min_zoom, self.max_zoom + 1):
+            simplified = simplify_coverage(projected[valid], _zoom_tolerance(z)).values
+            batches.extend(self._zoom_batches(pyramid_dir, z, simplified, fids, names[valid]))
+
+        if self.workers > 1 and len(batches) > 1:
+            # spawn: fork di dalam server Streamlit yang multi-thread bisa mewarisi lock yang sedang dipegang
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                written = sum(pool.map(_encode_tile_batch, batches))
+        else:
+            written = sum(_encode_tile_batch(batch) for batch in batches)
+        return written
+
+    def _zoom_batches(self, pyramid_dir, z, geometries, fids, names, batch_size=64) -> List[List[tuple]]:
+        """
+        Daftar task tile untuk satu zoom, dikelompokkan per batch.
+
+        Tile diurutkan per baris/kolom sehingga satu batch berisi tile yang
+        berdekatan dan hanya membawa WKB fitur kandidat tile-tile tersebut.
+        """
+        tile_ranges = _tile_range(shapely.bounds(geometries), z)
+        tree = shapely.STRtree(geometries)
+
+        tiles = set()
+        for x0, y0, x1, y1 in tile_ranges:
+            tiles.update((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+        wkbs = shapely.to_wkb(geometries)
+        tasks = []
+        for x, y in sorted(tiles):
+            candidates = tree.query(shapely.box(*tile_bounds(z, x, y)))
+            if len(candidates) == 0:
+                continue
+            candidates = np.sort(candidates)
+            tasks.append((
+                os.path.join(pyramid_dir, str(z), str(x), f"{y}.pbf"),
+                z, x, y,
+                fids[candidates].tolist(),
+                names[candidates].tolist(),
+                wkbs[candidates]
+            ))
+        return [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+
+    def write_attributes(self, geometry_key: str, attributes: Dict[str, list]) -> str:
+        """
+        Menyimpan atribut per fitur (array sejajar fid) untuk satu piramida.
+        File dengan isi sama tidak ditulis ulang; mengembalikan attribute_key.
+        """
+        payload = json.dumps(attributes, separators=(',', ':'))
+        attribute_key = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(self._pyramid_dir(geometry_key), 'attributes', f"{attribute_key}.json")
+        if os.path.exists(path):
+            _touch(path)
+            return attribute_key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self.evict(keep_geometry=geometry_key, keep_attribute=path)
+        return attribute_key
+
+    def disk_usage(self) -> int:
+        """Total ukuran piramida dan file atribut dalam byte"""
+        return sum(size for _, size, _, _, _ in self._entries())
+
+    def evict(self, keep_geometry: Optional[str] = None, keep_attribute: Optional[str] = None) -> int:
+        """
+        Menghapus piramida (utuh) dan file atribut yang paling lama tidak dipakai
+        hingga total ukuran di bawah kuota; mengembalikan jumlah entri yang dihapus.
+
+        Piramida yang sedang dibuat tidak pernah dihapus. Piramida tanpa penanda
+        complete yang tidak sedang dibuat di proses ini adalah sisa pembuatan
+        yang gagal dan boleh dihapus. keep_geometry (piramida yang baru dipakai)
+        dan keep_attribute tidak dihapus, tetapi atribut lama piramida itu boleh.
+        """
+        removed = 0
+        with self._evict_lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _, _, _ in entries)
+            # Ukuran file atribut per piramida, ikut terhapus jika piramidanya dihapus
+            attribute_sizes: Dict[str, Dict[str, int]] = {}
+            for path, size, _, geometry_key, is_pyramid in entries:
+                if not is_pyramid:
+                    attribute_sizes.setdefault(geometry_key, {})[path] = size
+
+            removed_pyramids = set()
+            for path, size, _, geometry_key, is_pyramid in entries:
+                if total <= self.quota_bytes:
+                    break
+                if geometry_key in removed_pyramids or geometry_key in self._building:
+                    continue
+                if is_pyramid:
+                    if geometry_key == keep_geometry:
+                        continue
+                    shutil.rmtree(path, ignore_errors=True)
+                    total -= size + sum(attribute_sizes.pop(geometry_key, {}).values())
+                    removed_pyramids.add(geometry_key)
+                    removed += 1
+                elif path != keep_attribute and _remove(path):
+                    total -= attribute_sizes.get(geometry_key, {}).pop(path, size)
+                    removed += 1
+        return removed
+
+    def _entries(self):
+        """
+        Daftar (path, ukuran, waktu akses terakhir, geometry_key, piramida?) untuk
+        setiap piramida (tanpa atribut) dan setiap file atribut
+        """
+        entries = []
+        for geometry_key in os.listdir(self.root):
+            pyramid_dir = self._pyramid_dir(geometry_key)
+            if not os.path.isdir(pyramid_dir):
+                continue
+            complete_marker = os.path.join(pyramid_dir, 'complete')
+            try:
+                with open(complete_marker, encoding='utf-8') as f:
+                    tile_bytes = json.load(f).get('bytes')
+                last_used = os.stat(complete_marker).st_mtime
+            except (OSError, ValueError):
+                # Belum selesai dibuat (atau sisa pembuatan yang gagal)
+                tile_bytes, last_used = None, _mtime(pyramid_dir)
+            if tile_bytes is None:
+                tile_bytes = _directory_size(pyramid_dir, exclude='attributes')
+            entries.append((pyramid_dir, tile_bytes, last_used, geometry_key, True))
+
+            attribute_dir = os.path.join(pyramid_dir, 'attributes')
+            if os.path.isdir(attribute_dir):
+                for file in os.listdir(attribute_dir):
+                    if not file.endswith('.json'):
+                        continue
+                    path = os.path.join(attribute_dir, file)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((path, stat.st_size, stat.st_mtime, geometry_key, False))
+        return entries
+
+
+def _touch(path: str):
+    """Memperbarui mtime (waktu akses terakhir untuk LRU), abaikan jika file sudah dihapus"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _remove(path: str) -> bool:
+    """Menghapus file, abaikan jika sudah dihapus proses lain"""
+    try:
+        os.unlink(path)
+        return True
+    except OSError:
+        return False
+
+
+def _directory_size(path: str, exclude: Optional[str] = None) -> int:
+    """Total ukuran file di bawah direktori (subdirektori exclude di tingkat teratas dilewati)"""
+    total = 0
+    for current, dirs, files in os.walk(path):
+        if exclude is not None and current == path and exclude in dirs:
+            dirs.remove(exclude)
+        for file in files:
+            try:
+                total += os.stat(os.path.join(current, file)).st_size
+            except OSError:
+                pass
+    return total
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_vector_tile_store() -> VectorTileStore:
+    """Instance VectorTileStore bersama untuk seluruh proses"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorTileStore()
+    return _store
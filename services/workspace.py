@@ -0,0 +1,138 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Optional
+from config import WORKSPACE_DIR, WORKSPACE_TTL_SECONDS, WORKSPACE_REAP_INTERVAL_SECONDS
+
+
+class WorkspaceManager:
+    """
+    Mengelola direktori kerja terisolasi untuk setiap sesi dan upload.
+    
+    Struktur: WORKSPACE_DIR/<session_id>/<upload_id>. Direktori upload yang
+    mtime-nya lebih tua dari TTL dihapus oleh reaper di background.
+    """
+    def __init__(
+        self,
+        root: str = WORKSPACE_DIR,
+        ttl_seconds: float = WORKSPACE_TTL_SECONDS,
+        reap_interval: float = WORKSPACE_REAP_INTERVAL_SECONDS
+    ):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.reap_interval = reap_interval
+        self._lock = threading.Lock()
+        self._reaper_thread = None
+        self._stop_event = threading.Event()
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _session_dir(self, session_id: str) -> str:
+        """Direktori induk untuk satu sesi"""
+        # Hindari path traversal dari session_id
+        safe_id = "".join(c for c in session_id if c.isalnum() or c in "-_") or "anon"
+        return os.path.join(self.root, safe_id)
+    
+    def create(self, session_id: str) -> str:
+        """Membuat direktori kerja baru untuk satu upload dalam sesi tertentu"""
+        path = os.path.join(self._session_dir(session_id), uuid.uuid4().hex)
+        os.makedirs(path)
+        return path
+    
+    def touch(self, path: str):
+        """Memperbarui waktu akses direktori agar tidak dihapus reaper"""
+        if os.path.isdir(path):
+            os.utime(path, None)
+    
+    def release(self, path: Optional[str]):
+        """Menghapus satu direktori kerja"""
+        if not path or not os.path.abspath(path).startswith(os.path.abspath(self.root) + os.sep):
+            return
+        shutil.rmtree(path, ignore_errors=True)
+        # Hapus direktori sesi jika sudah kosong
+        parent = os.path.dirname(path)
+        try:
+            os.rmdir(parent)
+        except OSError:
+            pass
+    
+    def release_session(self, session_id: str):
+        """Menghapus seluruh direktori kerja milik satu sesi"""
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+    
+    def disk_usage(self, session_id: Optional[str] = None) -> int:
+        """Total ukuran file (byte) seluruh workspace atau satu sesi"""
+        base = self._session_dir(session_id) if session_id else self.root
+        total = 0
+        for dirpath, _, filenames in os.walk(base):
+            for file in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, file))
+                except OSError:
+                    pass
+        return total
+    
+    def reap(self, now: Optional[float] = None) -> int:
+        """Menghapus direktori upload yang melewati TTL, mengembalikan jumlah yang dihapus"""
+        now = time.time() if now is None else now
+        removed = 0
+        with self._lock:
+            for session_id in os.listdir(self.root):
+                session_dir = os.path.join(self.root, session_id)
+                if not os.path.isdir(session_dir):
+                    continue
+                for upload_id in os.listdir(session_dir):
+                    upload_dir = os.path.join(session_dir, upload_id)
+                    try:
+                        expired = now - os.path.getmtime(upload_dir) > self.ttl_seconds
+                    except OSError:
+                        continue
+                    if expired:
+                        shutil.rmtree(upload_dir, ignore_errors=True)
+                        removed += 1
+                try:
+                    os.rmdir(session_dir)
+                except OSError:
+                    pass
+        return removed
+    
+    def start_reaper(self):
+        """Menjalankan reaper sebagai daemon thread (idempoten)"""
+        if self._reaper_thread is not None and self._reaper_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._reaper_thread = threading.Thread(
+            target=self._reaper_loop, name="workspace-reaper", daemon=True
+        )
+        self._reaper_thread.start()
+    
+    def stop_reaper(self):
+        """Menghentikan reaper"""
+        self._stop_event.set()
+    
+    def _reaper_loop(self):
+        """Loop reaper: bersihkan lalu tunggu interval berikutnya"""
+        while not self._stop_event.is_set():
+            try:
+                removed = self.reap()
+                if removed:
+                    print(f"Workspace reaper: {removed} direktori terbengkalai dihapus")
+            except Exception as e:
+                print(f"Error workspace reaper: {e}")
+            self._stop_event.wait(self.reap_interval)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Instance WorkspaceManager bersama untuk seluruh proses, reaper otomatis berjalan"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = WorkspaceManager()
+                _manager.start_reaper()
+    return _manager
@@ -0,0 +1,82 @@
+"""
+Mengukur waktu cold start aplikasi di proses Python baru.
+
+Dua ukuran, masing-masing median dari beberapa proses baru:
+- import: waktu mengimpor modul yang dibutuhkan app.py saat halaman pertama dibuka
+- first render: waktu menjalankan app.py sampai halaman pertama selesai dirender
+  (lewat streamlit.testing AppTest, tanpa server dan browser)
+
+Juga dicatat library berat mana yang sudah termuat setelah render pertama.
+
+Contoh:
+    python startup_benchmark.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ['geopandas', 'shapely', 'pyarrow', 'folium', 'streamlit_folium', 'sklearn', 'scipy', 'matplotlib']
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+streamlit_done = time.perf_counter()
+import controllers.data_controller, controllers.cluster_controller
+import views.sidebar, views.data_view, views.cluster_view
+import services.background_jobs
+done = time.perf_counter()
+print(json.dumps({
+    'streamlit': streamlit_done - start,
+    'app_modules': done - streamlit_done,
+    'loaded': [m for m in %(heavy)r if m in sys.modules],
+}))
+"""
+
+_RENDER_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('app.py', default_timeout=120)
+app.run()
+done = time.perf_counter()
+print(json.dumps({
+    'first_render': done - start,
+    'exception': [str(e.value) for e in app.exception],
+    'loaded': [m for m in %(heavy)r if m in sys.modules],
+}))
+"""
+
+
+def _run_probe(code: str) -> dict:
+    """Menjalankan probe di proses Python baru dan membaca baris JSON terakhir"""
+    completed = subprocess.run(
+        [sys.executable, '-c', code % {'heavy': HEAVY_MODULES}],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold start aplikasi Streamlit")
+    parser.add_argument('--runs', type=int, default=5, help="Jumlah proses baru per pengukuran")
+    args = parser.parse_args(argv)
+
+    imports = [_run_probe(_IMPORT_PROBE) for _ in range(args.runs)]
+    renders = [_run_probe(_RENDER_PROBE) for _ in range(args.runs)]
+
+    print(f"Median dari {args.runs} proses baru:")
+    print(f"  import streamlit      : {statistics.median(r['streamlit'] for r in imports):.3f} detik")
+    print(f"  import modul aplikasi : {statistics.median(r['app_modules'] for r in imports):.3f} detik")
+    print(f"  render pertama app.py : {statistics.median(r['first_render'] for r in renders):.3f} detik")
+    print(f"  library berat termuat : {', '.join(renders[-1]['loaded']) or '-'}")
+    if renders[-1]['exception']:
+        print(f"  exception saat render : {renders[-1]['exception']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
 import pandas as pd
 import numpy as np
+import io
 import os
 import zipfile
 import tempfile
-from typing import Tuple
+from typing import Tuple, Union, BinaryIO
+
+BufferLike = Union[bytes, bytearray, memoryview, BinaryIO]
 
 def validate_file_format(filename: str, allowed_extensions: list = ['.csv']) -> bool:
     """Memvalidasi format file"""
@@ -16,6 +19,22 @@ def read_csv_file(file_path: str) -> pd.DataFrame:
     except Exception as e:
         raise ValueError(f"Gagal membaca file CSV: {e}")
 
+def as_binary_stream(buffer: BufferLike) -> BinaryIO:
+    """Membungkus bytes/memoryview menjadi stream biner tanpa menulis ke disk"""
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        return io.BytesIO(buffer)
+    # Objek file-like (mis. UploadedFile Streamlit) dipakai langsung
+    if hasattr(buffer, 'seek'):
+        buffer.seek(0)
+    return buffer
+
+def read_csv_buffer(buffer: BufferLike) -> pd.DataFrame:
+    """Membaca CSV langsung dari buffer di memori"""
+    try:
+        return pd.read_csv(as_binary_stream(buffer))
+    except Exception as e:
+        raise ValueError(f"Gagal membaca file CSV: {e}")
+
 def save_to_csv(df: pd.DataFrame, file_path: str) -> bool:
     """Menyimpan dataframe ke CSV"""
     try:
@@ -25,6 +44,63 @@ def save_to_csv(df: pd.DataFrame, file_path: str) -> bool:
         print(f"Error menyimpan file: {e}")
         return False
 
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Menghitung hash SHA-256 dari isi file"""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def buffer_sha256(buffer: BufferLike) -> str:
+    """Menghitung hash SHA-256 dari buffer di memori tanpa menyalin isinya"""
+    import hashlib
+    if hasattr(buffer, 'getbuffer'):
+        # BytesIO/UploadedFile: gunakan memoryview agar tidak terjadi salinan
+        with buffer.getbuffer() as view:
+            return hashlib.sha256(view).hexdigest()
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(buffer).hexdigest()
+    stream = as_binary_stream(buffer)
+    digest = hashlib.sha256(stream.read()).hexdigest()
+    stream.seek(0)
+    return digest
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Menghitung hash SHA-256 isi file secara bertahap (tanpa memuat seluruh file)"""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_geoparquet(gdf, file_path: str) -> bool:
+    """Menyimpan GeoDataFrame ke GeoParquet secara atomik (butuh pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("Peringatan: pyarrow tidak terpasang, konversi GeoParquet dilewati")
+        return False
+    
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        gdf.to_parquet(tmp_path, index=False)
+        # os.replace atomik sehingga pembaca lain tidak melihat file setengah jadi
+        os.replace(tmp_path, file_path)
+        return True
+    except Exception as e:
+        print(f"Error menyimpan GeoParquet: {e}")
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+def read_geoparquet(file_path: str):
+    """Membaca GeoDataFrame dari file GeoParquet"""
+    import geopandas as gpd
+    return gpd.read_parquet(file_path)
+
 def extract_zip_file(zip_path: str, extract_to: str) -> bool:
     """Mengekstrak file ZIP ke direktori tertentu"""
     try:
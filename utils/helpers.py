@@ -1,5 +1,63 @@
+import hashlib
+import weakref
+import numpy as np
+import pandas as pd
+
 # cell code 4
 def get_cluster_color(cluster_id: int) -> str:
     """Mendapatkan warna untuk cluster tertentu"""
     from config import CLUSTER_COLORS
-    return CLUSTER_COLORS.get(cluster_id % len(CLUSTER_COLORS), '#CCCCCC')
\ No newline at end of file
+    return CLUSTER_COLORS.get(cluster_id % len(CLUSTER_COLORS), '#CCCCCC')
+
+
+# Sidik jari per objek (id -> (weakref, hash)), agar objek yang sama tidak di-hash ulang tiap rerun
+_frame_fingerprints = {}
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """
+    Sidik jari isi DataFrame/GeoDataFrame: nama kolom, dtype, index, nilai,
+    dan geometri (WKB). Hasil untuk objek yang sama di-memo selama objek hidup,
+    sehingga DataFrame tidak boleh diubah di tempat setelah di-fingerprint.
+    """
+    cached = _frame_fingerprints.get(id(df))
+    if cached is not None and cached[0]() is df:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+
+    geometry_name = getattr(df, '_geometry_column_name', None)
+    attributes = pd.DataFrame(df.drop(columns=geometry_name)) if geometry_name in df.columns else df
+    digest.update(pd.util.hash_pandas_object(attributes, index=True).values.tobytes())
+
+    if geometry_name in df.columns:
+        import shapely
+        for wkb in shapely.to_wkb(df[geometry_name].values):
+            digest.update(wkb if wkb is not None else b'\x00')
+
+    fingerprint = digest.hexdigest()
+    key = id(df)
+    try:
+        _frame_fingerprints[key] = (weakref.ref(df, lambda _: _frame_fingerprints.pop(key, None)), fingerprint)
+    except TypeError:
+        pass
+    return fingerprint
+
+
+def fingerprint_array(array: np.ndarray) -> str:
+    """Sidik jari isi array numpy (dtype, shape, byte data), di-memo seperti fingerprint_frame"""
+    cached = _frame_fingerprints.get(id(array))
+    if cached is not None and cached[0]() is array:
+        return cached[1]
+
+    digest = hashlib.sha256(f"{array.dtype.str}:{array.shape}".encode('utf-8'))
+    digest.update(np.ascontiguousarray(array).data)
+
+    fingerprint = digest.hexdigest()
+    key = id(array)
+    try:
+        _frame_fingerprints[key] = (weakref.ref(array, lambda _: _frame_fingerprints.pop(key, None)), fingerprint)
+    except TypeError:
+        pass
+    return fingerprint
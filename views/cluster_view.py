@@ -1,14 +1,16 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
 from models.result_model import FullEvaluationResult, ClusteringResult
 from services.clustering import visualize_clusters
 from typing import Tuple, Dict, Any
 import streamlit.components.v1 as components
+from config import BACKGROUND_JOB_POLL_SECONDS
 
 def display_dbi_evaluation_results(evaluation_result: FullEvaluationResult):
     """Menampilkan hasil evaluasi DBI"""
+    import matplotlib.pyplot as plt
+    
     st.subheader("📈 Hasil Evaluasi DBI")
     
     # Tampilkan rekomendasi klaster terbaik
@@ -243,4 +245,24 @@ def display_cluster_interpretation(interpretations: Dict[int, Dict[str, Any]]):
         
         # Pembatas antar cluster
         if cluster_id < len(interpretations) - 1:
-            st.markdown("---")
\ No newline at end of file
+            st.markdown("---")
+
+
+@st.fragment(run_every=BACKGROUND_JOB_POLL_SECONDS)
+def display_job_progress(job_key: str):
+    """
+    Menampilkan progress job latar dari session_state[job_key].
+    
+    Hanya fragmen ini yang diperbarui berkala; begitu job berhenti, seluruh
+    halaman dijalankan ulang agar hasilnya diterapkan.
+    """
+    job = st.session_state.get(job_key)
+    if job is None or not job.is_active:
+        st.rerun()
+    
+    st.progress(job.progress, text=job.message or f"{job.name} menunggu giliran...")
+    st.caption(f"{job.name} berjalan di latar selama {job.elapsed:.0f} detik; halaman tetap bisa digunakan.")
+    if job.cancel_event.is_set():
+        st.button("⏹️ Membatalkan...", disabled=True, key=f"{job_key}_cancelling")
+    else:
+        st.button("⏹️ Batalkan", key=f"{job_key}_cancel", on_click=job.cancel)
@@ -18,6 +18,13 @@ def display_dataset_metadata(metadata: DatasetMetadata):
     if metadata.non_numeric_columns:
         st.write("**Kolom Non-Numerik:**", ", ".join(metadata.non_numeric_columns))
         st.write("**Kolom untuk Merge:**", metadata.merge_key_column)
+    if metadata.coordinate_columns:
+        st.write("**Kolom Koordinat:**", ", ".join(metadata.coordinate_columns))
+    if metadata.merge_mode:
+        st.write(
+            "**Mode Merge Shapefile:**",
+            "spatial join (point-in-polygon)" if metadata.merge_mode == "spatial" else "nama wilayah"
+        )
     
     if metadata.missing_values_info["has_missing"]:
         st.warning(f"Terdapat missing values! {metadata.missing_values_info['rows_dropped']} baris dihapus.")
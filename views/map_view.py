@@ -1,8 +1,8 @@
 import streamlit as st
-from streamlit_folium import st_folium
-import tempfile
-import os
-import zipfile
+import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
+from config import MAP_COORD_PRECISION
+from services.geo_export import EXPORT_FORMATS, get_geo_export_service
 
 def display_shapefile_option():
     """Menampilkan opsi pemilihan shapefile"""
@@ -32,6 +32,8 @@ def display_merge_report(merge_report):
     """Menampilkan laporan hasil merge data"""
     st.subheader("Laporan Integrasi Data")
     
+    is_spatial = merge_report.get('merge_mode') == 'spatial'
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -41,15 +43,35 @@ def display_merge_report(merge_report):
         )
     
     with col2:
-        st.metric(
-            "Wilayah Tidak Match", 
-            f"{len(merge_report['missing_in_shapefile'])} wilayah"
-        )
+        if is_spatial:
+            st.metric(
+                "Titik di Luar Wilayah",
+                f"{merge_report['points_outside']} titik"
+            )
+        else:
+            st.metric(
+                "Wilayah Tidak Match", 
+                f"{len(merge_report['missing_in_shapefile'])} wilayah"
+            )
+    
+    if is_spatial:
+        st.caption(f"{merge_report['points_assigned']} titik berhasil dipetakan ke wilayah (point-in-polygon).")
     
     if len(merge_report['missing_in_shapefile']) > 0:
-        with st.expander("Detail Wilayah yang Tidak Match dengan Shapefile"):
-            st.write("Wilayah berikut ada dalam data clustering tetapi tidak ditemukan dalam shapefile:")
-            st.dataframe(merge_report['missing_in_shapefile'])
+        if is_spatial:
+            with st.expander("Detail Titik di Luar Semua Wilayah Shapefile"):
+                st.write("Titik berikut tidak berada di dalam poligon mana pun (cek koordinat):")
+                st.dataframe(merge_report['missing_in_shapefile'].head(1000))
+        else:
+            with st.expander("Detail Wilayah yang Tidak Match dengan Shapefile"):
+                st.write("Wilayah berikut ada dalam data clustering tetapi tidak ditemukan dalam shapefile:")
+                st.dataframe(merge_report['missing_in_shapefile'])
+    
+    fuzzy_matches = merge_report.get('fuzzy_matches')
+    if fuzzy_matches is not None and len(fuzzy_matches) > 0:
+        with st.expander(f"Nama Wilayah yang Dicocokkan secara Fuzzy ({len(fuzzy_matches)})"):
+            st.write("Nama berikut tidak cocok persis dan dipetakan ke nama shapefile yang paling mirip. Periksa kebenarannya:")
+            st.dataframe(fuzzy_matches)
     
     if len(merge_report['missing_in_data']) > 0:
         with st.expander("Detail Wilayah dalam Shapefile tanpa Data Clustering"):
@@ -61,7 +83,7 @@ def display_choropleth_map(choropleth_map, height=600):
     Menampilkan peta choropleth di Streamlit
     
     Args:
-        choropleth_map: Objek peta Folium
+        choropleth_map: Objek peta Folium, atau HTML peta yang sudah dirender (cache)
         height (int): Tinggi peta dalam piksel
     """
     # Simplifikasi pengecekan - cukup pastikan bukan None
@@ -73,13 +95,18 @@ def display_choropleth_map(choropleth_map, height=600):
     
     # Gunakan container untuk mencegah rerender yang tidak perlu
     with st.container():
-        # Tampilkan peta dengan key unik
-        st_folium(
-            choropleth_map, 
-            width=700, 
-            height=height,
-            key="choropleth_map"
-        )
+        if isinstance(choropleth_map, str):
+            # HTML dari cache render ditampilkan langsung tanpa membangun ulang peta
+            components.html(choropleth_map, width=700, height=height)
+        else:
+            # Tampilkan peta dengan key unik
+            from streamlit_folium import st_folium
+            st_folium(
+                choropleth_map, 
+                width=700, 
+                height=height,
+                key="choropleth_map"
+            )
     
     # Tambahkan penjelasan
     st.caption("""
@@ -88,44 +115,37 @@ def display_choropleth_map(choropleth_map, height=600):
     """)
     
 
-def display_geodata_download_options(gdf, filename_prefix="clustering"):
+def _deferred_download_button(label, build_data, file_name, mime, key):
+    """
+    Tombol download yang isinya baru dibuat saat diklik.
+    
+    Streamlit versi lama belum menerima data berupa callable; di sana file
+    disiapkan lewat tombol terpisah terlebih dahulu.
+    """
+    try:
+        st.download_button(label=label, data=build_data, file_name=file_name, mime=mime, key=key)
+    except StreamlitAPIException:
+        ready_key = f"{key}_ready"
+        if st.button(f"Siapkan {label}", key=f"{key}_prepare"):
+            st.session_state[ready_key] = True
+        if st.session_state.get(ready_key):
+            st.download_button(label=label, data=build_data(), file_name=file_name, mime=mime, key=key)
+
+
+def display_geodata_download_options(gdf, filename_prefix="clustering", precision=MAP_COORD_PRECISION):
     """Menampilkan opsi download untuk data geospatial"""
     st.subheader("💾 Download Data Geospatial")
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Download sebagai GeoJSON
-        geojson_str = gdf.to_json()
-        st.download_button(
-            label="Download GeoJSON",
-            data=geojson_str,
-            file_name=f"{filename_prefix}_geodata.geojson",
-            mime="application/json",
-            key="geojson_download"
-        )
-    
-    with col2:
-        # Download sebagai Shapefile (zip)
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            shp_path = os.path.join(tmp_dir, f"{filename_prefix}.shp")
-            gdf.to_file(shp_path, encoding='utf-8') 
-            
-            # Buat zip file
-            zip_path = os.path.join(tmp_dir, f"{filename_prefix}.zip")
-            with zipfile.ZipFile(zip_path, 'w') as zipf:
-                for file in os.listdir(tmp_dir):
-                    if file.endswith(('.shp', '.shx', '.dbf', '.prj', '.cpg')):
-                        zipf.write(os.path.join(tmp_dir, file), file)
-            
-            # Baca zip file untuk download
-            with open(zip_path, "rb") as f:
-                zip_data = f.read()
-            
-            st.download_button(
-                label="Download Shapefile (ZIP)",
-                data=zip_data,
-                file_name=f"{filename_prefix}_shapefile.zip",
-                mime="application/zip",
-                key="shapefile_download"
-            )
\ No newline at end of file
+    # File hanya dibuat saat tombol diklik, lalu di-cache per isi data dan format
+    export_service = get_geo_export_service()
+    columns = st.columns(len(EXPORT_FORMATS))
+    
+    for column, (fmt, spec) in zip(columns, EXPORT_FORMATS.items()):
+        with column:
+            _deferred_download_button(
+                label=f"Download {spec['label']}",
+                build_data=lambda fmt=fmt: export_service.export_bytes(gdf, fmt, precision, filename_prefix),
+                file_name=f"{filename_prefix}{spec['suffix']}",
+                mime=spec['mime'],
+                key=f"{fmt}_download"
+            )
@@ -1,4 +1,8 @@
+import time
 import streamlit as st
+from controllers.cluster_controller import ClusterController
+from services.result_cache import get_result_cache
+from services.run_store import get_run_store
 
 def render_sidebar():
     """Render sidebar dengan status progress dan reset button"""
@@ -23,16 +27,147 @@ def render_sidebar():
             else:
                 st.info(f"⏳ {label}")
         
+        # Pemakaian memori data sesi ini
+        norm_result = st.session_state.get('normalization_result')
+        if norm_result is not None and getattr(norm_result, 'data_store', None) is not None:
+            report = norm_result.data_store.memory_report()
+            st.subheader("Memori Sesi")
+            st.metric(
+                "Data tersimpan",
+                f"{report['fisik']:.2f} MB",
+                delta=f"-{report['tanpa_deduplikasi'] - report['fisik']:.2f} MB vs salinan terpisah",
+                delta_color="off"
+            )
+            st.caption(
+                f"Kolom asli {report['kolom_asli']:.2f} MB · "
+                f"normalisasi {report['matriks_normalisasi']:.2f} MB · "
+                f"label cluster {report['label_cluster']:.2f} MB"
+            )
+        
+        # Cache hasil bersama lintas sesi
+        cache_stats = get_result_cache().stats()
+        hits = sum(c['hits'] for c in cache_stats['namespaces'].values())
+        misses = sum(c['misses'] for c in cache_stats['namespaces'].values())
+        st.caption(
+            f"Cache bersama: {cache_stats['size_mb']:.1f}/{cache_stats['max_mb']:.0f} MB, "
+            f"{cache_stats['entries']} entri, hit {hits} / miss {misses}"
+        )
+        
+        # Simpan / buka analisis
+        st.divider()
+        render_saved_runs()
+        
         # Reset button
         st.divider()
         if st.button("🔄 Reset Aplikasi", use_container_width=True, type="secondary"):
-            # Bersihkan file temporer shapefile
-            if 'geo_controller' in st.session_state:
-                st.session_state.geo_controller.cleanup_temp_files()
-            
-            # Hapus semua session state
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            reset_session_state()
             
             # Rerun aplikasi
-            st.rerun()
\ No newline at end of file
+            st.rerun()
+
+
+def reset_session_state():
+    """Menghentikan job latar, membersihkan file temporer, dan menghapus semua session state"""
+    # Bersihkan file temporer shapefile
+    if 'geo_controller' in st.session_state:
+        st.session_state.geo_controller.cleanup_temp_files()
+    
+    # Hentikan job latar milik sesi ini
+    for key in ('dbi_job', 'clustering_job'):
+        job = st.session_state.get(key)
+        if job is not None:
+            job.cancel()
+    
+    # Hapus semua session state
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+def render_saved_runs():
+    """Menyimpan analisis sesi ini ke disk dan membuka analisis tersimpan"""
+    st.subheader("Analisis Tersimpan")
+    run_store = get_run_store()
+    
+    if st.session_state.get('data_processed') and 'normalization_result' in st.session_state:
+        run_name = st.text_input("Nama analisis", value=st.session_state.dataset_metadata.filename, key="run_name")
+        if st.button("💾 Simpan Analisis", use_container_width=True, key="save_run_button"):
+            try:
+                with st.spinner("Menyimpan analisis..."):
+                    run_id = run_store.save(
+                        run_name,
+                        st.session_state.dataset_metadata,
+                        st.session_state.normalization_result,
+                        evaluation_result=st.session_state.get('evaluation_result'),
+                        clustering_result=st.session_state.get('clustering_result'),
+                        clustering_table=st.session_state.get('clustering_table'),
+                        interpretations=st.session_state.get('interpretations'),
+                        merge_report=st.session_state.get('merge_report') if st.session_state.get('geodata_merged') else None
+                    )
+                st.success(f"Analisis disimpan ({run_id})")
+            except Exception as e:
+                st.error(f"Gagal menyimpan analisis: {str(e)}")
+    
+    runs = run_store.list_runs()
+    if not runs:
+        st.caption("Belum ada analisis tersimpan.")
+        return
+    
+    labels = {
+        run['run_id']: (
+            f"{run['name']} · {time.strftime('%Y-%m-%d %H:%M', time.localtime(run['created_at']))}"
+            + (f" · k={run['best_k']}" if run['best_k'] is not None else "")
+        )
+        for run in runs
+    }
+    run_id = st.selectbox("Buka analisis", list(labels), format_func=labels.get, key="saved_run_select")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📂 Buka", use_container_width=True, key="load_run_button"):
+            try:
+                with st.spinner("Membuka analisis..."):
+                    run = run_store.load(run_id)
+                reset_session_state()
+                apply_saved_run(run)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Gagal membuka analisis: {str(e)}")
+    with col2:
+        if st.button("🗑️ Hapus", use_container_width=True, key="delete_run_button"):
+            run_store.delete(run_id)
+            st.rerun()
+
+
+def apply_saved_run(run):
+    """Mengisi session state dari AnalysisRun sehingga setiap tahap tampil seperti setelah dihitung"""
+    norm_result = run.normalization_result
+    st.session_state.loaded_run_name = run.name
+    st.session_state.dataset_metadata = run.metadata
+    st.session_state.normalization_result = norm_result
+    st.session_state.scaled_data = norm_result.scaled_data
+    st.session_state.data_processed = True
+    
+    cluster_controller = ClusterController()
+    cluster_controller.restore_results(
+        run.evaluation_result, run.clustering_result, norm_result.data_store, run.interpretations
+    )
+    st.session_state.cluster_controller = cluster_controller
+    
+    if run.evaluation_result is not None:
+        st.session_state.evaluation_result = run.evaluation_result
+        st.session_state.dbi_evaluated = True
+        st.session_state.evaluation_complete = True
+    
+    if run.clustering_result is not None:
+        st.session_state.clustering_result = run.clustering_result
+        st.session_state.clustering_performed = True
+        st.session_state.clustering_complete = True
+    
+    if run.clustering_table is not None:
+        st.session_state.clustering_table = run.clustering_table
+        st.session_state.interpretations = run.interpretations
+        st.session_state.clustering_table_created = True
+    
+    if run.merge_report is not None:
+        st.session_state.merge_report = run.merge_report
+        st.session_state.geodata_merged = True
+        st.session_state.shapefile_processed = True